@@ -1,7 +1,7 @@
 from fastapi import Header, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Annotated, Optional, Union
-from app.services.account_service import AccountService
+from app.services.account_service import AccountService, is_account_access_cached, cache_account_access
 from app.services.api_key_service import APIKeyService
 from app.schemas.user import UserInDB
 from app.schemas.account import AccountResponse
@@ -190,6 +190,23 @@ async def get_valid_account_id_unified(
                 detail="Error validating account ID"
             )
 
+async def get_polled_account_id(
+    x_account_id: Annotated[str | None, Header(alias="X-Account-ID")] = None,
+    auth_context: tuple[Optional[UserInDB], Optional[str]] = Depends(get_auth_context),
+    account_service: AccountService = Depends(AccountService)
+) -> str:
+    """
+    get_valid_account_id_unified for task status polls only: account access granted to the same
+    credentials is reused for task_cache_ttl_seconds. Write routes always validate.
+    """
+    user, api_key_account_id = auth_context
+    account_id = api_key_account_id or x_account_id
+    if account_id and is_account_access_cached(account_id, user.id if user else None):
+        return account_id
+    account_id = await get_valid_account_id_unified(x_account_id, auth_context, account_service)
+    cache_account_access(account_id, user.id if user else None)
+    return account_id
+
 async def get_current_account(
     x_account_id: Annotated[str | None, Header(alias="X-Account-ID")] = None,
     current_user: UserInDB = Depends(get_current_active_user),
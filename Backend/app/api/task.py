@@ -10,26 +10,30 @@ from app.services import task_service
 from app.services.task_queue_service import task_queue_service  # Updated import
 from app.api.users import get_current_active_user  # Import dependency
 from app.schemas.user import UserInDB  # Import UserInDB
-from app.api.dependencies import get_optional_account_id, get_valid_account_id_unified, get_auth_context  # Import account dependency
+from app.api.dependencies import get_optional_account_id, get_valid_account_id_unified, get_polled_account_id, get_auth_context  # Import account dependency
 from app.models.task_types import TaskType
+from app.exceptions import QueueAdmissionError
 
 router = APIRouter()
 
 @router.get("/{task_id}", response_model=TaskSchema)
 async def get_task_status_api(
     task_id: str, 
-    account_id: str = Depends(get_valid_account_id_unified),
-    auth_context: tuple = Depends(get_auth_context)
+    account_id: str = Depends(get_polled_account_id),
+    auth_context: tuple = Depends(get_auth_context),
+    events_limit: int = Query(default=20, ge=0, le=200, description="Number of latest events to include (0 for a compact status poll)")
 ):
     """
     Retrieve the status and details of a specific task.
     Supports both Bearer token + X-Account-ID header and X-API-Key authentication.
     Ensures the task belongs to the specified account.
+    The latest events are included; the full history is paginated via /{task_id}/events.
+    Repeated polls of an unchanged task are answered from the per-process task cache.
     """
     if not task_id or not task_id.strip():
         raise HTTPException(status_code=400, detail="Task ID cannot be empty")
     
-    task = await task_service.get_task(task_id)
+    task = await task_service.get_task_snapshot(task_id, events_limit)
     if not task:
         raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found")
     
@@ -42,16 +46,60 @@ async def get_task_status_api(
     
     return task
 
+@router.get("/{task_id}/events", response_model=dict)
+async def get_task_events_api(
+    task_id: str,
+    account_id: str = Depends(get_valid_account_id_unified),
+    auth_context: tuple = Depends(get_auth_context),
+    limit: int = Query(default=50, ge=1, le=500, description="Maximum number of events to return"),
+    before_cursor: Optional[str] = Query(default=None, description="Return the events before this page token (previous_cursor of a page)"),
+    after_cursor: Optional[str] = Query(default=None, description="Return the events after this page token (next_cursor of a page, to poll for new events)"),
+    before: Optional[datetime] = Query(default=None, description="Deprecated, use before_cursor: return the events before this timestamp"),
+    after: Optional[datetime] = Query(default=None, description="Deprecated, use after_cursor: return the events after this timestamp")
+):
+    """
+    Retrieve a task's event history in chronological order, one page at a time.
+    Without cursors the latest events are returned; pass previous_cursor as `before_cursor`
+    for the previous page, or next_cursor as `after_cursor` to fetch only new events.
+    The timestamp parameters skip events that share a timestamp with the page boundary.
+    """
+    for name, value in (("before_cursor", before_cursor), ("after_cursor", after_cursor)):
+        if value:
+            try:
+                task_service.decode_event_cursor(value)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid {name}: {str(e)}")
+    
+    task = await task_service.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found")
+    if task.account_id != account_id:
+        raise HTTPException(status_code=403, detail="Task does not belong to the specified account")
+    
+    if before or after:
+        page = {"events": await task_service.get_task_events(task_id, limit=limit, before=before, after=after)}
+    else:
+        page = await task_service.get_task_events_page(task_id, limit=limit, before_cursor=before_cursor, after_cursor=after_cursor)
+    return {
+        "task_id": task_id,
+        **page,
+        "event_count": task.event_count,
+        "limit": limit
+    }
+
 @router.get("/")
 async def get_all_tasks_api(
     account_id: str = Depends(get_valid_account_id_unified),
     auth_context: tuple = Depends(get_auth_context),
     limit: int = Query(default=100, ge=1, le=1000, description="Maximum number of tasks to return"),
-    skip: int = Query(default=0, ge=0, description="Number of tasks to skip for pagination"),
+    skip: int = Query(default=0, ge=0, description="Number of tasks to skip for pagination (prefer cursor for deep pages)"),
+    cursor: Optional[str] = Query(default=None, description="Page token from next_cursor of the previous page; replaces skip"),
     status: Optional[str] = Query(default=None, description="Filter tasks by status (PENDING, PROCESSING, COMPLETED, FAILED)"),
     task_source_group_id: Optional[str] = Query(default=None, description="Filter tasks by group ID"),
     task_source_ids: Optional[str] = Query(default=None, description="Comma-separated list of source IDs to filter tasks by"),
-    task_ids: Optional[str] = Query(default=None, description="Comma-separated list of task IDs to retrieve specific tasks")
+    task_ids: Optional[str] = Query(default=None, description="Comma-separated list of task IDs to retrieve specific tasks"),
+    view: str = Query(default="full", description="Fields to return: summary, status or full"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated list of task fields to return instead of a view")
 ):
     """
     Retrieve all tasks for the current account with pagination and total count, optionally filtered by status, group ID, source IDs, and specific task IDs.
@@ -62,13 +110,16 @@ async def get_all_tasks_api(
         auth_context: Authentication context containing user and API key account info.
         limit: Maximum number of tasks to return (default 100, max 1000)
         skip: Number of tasks to skip for pagination
+        cursor: Optional page token returned as next_cursor; pages by position instead of skipping
         status: Optional filter for task status (e.g. PENDING, PROCESSING, COMPLETED, FAILED)
         task_source_group_id: Optional filter for task group ID
         task_source_ids: Optional comma-separated list of source IDs to filter tasks by
         task_ids: Optional comma-separated list of task IDs to retrieve specific tasks
+        view: "summary" (no request data, folder content or error details), "status" (progress polling) or "full"
+        fields: Optional comma-separated list of fields (e.g. task_id,status,progress); overrides view
         
     Returns:
-        Object containing tasks list and total count
+        Object containing tasks list, total count and the next page's cursor (null on the last page)
     """
     # Validate status if provided
     valid_statuses = ["PENDING", "PROCESSING", "COMPLETED", "FAILED"]
@@ -100,6 +151,29 @@ async def get_all_tasks_api(
                 detail="task_ids parameter cannot be empty if provided"
             )
     
+    # Validate view and fields; only these are read from the database
+    if view not in task_service.TASK_VIEWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid view '{view}'. Valid views are: {', '.join(task_service.TASK_VIEWS)}"
+        )
+    fields_list = None
+    if fields:
+        fields_list = [field.strip() for field in fields.split(',') if field.strip()]
+        invalid_fields = [field for field in fields_list if field not in task_service.TASK_LIST_FIELDS]
+        if not fields_list or invalid_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid fields: {', '.join(invalid_fields) or fields}. Valid fields are: {', '.join(task_service.TASK_LIST_FIELDS)}"
+            )
+    
+    if cursor:
+        try:
+            task_service.decode_task_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        skip = 0
+    
     # Get tasks and total count in parallel for better performance
     tasks, total_count = await asyncio.gather(
         task_service.get_all_tasks(
@@ -109,7 +183,10 @@ async def get_all_tasks_api(
             status_filter=status,
             task_source_group_id=task_source_group_id,
             task_source_ids=source_ids_list,
-            task_ids=task_ids_list
+            task_ids=task_ids_list,
+            view=view,
+            fields=fields_list,
+            cursor=cursor
         ),
         task_service.get_task_count(
             account_id=account_id,
@@ -124,7 +201,9 @@ async def get_all_tasks_api(
         "tasks": tasks,
         "total": total_count,
         "limit": limit,
-        "skip": skip
+        "skip": skip,
+        "next_cursor": task_service.next_task_cursor(tasks, limit),
+        "view": "fields" if fields_list else view
     }
 
 @router.post("/", response_model=TaskSchema, status_code=201)
@@ -149,6 +228,12 @@ async def create_new_task_api(
     # Use account_id from unified auth
     final_account_id = account_id
     
+    # Reject up front when the queue can't take the task in reasonable time
+    try:
+        await task_queue_service.check_admission(task_create.task_type or "video", task_create.priority or "normal")
+    except QueueAdmissionError as e:
+        raise HTTPException(status_code=503, detail=e.message, headers={"Retry-After": str(min(e.estimated_wait_seconds, 3600))})
+    
     # Prepare request_data with any necessary transformations
     request_data = task_create.request_data.copy() if task_create.request_data else None    # No field transformations needed - use original field names
     # Quiz processor will use: story_prompt, num_questions, difficulty
@@ -289,7 +374,7 @@ async def update_task_status_api(
         raise HTTPException(status_code=403, detail="Task does not belong to the specified account")
     
     # Update the task status
-    updated_task = await task_service.update_task_status(task_id, status, progress)
+    updated_task = await task_service.update_task_status(task_id, status, progress, return_task=True)
     if not updated_task:
         raise HTTPException(status_code=500, detail="Failed to update task status")
     
@@ -327,7 +412,7 @@ async def update_task_progress_api(
         raise HTTPException(status_code=403, detail="Task does not belong to the specified account")
     
     # Update the task progress
-    updated_task = await task_service.set_task_progress(task_id, progress, message)
+    updated_task = await task_service.set_task_progress(task_id, progress, message, return_task=True)
     if not updated_task:
         raise HTTPException(status_code=500, detail="Failed to update task progress")
     
@@ -350,39 +435,30 @@ async def get_queue_status_api(
         
         # Check if queue processing is active
         is_processing = task_queue_service._processing
-        current_task = task_queue_service._current_task_id
+        current_task_ids = task_queue_service.current_task_ids
         
-        # Get tasks by status for this account
-        pending_tasks = await task_service.get_all_tasks(
-            account_id=account_id, 
-            status_filter="PENDING", 
-            limit=100
-        )
-        
-        queued_tasks = await task_service.get_all_tasks(
-            account_id=account_id, 
-            status_filter="QUEUED", 
-            limit=100
-        )
-        
-        processing_tasks = await task_service.get_all_tasks(
-            account_id=account_id, 
-            status_filter="PROCESSING", 
-            limit=100
+        # Count tasks by status for this account from the counters; list only the first few IDs
+        pending_count, queued_count, processing_count, pending_tasks, queued_tasks = await asyncio.gather(
+            task_service.get_task_count(account_id=account_id, status_filter="PENDING"),
+            task_service.get_task_count(account_id=account_id, status_filter="QUEUED"),
+            task_service.get_task_count(account_id=account_id, status_filter="PROCESSING"),
+            task_service.get_all_tasks(account_id=account_id, status_filter="PENDING", limit=10, view="status"),
+            task_service.get_all_tasks(account_id=account_id, status_filter="QUEUED", limit=10, view="status")
         )
         
         return {
             "success": True,
             "queue_processing_active": is_processing,
-            "current_processing_task": current_task,
+            "current_processing_task": current_task_ids[0] if current_task_ids else None,
+            "current_processing_tasks": current_task_ids,
             "overall_queue_status": queue_status,
             "account_task_counts": {
-                "pending": len(pending_tasks),
-                "queued": len(queued_tasks), 
-                "processing": len(processing_tasks)
+                "pending": pending_count,
+                "queued": queued_count, 
+                "processing": processing_count
             },
-            "pending_task_ids": [t.task_id for t in pending_tasks[:10]],  # First 10
-            "queued_task_ids": [t.task_id for t in queued_tasks[:10]],    # First 10
+            "pending_task_ids": [t.task_id for t in pending_tasks],  # First 10
+            "queued_task_ids": [t.task_id for t in queued_tasks],    # First 10
         }
         
     except Exception as e:
@@ -532,7 +608,15 @@ async def create_bulk_tasks_api(
                         raise HTTPException(
                             status_code=400, 
                             detail=f"Quiz task {task.task_id}: num_questions must be integer between 1 and 50"
-                        )    # Prepare tasks data for bulk creation
+                        )
+    
+    # Reject up front when the queue can't take the tasks in reasonable time (one check for the whole batch)
+    try:
+        await task_queue_service.check_admission_many([(task.task_type or "video", task.priority) for task in bulk_request.tasks])
+    except QueueAdmissionError as e:
+        raise HTTPException(status_code=503, detail=e.message, headers={"Retry-After": str(min(e.estimated_wait_seconds, 3600))})
+    
+    # Prepare tasks data for bulk creation
     tasks_data = []
     for task in bulk_request.tasks:
         # Prepare request_data with any necessary transformations
@@ -561,52 +645,60 @@ async def create_bulk_tasks_api(
             "task_source_id": task.task_source_id,
             "task_source_group_id": task.task_source_group_id
         }
-        tasks_data.append(task_data)# Create tasks in bulk
-    created_tasks = await task_service.create_bulk_tasks(
+        tasks_data.append(task_data)
+    
+    # Create tasks in bulk (one insert_many; already existing task IDs are returned as stored)
+    created_tasks, new_task_ids = await task_service.insert_bulk_tasks_impl(
         tasks_data=tasks_data,
         user_id=user_id,
         account_id=final_account_id
     )
     
-    # Add each created task to the processing queue
+    # Add the newly created tasks to the processing queue in one batch
+    new_task_ids = set(new_task_ids)
+    queue_entries = []
+    task_events = []
+    for task in created_tasks:
+        if task.task_id not in new_task_ids:
+            continue
+        # Validate that task has request_data for processing
+        if not task.request_data:
+            print(f"⚠️ Warning: Task {task.task_id} has no request_data, skipping queue addition")
+            task_events.append({
+                "task_id": task.task_id,
+                "message": "Task created but not queued - missing request_data",
+                "status": "PENDING"
+            })
+            continue
+        queue_entries.append({
+            "task_id": task.task_id,
+            "task_type": task.task_type,
+            "priority": task.priority,
+            "request_data": task.request_data
+        })
+    
     queue_successes = 0
     queue_failures = 0
-    
-    for task in created_tasks:
+    if queue_entries:
         try:
-            # Validate that task has request_data for processing
-            if not task.request_data:
-                print(f"⚠️ Warning: Task {task.task_id} has no request_data, skipping queue addition")
-                await task_service.add_task_event(
-                    task_id=task.task_id,
-                    message="Task created but not queued - missing request_data",
-                    status="PENDING"
-                )
-                continue
-                
-            print(f"📋 Adding task {task.task_id} (type: {task.task_type}) to processing queue...")
-            await task_queue_service.add_to_queue(
-                task_id=task.task_id,
-                request_data=task.request_data,
+            queue_result = await task_queue_service.add_many_to_queue(
+                tasks=queue_entries,
                 user_id=user_id or f"api_key_user_{final_account_id}",
-                account_id=final_account_id,
-                task_type=task.task_type,
-                priority=task.priority
+                account_id=final_account_id
             )
-            queue_successes += 1
-            print(f"✅ Task {task.task_id} successfully added to queue")
-            
+            queue_successes = len(queue_result["queued"]) + len(queue_result["already_queued"]) + len(queue_result["following"])
+            failed = queue_result["failed"]
         except Exception as e:
+            failed = {entry["task_id"]: str(e) for entry in queue_entries}
+        
+        for task_id, error in failed.items():
             queue_failures += 1
-            error_msg = f"Failed to add task {task.task_id} to queue: {str(e)}"
+            error_msg = f"Failed to add task {task_id} to queue: {error}"
             print(f"❌ {error_msg}")
-            
             # Update task status to indicate queue failure
-            await task_service.add_task_event(
-                task_id=task.task_id,
-                message=error_msg,
-                status="FAILED"
-            )
+            task_events.append({"task_id": task_id, "message": error_msg, "status": "FAILED"})
+    
+    await task_service.add_task_events_bulk(task_events)
     
     print(f"📊 Bulk task queue summary: {queue_successes} successes, {queue_failures} failures")
     
@@ -647,9 +739,9 @@ async def requeue_pending_tasks_api(
                     continue
                 
                 # Check if already in queue
-                queue_status = await task_queue_service.get_queue_status(task.task_id)
-                if queue_status.get("status") != "NOT_FOUND":
-                    print(f"⚠️ Task {task.task_id} already in queue with status: {queue_status.get('status')}")
+                queue_item_status = await task_queue_service.get_queue_item_status(task.task_id)
+                if queue_item_status is not None:
+                    print(f"⚠️ Task {task.task_id} already in queue with status: {queue_item_status}")
                     continue
                 
                 # Add to queue
@@ -772,12 +864,12 @@ async def bulk_regenerate_tasks_api(
                     failed_count += 1
                     continue
                   # Check if task is already in queue first
-                queue_status = await task_queue_service.get_queue_status(task.task_id)
-                if queue_status.get("status") not in ["NOT_FOUND", "COMPLETED", "FAILED", "CANCELLED"]:
+                queue_item_status = await task_queue_service.get_queue_item_status(task.task_id)
+                if queue_item_status not in [None, "COMPLETED", "FAILED", "CANCELLED"]:
                     details.append({
                         "task_id": task.task_id,
                         "status": "skipped",
-                        "reason": f"Task already in queue with status: {queue_status.get('status')}"
+                        "reason": f"Task already in queue with status: {queue_item_status}"
                     })
                     failed_count += 1
                     continue
@@ -1032,12 +1124,12 @@ async def process_pending_tasks_api(
                     continue
                 
                 # Check if already in queue
-                queue_status = await task_queue_service.get_queue_status(task.task_id)
-                if queue_status.get("status") not in ["NOT_FOUND", "COMPLETED", "FAILED", "CANCELLED"]:
+                queue_item_status = await task_queue_service.get_queue_item_status(task.task_id)
+                if queue_item_status not in [None, "COMPLETED", "FAILED", "CANCELLED"]:
                     details.append({
                         "task_id": task.task_id,
                         "status": "skipped", 
-                        "reason": f"Already in queue with status: {queue_status.get('status')}"
+                        "reason": f"Already in queue with status: {queue_item_status}"
                     })
                     failed_count += 1
                     continue
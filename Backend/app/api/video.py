@@ -1,15 +1,20 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from fastapi.responses import PlainTextResponse
+import hmac
 import logging
 from app.services.task_queue_service import task_queue_service
 from app.schemas.video import VideoGenerateRequest, VideoGenerateResponse, VideoGenerateData
 from app.services import task_service
+from app.services import archive_service
 from app.services.credit_service import deduct_credits_for_video
-from app.api.users import get_current_active_user
+from app.api.users import get_current_active_user, get_current_user
 from app.schemas.user import UserInDB as User
 from app.api.dependencies import get_valid_account_id
 from app.models.task_types import TaskType
+from app.config import get_settings
+from app.exceptions import QueueAdmissionError
 import uuid
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +32,11 @@ async def generate_video_endpoint(
     print(f"🎬 Theme: {getattr(request, 'theme', 'MISSING')}")
     print(f"🎬 Custom Colors: {getattr(request, 'custom_colors', 'MISSING')}")
     logger.info(f"🎬 VIDEO API CALLED! Theme: {getattr(request, 'theme', 'None')}, Custom Colors: {getattr(request, 'custom_colors', 'None')}")
+    # Turn the request away before charging credits when the queue can't take it in reasonable time
+    try:
+        await task_queue_service.check_admission(TaskType.VIDEO.value)
+    except QueueAdmissionError as e:
+        raise HTTPException(status_code=503, detail=e.message, headers={"Retry-After": str(min(e.estimated_wait_seconds, 3600))})
     # Deduct credits before starting generation
     try:
         video_info = request.story_prompt[:50] + "..." if request.story_prompt else "Untitled Video"
@@ -210,6 +220,49 @@ async def queue_health_check(
         logger.error(f"Failed to get queue health: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get queue health: {str(e)}")
 
+async def verify_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Scrapers and autoscalers authenticate with queue_metrics_token instead of a user session.
+    Without a configured token the endpoints require a signed-in user; they are never open.
+    """
+    metrics_token = get_settings().queue_metrics_token
+    if metrics_token:
+        if not authorization or not hmac.compare_digest(authorization, f"Bearer {metrics_token}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+        return
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    await get_current_active_user(await get_current_user(authorization[len("Bearer "):]))
+
+async def verify_operator_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Maintenance endpoints that act on every account's data require queue_metrics_token.
+    Users have no admin role, so without a configured token these endpoints are disabled.
+    """
+    metrics_token = get_settings().queue_metrics_token
+    if not metrics_token:
+        raise HTTPException(status_code=403, detail="Operator endpoints are disabled (queue_metrics_token is not configured)")
+    if not authorization or not hmac.compare_digest(authorization, f"Bearer {metrics_token}"):
+        raise HTTPException(status_code=401, detail="Invalid operator token", headers={"WWW-Authenticate": "Bearer"})
+
+@router.get("/queue/metrics", response_class=PlainTextResponse, dependencies=[Depends(verify_metrics_token)])
+async def get_queue_metrics():
+    """Queue counters, wait/service-time histograms and lane gauges in the Prometheus text format"""
+    try:
+        return PlainTextResponse(await task_queue_service.get_metrics(), media_type="text/plain; version=0.0.4")
+    except Exception as e:
+        logger.error(f"Failed to get queue metrics: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get queue metrics: {str(e)}")
+
+@router.get("/queue/autoscale", dependencies=[Depends(verify_metrics_token)])
+async def get_queue_autoscaling_hints():
+    """Recommended worker count per lane, from the backlog, service times and drain rate"""
+    try:
+        return {"success": True, "data": await task_queue_service.get_autoscaling_hints()}
+    except Exception as e:
+        logger.error(f"Failed to get autoscaling hints: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get autoscaling hints: {str(e)}")
+
 @router.post("/queue/cleanup")
 async def cleanup_stuck_tasks(
     max_processing_time_minutes: int = Query(30, ge=5, le=120, description="Maximum processing time in minutes before considering a task stuck"),
@@ -224,6 +277,18 @@ async def cleanup_stuck_tasks(
         logger.error(f"Failed to cleanup stuck tasks: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to cleanup stuck tasks: {str(e)}")
 
+@router.post("/queue/archive", dependencies=[Depends(verify_operator_token)])
+async def archive_finished_tasks(
+    older_than_days: int = Query(None, ge=1, le=3650, description="Archive finished tasks older than this (default: task_archive_after_days)")
+):
+    """Move old finished tasks and queue items to the archive collections (requires queue_metrics_token)"""
+    try:
+        result = await archive_service.archive_finished_tasks(older_than_days)
+        return {"success": True, "data": result}
+    except Exception as e:
+        logger.error(f"Failed to archive finished tasks: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to archive finished tasks: {str(e)}")
+
 @router.get("/task/{task_id}/request")
 async def get_task_request_data(
     task_id: str,
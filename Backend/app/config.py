@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Dict
 import os
 
 class Settings(BaseSettings):
@@ -48,6 +49,40 @@ class Settings(BaseSettings):
     secret_key: str = ""
     frontend_base_url: str = "http://localhost:4001" # Add new setting for frontend URL
 
+    # Task queue worker lanes
+    queue_embedded_worker: bool = True  # Run queue consumers inside the API process; off when app.worker runs separately
+    queue_cpu_lane_concurrency: int = 0  # 0 = one slot per CPU core
+    queue_io_lane_concurrency: int = 16
+    queue_poll_interval_seconds: int = 30  # Safety-net poll, wakeups normally come from enqueue events
+    queue_use_change_stream: bool = True  # Wake on tasks enqueued by other nodes (needs a replica set)
+    queue_lease_seconds: int = 120  # A worker must heartbeat within this window or its task is reclaimed
+    queue_heartbeat_seconds: int = 30
+    queue_prefetch_slots: int = 0  # Extra CPU lane tasks that prepare (LLM, slides, downloads) while others encode; 0 = off
+    queue_retry_base_seconds: int = 60  # Backoff before the first retry, doubled per attempt (with jitter)
+    queue_retry_max_seconds: int = 1800
+    queue_position_snapshot_seconds: int = 5  # How long queue positions are served from one rank snapshot
+    # Fair share between accounts within a priority (JSON objects keyed by account_id in .env)
+    queue_account_weights: Dict[str, float] = {}  # Accounts not listed have weight 1
+    queue_account_max_in_flight: int = 0  # 0 = no per-account limit
+    queue_account_max_in_flight_overrides: Dict[str, int] = {}
+    queue_aging_seconds: int = 1800  # A queued item is promoted one priority level per period it waits, up to high
+    queue_dedup_scope: str = "account"  # Identical in-flight requests share one run: "account", "global" or "off"
+    queue_drain_grace_seconds: int = 300  # On shutdown running tasks may finish for this long before they are re-queued
+    task_progress_flush_seconds: float = 1.0  # Buffered progress events are written to MongoDB at this interval
+    task_cache_size: int = 10000  # Task status snapshots cached per process for GET /api/tasks/{task_id} (0 = off)
+    task_cache_ttl_seconds: float = 5.0  # Upper bound on staleness when other nodes' writes can't be seen through a change stream (also how long a validated account is reused)
+    queue_admission_max_wait_seconds: int = 0  # Reject new tasks whose predicted queue wait exceeds this (0 = always accept)
+    queue_autoscale_target_wait_seconds: int = 600  # Backlog should clear within this time at the recommended worker count
+    queue_autoscale_window_seconds: int = 900  # Arrival and drain rates are measured over this window
+    queue_autoscale_slots_per_worker: Dict[str, int] = {}  # Lane -> slots of one worker (default: the lane concurrency setting)
+    queue_autoscale_min_workers: int = 0
+    queue_autoscale_max_workers: int = 0  # 0 = no upper bound
+    task_archive_after_days: int = 30  # Finished tasks and queue items move to the archive collections after this age (0 = never)
+    task_archive_retention_days: int = 365  # Archived entries and their task events are purged after this (0 = keep forever)
+    task_archive_interval_seconds: int = 3600
+    task_stats_reconcile_interval_seconds: int = 3600  # How often task counters are recounted from the tasks collection (0 = never)
+    queue_metrics_token: str = ""  # Bearer token for the metrics/autoscale endpoints (empty = a signed-in user's token is required) and the archive endpoint (empty = disabled)
+
     class Config:
         env_file = ".env"
         # env_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
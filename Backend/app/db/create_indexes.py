@@ -3,9 +3,12 @@ Create MongoDB indexes for the application.
 Run this script during application startup to ensure all necessary indexes exist.
 """
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
+from pymongo.errors import OperationFailure, CollectionInvalid
 from app.db.mongodb_utils import get_database
+from app.config import get_settings
 
 async def create_indexes():
     """Create all necessary indexes for the MongoDB collections"""
@@ -26,6 +29,71 @@ async def create_indexes():
     await db.tasks.create_index([("account_id", 1), ("task_source_group_id", 1)])
     await db.tasks.create_index([("task_source_group_id", 1), ("status", 1)])
     await db.tasks.create_index([("user_id", 1), ("account_id", 1), ("task_source_group_id", 1)])
+    await db.tasks.create_index([("status", 1), ("updated_at", 1)])
+    # Task listings: newest first, paged by (updated_at, task_id) cursors
+    await db.tasks.create_index([("account_id", 1), ("updated_at", -1), ("task_id", -1)])
+    await db.tasks.create_index([("account_id", 1), ("status", 1), ("updated_at", -1), ("task_id", -1)])
+    await db.tasks.create_index([("account_id", 1), ("task_source_group_id", 1), ("updated_at", -1), ("task_id", -1)])
+    
+    # Per-account task counters (see task_stats)
+    await db.task_stats.create_index([("account_id", 1), ("group", 1), ("status", 1)])
+    await db.task_stats.create_index([("group", 1), ("status", 1)])
+    await db.task_stats.create_index([("updated_at", 1)])
+    
+    # Task queue collection indexes
+    logger.info("Creating indexes for task_queue collection...")
+    try:
+        await db.task_queue.create_index("task_id", unique=True)
+    except Exception as e:
+        # Older deployments may hold duplicate queue items per task; fall back to a plain index
+        logger.warning(f"Could not create unique task_queue.task_id index ({e}), creating non-unique index")
+        await db.task_queue.create_index("task_id", name="task_id_lookup")
+    # Superseded by the fair-share claim index below (retries no longer wait in QUEUED)
+    await _drop_index_if_exists(db.task_queue, "status_1_priority_rank_1_retry_after_1_created_at_1")
+    await db.task_queue.create_index([("status", 1), ("lease_expires_at", 1)])
+    await db.task_queue.create_index([("status", 1), ("retry_after", 1)])
+    await db.task_queue.create_index([("status", 1), ("priority_rank", 1), ("fair_tag", 1), ("created_at", 1)])
+    await db.task_queue.create_index([("status", 1), ("account_id", 1)])
+    await db.task_queue.create_index([("dedup_key", 1), ("status", 1)])
+    await db.task_queue.create_index([("leader_task_id", 1), ("status", 1)])
+    await db.task_queue.create_index([("status", 1), ("task_type", 1)])
+    await db.task_queue.create_index([("created_at", -1)])
+    await db.task_queue.create_index([("finished_at", -1)], sparse=True)
+    
+    # Task event log: a time-series collection (MongoDB 5.0+), a regular collection on older servers
+    logger.info("Creating task_events collection and indexes...")
+    events_expire_after = _task_events_expire_after_seconds()
+    if "task_events" not in await db.list_collection_names():
+        timeseries_options = {"timeseries": {"timeField": "timestamp", "metaField": "task_id", "granularity": "seconds"}}
+        if events_expire_after:
+            timeseries_options["expireAfterSeconds"] = events_expire_after
+        try:
+            await db.create_collection("task_events", **timeseries_options)
+        except (OperationFailure, CollectionInvalid) as e:
+            logger.warning(f"Could not create time-series task_events collection ({e}), using a regular collection")
+    await db.task_events.create_index([("task_id", 1), ("timestamp", 1)])
+    events_info = await db.list_collections(filter={"name": "task_events"}).to_list(length=1)
+    if events_info and events_info[0].get("type") == "timeseries":
+        # Follow retention changes made after the collection was created
+        current_expiry = events_info[0].get("options", {}).get("expireAfterSeconds")
+        if current_expiry != events_expire_after:
+            await db.command("collMod", "task_events", expireAfterSeconds=events_expire_after or "off")
+    elif events_expire_after:
+        await _ensure_ttl_index(db, db.task_events, "timestamp", events_expire_after)
+    else:
+        await _drop_index_if_exists(db.task_events, "timestamp_1")
+    
+    # Archive collections (finished tasks and queue items moved out of the hot collections)
+    logger.info("Creating indexes for archive collections...")
+    await db.tasks_archive.create_index("task_id", unique=True)
+    await db.tasks_archive.create_index([("account_id", 1), ("updated_at", -1)])
+    await db.task_queue_archive.create_index("task_id")
+    retention_days = get_settings().task_archive_retention_days
+    for archive in (db.tasks_archive, db.task_queue_archive):
+        if retention_days > 0:
+            await _ensure_ttl_index(db, archive, "archived_at", retention_days * 86400)
+        else:
+            await archive.create_index("archived_at")
     
     # API Keys collection indexes
     logger.info("Creating indexes for api_keys collection...")
@@ -36,6 +104,33 @@ async def create_indexes():
     
     logger.info("All indexes created successfully.")
 
+def _task_events_expire_after_seconds() -> Optional[int]:
+    """Events are kept as long as their task: until it is archived, then for the archive retention"""
+    settings = get_settings()
+    if settings.task_archive_retention_days <= 0:
+        return None
+    return (max(settings.task_archive_after_days, 0) + settings.task_archive_retention_days) * 86400
+
+async def _drop_index_if_exists(collection, name: str):
+    """Drop an index that older versions created"""
+    if name in await collection.index_information():
+        await collection.drop_index(name)
+
+async def _ensure_ttl_index(db, collection, field: str, expire_after_seconds: int):
+    """Create a TTL index, or change its expiry when it exists with another one"""
+    try:
+        await collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+    except OperationFailure as e:
+        # IndexOptionsConflict / IndexKeySpecsConflict: same key, other options (e.g. a changed retention)
+        if e.code not in (85, 86):
+            raise
+        try:
+            await db.command("collMod", collection.name, index={"keyPattern": {field: 1}, "expireAfterSeconds": expire_after_seconds})
+        except OperationFailure:
+            # A plain index from when retention was off: replace it
+            await collection.drop_index(f"{field}_1")
+            await collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+
 if __name__ == "__main__":
     import asyncio
     asyncio.run(create_indexes())
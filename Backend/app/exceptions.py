@@ -3,3 +3,27 @@ class LLMResponseValidationError(Exception):
     def __init__(self, message: str):
         self.message = message
         super().__init__(self.message)
+
+
+class TaskTimeoutError(Exception):
+    """Task exceeded the timeout of its task type"""
+    def __init__(self, message: str, timeout_minutes: int):
+        self.message = message
+        self.timeout_minutes = timeout_minutes
+        super().__init__(self.message)
+
+
+class TaskCancelledError(Exception):
+    """Task was cancelled while it was running"""
+    def __init__(self, message: str, stage: str = None):
+        self.message = message
+        self.stage = stage
+        super().__init__(self.message)
+
+
+class QueueAdmissionError(Exception):
+    """The queue is too backed up to accept more work of a task type"""
+    def __init__(self, message: str, estimated_wait_seconds: int):
+        self.message = message
+        self.estimated_wait_seconds = estimated_wait_seconds
+        super().__init__(self.message)
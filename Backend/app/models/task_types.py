@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 
 class TaskType(str, Enum):
@@ -20,6 +20,23 @@ class TaskPriority(str, Enum):
     HIGH = "high"
     URGENT = "urgent"
 
+# Numeric rank stored on queue items so priority ordering is a single indexed sort (lower runs first)
+PRIORITY_RANKS: Dict[str, int] = {
+    TaskPriority.URGENT.value: 0,
+    TaskPriority.HIGH.value: 1,
+    TaskPriority.NORMAL.value: 2,
+    TaskPriority.LOW.value: 3,
+}
+
+def get_priority_rank(priority: Optional[str]) -> int:
+    """Get the numeric rank of a priority string (unknown priorities rank as normal)"""
+    return PRIORITY_RANKS.get(priority or TaskPriority.NORMAL.value, PRIORITY_RANKS[TaskPriority.NORMAL.value])
+
+class TaskLane(str, Enum):
+    """Worker lanes; task types in the same lane share its concurrency budget"""
+    CPU = "cpu"  # ffmpeg/Chromium rendering, bounded by the number of cores
+    IO = "io"    # LLM, TTS and network bound work, runs with high asyncio concurrency
+
 class TaskConfig(BaseModel):
     """Configuration for task processing"""
     max_attempts: int = 3
@@ -27,6 +44,9 @@ class TaskConfig(BaseModel):
     priority: TaskPriority = TaskPriority.NORMAL
     requires_credits: bool = True
     estimated_duration_minutes: Optional[int] = None
+    lane: TaskLane = TaskLane.IO
+    max_concurrency: Optional[int] = None  # Per-type cap inside its lane, None means the lane limit applies
+    supports_prefetch: bool = False  # Processor takes the lane's encode slot itself, so it can prepare ahead of it
 
 # Task type configurations
 TASK_CONFIGS: Dict[TaskType, TaskConfig] = {
@@ -35,56 +55,70 @@ TASK_CONFIGS: Dict[TaskType, TaskConfig] = {
         timeout_minutes=45,
         priority=TaskPriority.NORMAL,
         requires_credits=True,
-        estimated_duration_minutes=30
+        estimated_duration_minutes=30,
+        lane=TaskLane.CPU,
+        supports_prefetch=True
     ),
     TaskType.ANIMATED_LESSON: TaskConfig(
         max_attempts=3,
         timeout_minutes=30,
         priority=TaskPriority.NORMAL,
         requires_credits=True,
-        estimated_duration_minutes=20
+        estimated_duration_minutes=20,
+        lane=TaskLane.CPU
     ),
     TaskType.COURSE_VIDEO: TaskConfig(
         max_attempts=3,
         timeout_minutes=45,
         priority=TaskPriority.HIGH,
         requires_credits=True,
-        estimated_duration_minutes=35
+        estimated_duration_minutes=35,
+        lane=TaskLane.CPU
     ),
     TaskType.DOCUMENTATION: TaskConfig(
         max_attempts=2,
         timeout_minutes=15,
         priority=TaskPriority.NORMAL,
         requires_credits=False,
-        estimated_duration_minutes=10
+        estimated_duration_minutes=10,
+        lane=TaskLane.IO,
+        max_concurrency=8
     ),
     TaskType.QUIZ: TaskConfig(
         max_attempts=2,
         timeout_minutes=10,
         priority=TaskPriority.NORMAL,
         requires_credits=False,
-        estimated_duration_minutes=5
+        estimated_duration_minutes=5,
+        lane=TaskLane.IO,
+        max_concurrency=16
     ),
     TaskType.STORY_GENERATION: TaskConfig(
         max_attempts=2,
         timeout_minutes=10,
         priority=TaskPriority.NORMAL,
         requires_credits=True,
-        estimated_duration_minutes=5
+        estimated_duration_minutes=5,
+        lane=TaskLane.IO,
+        max_concurrency=16
     ),
     TaskType.IMAGE_GENERATION: TaskConfig(
         max_attempts=2,
         timeout_minutes=15,
         priority=TaskPriority.NORMAL,
         requires_credits=True,
-        estimated_duration_minutes=8
+        estimated_duration_minutes=8,
+        lane=TaskLane.IO,
+        max_concurrency=8
     ),
     TaskType.VOICE_GENERATION: TaskConfig(
         max_attempts=2,
         timeout_minutes=20,
         priority=TaskPriority.NORMAL,
         requires_credits=True,
-        estimated_duration_minutes=12
+        estimated_duration_minutes=12,
+        lane=TaskLane.IO,
+        max_concurrency=8
     )
 }
 
@@ -92,6 +126,10 @@ def get_task_config(task_type: TaskType) -> TaskConfig:
     """Get configuration for a specific task type"""
     return TASK_CONFIGS.get(task_type, TaskConfig())
 
+def get_lane_task_types(lane: TaskLane) -> List[TaskType]:
+    """Get the task types that run in a specific lane"""
+    return [task_type for task_type, config in TASK_CONFIGS.items() if config.lane == lane]
+
 def is_valid_task_type(task_type: str) -> bool:
     """Check if task type is valid"""
     try:
@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 from app.schemas.task import Task
 from app.models.task_types import TaskType, TaskConfig, get_task_config
 from app.services import task_service
+from app.services import duration_estimator
+from app.exceptions import TaskCancelledError
+from app.utils.cancellation import CancellationToken, EncodeSlot, checkpoint
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +18,20 @@ class BaseTaskProcessor(ABC):
         self.task_type = task_type
         self.config = get_task_config(task_type)
         self.logger = logging.getLogger(f"{self.__class__.__module__}.{self.__class__.__name__}")
+        self.cancel_token: Optional[CancellationToken] = None
+        # Only given to types with supports_prefetch: hold it for the CPU-bound phase of the run
+        self.encode_slot: Optional[EncodeSlot] = None
     
-    async def process_task(self, queue_item: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_task(
+        self,
+        queue_item: Dict[str, Any],
+        cancel_token: Optional[CancellationToken] = None,
+        encode_slot: Optional[EncodeSlot] = None
+    ) -> Dict[str, Any]:
         """Main processing method with common workflow"""
         task_id = queue_item["task_id"]
+        self.cancel_token = cancel_token
+        self.encode_slot = encode_slot
         
         try:
             self.logger.info(f"Starting {self.task_type} processing for task {task_id}")
@@ -36,18 +49,27 @@ class BaseTaskProcessor(ABC):
             validated_request = self.validate_request_data(request_data)
             
             # Execute the specific task processing
+            self.check_cancelled("execute")
             result = await self.execute_task(task_id, validated_request, queue_item)
             
             # Post-processing (cleanup, upload, etc.)
+            self.check_cancelled("post_process")
             final_result = await self.post_process(task_id, result, queue_item)
             
             self.logger.info(f"{self.task_type} task {task_id} completed successfully")
             return final_result
             
+        except TaskCancelledError:
+            self.logger.info(f"{self.task_type} task {task_id} cancelled")
+            raise
         except Exception as e:
             self.logger.error(f"Failed to process {self.task_type} task {task_id}: {e}")
             raise
     
+    def check_cancelled(self, stage: str) -> None:
+        """Cancellation checkpoint between processing stages"""
+        checkpoint(self.cancel_token, stage)
+    
     @abstractmethod
     def validate_request_data(self, request_data: Dict[str, Any]) -> Any:
         """Validate and parse the request data for this task type"""
@@ -63,11 +85,28 @@ class BaseTaskProcessor(ABC):
         # Default implementation - can be overridden by specific processors
         return result
     
+    def get_estimate_features(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Request features that drive the run time; runs with equal features share a learned duration"""
+        return {}
+    
+    def estimate_duration_minutes(self, request_data: Dict[str, Any]) -> Optional[float]:
+        """Static duration estimate, used until enough runs have been recorded"""
+        return self.config.estimated_duration_minutes
+    
+    async def estimate_duration_seconds(self, request_data: Dict[str, Any]) -> Optional[float]:
+        """Expected run time, learned from completed runs with the same features"""
+        prior_minutes = self.estimate_duration_minutes(request_data)
+        return await duration_estimator.estimate_duration_seconds(
+            self.task_type.value,
+            self.get_estimate_features(request_data),
+            prior_seconds=prior_minutes * 60 if prior_minutes else None
+        )
+    
     async def estimate_completion_time(self, request_data: Dict[str, Any]) -> Optional[datetime]:
-        """Estimate when this task will be completed"""
-        if self.config.estimated_duration_minutes:
-            from datetime import timedelta
-            return datetime.utcnow() + timedelta(minutes=self.config.estimated_duration_minutes)
+        """Estimate when this task will be completed if it starts now"""
+        duration_seconds = await self.estimate_duration_seconds(request_data)
+        if duration_seconds:
+            return datetime.utcnow() + timedelta(seconds=duration_seconds)
         return None
     
     def get_max_attempts(self) -> int:
@@ -1,4 +1,5 @@
 from typing import Dict, Any
+import asyncio
 from app.processors.base_processor import BaseTaskProcessor
 from app.models.task_types import TaskType
 import logging
@@ -12,111 +13,88 @@ class ImageGenerationProcessor(BaseTaskProcessor):
     def __init__(self):
         super().__init__(TaskType.IMAGE_GENERATION)
     
-    async def process_task(self, task_id: str, request_data: Dict[str, Any], user_id: str, account_id: str) -> Dict[str, Any]:
-        """
-        Process image generation task
-        """
-        try:
-            await task_service.add_task_event(
-                task_id=task_id,
-                message="Starting image generation...",
-                status="PROCESSING",
-                progress=10
-            )
-            
-            # Extract image generation parameters
-            prompt = request_data.get("prompt", "")
-            style = request_data.get("style", "realistic")
-            resolution = request_data.get("resolution", "1024x1024")
-            num_images = request_data.get("num_images", 1)
-            quality = request_data.get("quality", "standard")
-            
-            logger.info(f"Generating {num_images} image(s) with style: {style}, resolution: {resolution}")
-            
+    def validate_request_data(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate image generation request data"""
+        num_images = request_data.get("num_images", 1)
+        if not isinstance(num_images, int) or num_images < 1:
+            raise ValueError("num_images must be a positive integer")
+        return request_data
+    
+    async def execute_task(self, task_id: str, request: Dict[str, Any], queue_item: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute image generation"""
+        # Extract image generation parameters
+        prompt = request.get("prompt", "")
+        style = request.get("style", "realistic")
+        resolution = request.get("resolution", "1024x1024")
+        num_images = request.get("num_images", 1)
+        quality = request.get("quality", "standard")
+        
+        logger.info(f"Generating {num_images} image(s) with style: {style}, resolution: {resolution}")
+        
+        await task_service.add_task_event(
+            task_id=task_id,
+            message=f"Generating {num_images} image(s) using AI...",
+            progress=30
+        )
+        
+        # Placeholder for actual image generation
+        # In a real implementation, this would integrate with:
+        # - OpenAI DALL-E
+        # - Stability AI
+        # - Midjourney API
+        # - Local Stable Diffusion
+        
+        generated_images = []
+        for i in range(num_images):
+            self.check_cancelled(f"image {i + 1}")
             await task_service.add_task_event(
                 task_id=task_id,
-                message=f"Generating {num_images} image(s) using AI...",
-                status="PROCESSING",
-                progress=30
+                message=f"Generating image {i+1} of {num_images}...",
+                progress=30 + (50 * (i+1) / num_images)
             )
             
-            # Placeholder for actual image generation
-            # In a real implementation, this would integrate with:
-            # - OpenAI DALL-E
-            # - Stability AI
-            # - Midjourney API
-            # - Local Stable Diffusion
+            # Simulate image generation process
+            await asyncio.sleep(2)  # Simulate processing time
             
-            generated_images = []
-            for i in range(num_images):
-                await task_service.add_task_event(
-                    task_id=task_id,
-                    message=f"Generating image {i+1} of {num_images}...",
-                    status="PROCESSING",
-                    progress=30 + (50 * (i+1) / num_images)
-                )
-                
-                # Simulate image generation process
-                import asyncio
-                await asyncio.sleep(2)  # Simulate processing time
-                
-                # In real implementation, save generated image
-                image_filename = f"{task_id}_image_{i+1}.png"
-                image_path = f"tasks/{image_filename}"
-                
-                generated_images.append({
-                    "filename": image_filename,
-                    "path": image_path,
-                    "prompt": prompt,
-                    "style": style,
-                    "resolution": resolution,
-                    "index": i + 1
-                })
+            # In real implementation, save generated image
+            image_filename = f"{task_id}_image_{i+1}.png"
+            image_path = f"tasks/{image_filename}"
             
-            await task_service.add_task_event(
-                task_id=task_id,
-                message="Finalizing image generation...",
-                status="PROCESSING",
-                progress=90
-            )
-            
-            result = {
-                "task_id": task_id,
-                "generated_images": generated_images,
-                "metadata": {
-                    "prompt": prompt,
-                    "style": style,
-                    "resolution": resolution,
-                    "num_images": num_images,
-                    "quality": quality,
-                    "total_images": len(generated_images)
-                }
+            generated_images.append({
+                "filename": image_filename,
+                "path": image_path,
+                "prompt": prompt,
+                "style": style,
+                "resolution": resolution,
+                "index": i + 1
+            })
+        
+        return {
+            "task_id": task_id,
+            "generated_images": generated_images,
+            "metadata": {
+                "prompt": prompt,
+                "style": style,
+                "resolution": resolution,
+                "num_images": num_images,
+                "quality": quality,
+                "total_images": len(generated_images)
             }
-            
-            await task_service.add_task_event(
-                task_id=task_id,
-                message=f"Image generation completed: {len(generated_images)} images created",
-                status="COMPLETED",
-                progress=100
-            )
-            
-            return result
-            
-        except Exception as e:
-            error_msg = f"Image generation failed: {str(e)}"
-            logger.error(f"Image generation failed for task {task_id}: {e}")
-            
-            await task_service.add_task_event(
-                task_id=task_id,
-                message=error_msg,
-                status="FAILED",
-                progress=0
-            )
-            
-            raise Exception(error_msg)
+        }
+    
+    async def post_process(self, task_id: str, result: Dict[str, Any], queue_item: Dict[str, Any]) -> Dict[str, Any]:
+        """Mark the task completed with the generated images"""
+        images = result["generated_images"]
+        await task_service.set_task_completed(
+            task_id=task_id,
+            result_url=images[0]["path"] if images else "",
+            task_folder_content=result,
+            final_message=f"Image generation completed: {len(images)} images created"
+        )
+        return result
     
-    async def estimate_completion_time(self, request_data: Dict[str, Any]) -> int:
-        """Estimate completion time for image generation in minutes"""
+    def estimate_duration_minutes(self, request_data: Dict[str, Any]) -> int:
+        """Estimate the duration of image generation in minutes"""
         num_images = request_data.get("num_images", 1)
         quality = request_data.get("quality", "standard")
         
@@ -33,6 +33,17 @@ class VideoProcessor(BaseTaskProcessor):
             self.logger.error(f"Request data keys: {list(request_data.keys())}")
             raise
     
+    def get_estimate_features(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Render time grows with the scene count and resolution; intro/outro, logo, music and subtitles add encode passes"""
+        return {
+            "segments": request_data.get("segments", 3),
+            "resolution": request_data.get("resolution") or "1920*1080",
+            "intro_outro": bool(request_data.get("intro_video_url") or request_data.get("outro_video_url")),
+            "logo": bool(request_data.get("logo_url")),
+            "background_music": bool(request_data.get("background_music")),
+            "subtitles": bool(request_data.get("include_subtitles") or request_data.get("subtitle_enabled"))
+        }
+    
     async def execute_task(self, task_id: str, request: VideoGenerateRequest, queue_item: Dict[str, Any]) -> Dict[str, Any]:
         """Execute video generation"""
         print(f"🎬🎬🎬 VIDEO PROCESSOR: Starting video generation for task {task_id}")
@@ -41,7 +52,7 @@ class VideoProcessor(BaseTaskProcessor):
         self.logger.info(f"🎬 VIDEO PROCESSOR: Starting video generation for task {task_id} with theme: {getattr(request, 'theme', 'None')}, custom_colors: {getattr(request, 'custom_colors', 'None')}")
         
         # Generate the video
-        video_file_path = await generate_video(request, task_id)
+        video_file_path = await generate_video(request, task_id, cancel_token=self.cancel_token, encode_slot=self.encode_slot)
         local_task_dir = os.path.join(".", "tasks", task_id)
         
         if not os.path.isdir(local_task_dir):
@@ -20,7 +20,10 @@ class Task(BaseModel):
     task_type: Optional[str] = Field(default="video", description="Type of task (video, animated_lesson, documentation, quiz, etc.)")
     priority: Optional[str] = Field(default="normal", description="Task priority (low, normal, high, urgent)")
     status: str = Field(default="PENDING", description="Current status of the task (e.g., PENDING, PROCESSING, COMPLETED, FAILED)")
-    events: List[TaskEvent] = Field(default_factory=list, description="Chronological list of events that occurred during the task execution")
+    events: List[TaskEvent] = Field(default_factory=list, description="Recent events, only filled where requested (the full history is paginated via the events endpoint)")
+    last_event_message: Optional[str] = Field(default=None, description="Message of the latest event")
+    last_event_at: Optional[datetime] = Field(default=None, description="Time of the latest event")
+    event_count: int = Field(default=0, description="Number of events recorded for the task")
     progress: Optional[float] = Field(default=0.0, ge=0, le=100, description="Overall task progress percentage")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -33,12 +36,42 @@ class Task(BaseModel):
     task_source_name: Optional[str] = Field(default=None, description="Name of the source that created the task")
     task_source_id: Optional[str] = Field(default=None, description="Identifier of the source that created the task")
     task_source_group_id: Optional[str] = Field(default=None, description="Group identifier for related tasks")
+    archived_at: Optional[datetime] = Field(default=None, description="When the task's history moved to the archive (listings only carry a summary)")
 
     model_config = {
         "populate_by_name": True,
         "json_encoders": {datetime: lambda dt: dt.isoformat()}
     }
 
+class TaskStatusView(BaseModel):
+    """Fields needed to poll a task (view=status of the task listing)"""
+    task_id: str
+    status: str = "PENDING"
+    progress: Optional[float] = 0.0
+    last_event_message: Optional[str] = None
+    updated_at: Optional[datetime] = None
+    estimated_completion: Optional[datetime] = None
+    result_url: Optional[str] = None
+    error_message: Optional[str] = None
+
+    model_config = {
+        "json_encoders": {datetime: lambda dt: dt.isoformat()}
+    }
+
+class TaskSummary(TaskStatusView):
+    """Task without request data, folder content and error details (view=summary of the task listing)"""
+    user_id: Optional[str] = None
+    account_id: Optional[str] = None
+    task_type: Optional[str] = "video"
+    priority: Optional[str] = "normal"
+    last_event_at: Optional[datetime] = None
+    event_count: int = 0
+    created_at: Optional[datetime] = None
+    task_source_name: Optional[str] = None
+    task_source_id: Optional[str] = None
+    task_source_group_id: Optional[str] = None
+    archived_at: Optional[datetime] = None
+
 class TaskCreate(BaseModel):
     task_id: Optional[str] = Field(default=None, description="Unique identifier for the task. If not provided, will be auto-generated.")
     task_type: Optional[str] = Field(default="video", description="Type of task")
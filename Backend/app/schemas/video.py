@@ -326,6 +326,7 @@ class VideoGenerateRequest(VideoParams):
     custom_colors: Optional[CustomColors] = Field(default=None, description="Custom theme colors (only used when theme is 'custom')")
     video_language: Optional[str] = Field(default=None, description="Video language")
     subtitle_enabled: Optional[bool] = Field(default=False, description="Enable subtitles")
+    background_music: bool = Field(default=False, description="Whether to mix background music under the narration (uses bgm_file and bgm_volume)")
 
 class VideoGenerateData(BaseModel):
     task_id: str
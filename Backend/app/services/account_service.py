@@ -1,5 +1,7 @@
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from app.db.mongodb_utils import get_collection
 from app.schemas.account import (
     Account, 
@@ -20,6 +22,33 @@ from sendgrid import SendGridAPIClient # Added
 from sendgrid.helpers.mail import Mail # Added
 from app.config import get_settings # Added
 
+# Account access granted to recent status polls, (account_id, user_id or None for API keys) -> expiry.
+# Kept for task_cache_ttl_seconds and dropped when a member leaves, so polls skip the account lookup.
+_account_access_cache: "OrderedDict[Tuple[str, Optional[str]], float]" = OrderedDict()
+
+def is_account_access_cached(account_id: str, user_id: Optional[str]) -> bool:
+    expires_at = _account_access_cache.get((account_id, user_id))
+    if expires_at is None:
+        return False
+    if expires_at <= time.monotonic():
+        _account_access_cache.pop((account_id, user_id), None)
+        return False
+    return True
+
+def cache_account_access(account_id: str, user_id: Optional[str]) -> None:
+    settings = get_settings()
+    if settings.task_cache_size <= 0 or settings.task_cache_ttl_seconds <= 0:
+        return
+    _account_access_cache.pop((account_id, user_id), None)
+    _account_access_cache[(account_id, user_id)] = time.monotonic() + settings.task_cache_ttl_seconds
+    while len(_account_access_cache) > settings.task_cache_size:
+        _account_access_cache.popitem(last=False)
+
+def forget_account_access(account_id: str, user_id: Optional[str] = None) -> None:
+    """Drop cached access to an account, of one user or of everyone"""
+    for key in [key for key in _account_access_cache if key[0] == account_id and (user_id is None or key[1] == user_id)]:
+        _account_access_cache.pop(key, None)
+
 class AccountService:
     async def _get_user_by_email(self, email: str) -> Optional[User]:
         users_collection = await get_collection("users")
@@ -492,6 +521,8 @@ class AccountService:
                 detail="Failed to remove member. Please try again."
             )
         
+        forget_account_access(account_id, member_user_id_to_remove)
+        
         action_type = "removed" if is_owner_action and not is_self_removal else "left"
         logger.info(f"Member {member_to_remove.email} (ID: {member_user_id_to_remove}) has {action_type} account {account.name} (ID: {account_id}). Action by: {current_user.email}")
         return {"message": f"Member {action_type} successfully."}
@@ -6,6 +6,7 @@ from loguru import logger
 from app.models.api_key import APIKey
 from app.schemas.api_key import APIKeyCreate, APIKeyResponse, APIKeyWithToken
 from app.db.mongodb_utils import get_collection
+from app.services.account_service import forget_account_access
 
 class APIKeyService:
     """Service for managing API keys"""
@@ -108,6 +109,7 @@ class APIKeyService:
                     detail="API key not found"
                 )
             
+            forget_account_access(account_id)
             logger.info(f"Revoked API key {api_key_id} for account {account_id}")
             return True
             
@@ -175,6 +177,7 @@ class APIKeyService:
                     detail="API key not found"
                 )
             
+            forget_account_access(account_id)
             logger.info(f"Deleted API key {api_key_id} for account {account_id}")
             return True
             
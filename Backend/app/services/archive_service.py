@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.db.mongodb_utils import get_collection
+from app.config import get_settings
+from app.services.task_service import (
+    TASKS_COLLECTION, TASKS_ARCHIVE_COLLECTION, TASK_EVENTS_COLLECTION, ARCHIVED_TASK_FIELDS, merge_archived_task
+)
+
+logger = logging.getLogger(__name__)
+
+TASK_QUEUE_COLLECTION = "task_queue"
+TASK_QUEUE_ARCHIVE_COLLECTION = "task_queue_archive"
+
+TERMINAL_STATUSES = ["COMPLETED", "FAILED", "CANCELLED"]
+ARCHIVE_BATCH_SIZE = 500
+
+
+async def archive_finished_tasks(older_than_days: Optional[int] = None) -> Dict[str, int]:
+    """
+    Move finished tasks and queue items older than task_archive_after_days to the archive collections.
+
+    A task keeps a compact summary in the hot collection (status, progress, result_url, source fields, ...)
+    while its events, request_data and task_folder_content move to tasks_archive; get_task merges them back.
+    Finished queue items are moved entirely. Archived tasks past task_archive_retention_days are purged
+    together with their event log. Safe to run concurrently from several workers.
+    """
+    days = older_than_days if older_than_days is not None else get_settings().task_archive_after_days
+    result = {"tasks_archived": 0, "queue_items_archived": 0, "tasks_purged": 0}
+    if days > 0:
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        result["tasks_archived"] = await _archive_tasks(cutoff)
+        result["queue_items_archived"] = await _archive_queue_items(cutoff)
+    retention_days = get_settings().task_archive_retention_days
+    if retention_days > 0:
+        result["tasks_purged"] = await _purge_archived_tasks(datetime.utcnow() - timedelta(days=retention_days))
+    return result
+
+
+async def _archive_tasks(cutoff: datetime) -> int:
+    tasks = await get_collection(TASKS_COLLECTION)
+    archive = await get_collection(TASKS_ARCHIVE_COLLECTION)
+    archived = 0
+
+    while True:
+        # Not archived yet, or re-run (regenerated) since it was archived
+        batch = await tasks.find({
+            "status": {"$in": TERMINAL_STATUSES},
+            "updated_at": {"$lt": cutoff},
+            "$or": [
+                {"archived_at": None},
+                {"$expr": {"$gt": ["$updated_at", "$archived_at"]}}
+            ]
+        }).limit(ARCHIVE_BATCH_SIZE).to_list(length=ARCHIVE_BATCH_SIZE)
+        if not batch:
+            break
+
+        previous = {
+            doc["task_id"]: doc
+            async for doc in archive.find({"task_id": {"$in": [task["task_id"] for task in batch]}})
+        }
+        now = datetime.utcnow()
+        archive_ops: List[ReplaceOne] = []
+        summary_ops: List[UpdateOne] = []
+        for task in batch:
+            full_task = merge_archived_task(task, previous.get(task["task_id"]))
+            full_task.pop("_id", None)
+            full_task["archived_at"] = now
+            archive_ops.append(ReplaceOne({"task_id": task["task_id"]}, full_task, upsert=True))
+
+            summary = {"archived_at": now}
+            # Tasks from before the event log carry their history embedded; keep its latest event in the summary
+            events = task.get("events") or []
+            if events and not task.get("last_event_message"):
+                summary.update({
+                    "event_count": len(events),
+                    "last_event_message": events[-1].get("message"),
+                    "last_event_at": events[-1].get("timestamp")
+                })
+            summary_ops.append(UpdateOne(
+                # Skip the task if it changed after it was read; the next sweep picks it up again
+                {"task_id": task["task_id"], "updated_at": task["updated_at"]},
+                {"$set": summary, "$unset": {field: "" for field in ARCHIVED_TASK_FIELDS}}
+            ))
+
+        await archive.bulk_write(archive_ops, ordered=False)
+        result = await tasks.bulk_write(summary_ops, ordered=False)
+        archived += result.modified_count
+        if len(batch) < ARCHIVE_BATCH_SIZE or not result.modified_count:
+            break
+
+    if archived:
+        logger.info(f"Archived {archived} finished tasks")
+    return archived
+
+
+async def _archive_queue_items(cutoff: datetime) -> int:
+    queue = await get_collection(TASK_QUEUE_COLLECTION)
+    archive = await get_collection(TASK_QUEUE_ARCHIVE_COLLECTION)
+    archived = 0
+
+    while True:
+        batch = await queue.find({
+            "status": {"$in": TERMINAL_STATUSES},
+            "$or": [
+                {"finished_at": {"$lt": cutoff}},
+                # Items finished before finished_at was recorded
+                {"finished_at": None, "updated_at": {"$lt": cutoff}}
+            ]
+        }).limit(ARCHIVE_BATCH_SIZE).to_list(length=ARCHIVE_BATCH_SIZE)
+        if not batch:
+            break
+
+        now = datetime.utcnow()
+        # Keep the hot _id so a sweep interrupted between the insert and the delete doesn't duplicate items
+        try:
+            await archive.insert_many([{**item, "archived_at": now} for item in batch], ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+        result = await queue.delete_many({
+            "_id": {"$in": [item["_id"] for item in batch]},
+            "status": {"$in": TERMINAL_STATUSES}
+        })
+        archived += result.deleted_count
+        if len(batch) < ARCHIVE_BATCH_SIZE or not result.deleted_count:
+            break
+
+    if archived:
+        logger.info(f"Archived {archived} finished queue items")
+    return archived
+
+
+async def _purge_archived_tasks(cutoff: datetime) -> int:
+    """
+    Delete archive entries archived before the cutoff and the events of their tasks. The TTL index on
+    archived_at is only a backstop; the task_events TTL never outlives it (see create_indexes).
+    """
+    archive = await get_collection(TASKS_ARCHIVE_COLLECTION)
+    events = await get_collection(TASK_EVENTS_COLLECTION)
+    purged = 0
+
+    while True:
+        batch = await archive.find(
+            {"archived_at": {"$lt": cutoff}},
+            {"task_id": 1}
+        ).limit(ARCHIVE_BATCH_SIZE).to_list(length=ARCHIVE_BATCH_SIZE)
+        if not batch:
+            break
+
+        # Events first: an interrupted sweep leaves the archive entry, so the next one finds its events again
+        await events.delete_many({"task_id": {"$in": [entry["task_id"] for entry in batch]}})
+        result = await archive.delete_many({"_id": {"$in": [entry["_id"] for entry in batch]}})
+        purged += result.deleted_count
+        if len(batch) < ARCHIVE_BATCH_SIZE or not result.deleted_count:
+            break
+
+    if purged:
+        logger.info(f"Purged {purged} archived tasks and their events")
+    return purged
@@ -4,6 +4,7 @@ import asyncio
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 from loguru import logger
+from pymongo import UpdateOne
 
 from app.services.llm import LLMService
 from app.services.task_service import TaskService
@@ -456,10 +457,11 @@ Generate the course structure now.
         
         # Update course status
         await self.update_course(course_id, CourseUpdate(status=CourseStatus.GENERATING), account_id)
-          # Create tasks for each lesson
-        tasks = []
+        # Build one task per lesson, then create and enqueue them in batches instead of per lesson
+        lesson_requests = []
         for chapter in chapters_to_process:
-            for lesson in chapter.lessons:                # Create a video generation request for the lesson
+            for lesson in chapter.lessons:
+                # Create a video generation request for the lesson
                 video_request = VideoGenerateRequest(
                     title=lesson.title,
                     script=lesson.content,
@@ -467,63 +469,63 @@ Generate the course structure now.
                     story_prompt=lesson.title,  # Using lesson title as the story prompt as a fallback
                     resolution="1920*1080"  # Set default resolution to Full HD for better quality
                 )
-                
-                # Create a task for video generation
-                task_id = str(uuid.uuid4())
-                task_create_data = TaskCreate( 
-                    task_id=task_id,
-                    user_id=user_id,
-                    account_id=account_id,
-                    task_type="video_generation", 
-                    request_data=video_request.model_dump() 
-                )
-                
-                try:
-                    task = await self.task_service.create_task(
-                        task_id=task_id,
-                        user_id=user_id,
-                        account_id=account_id,
-                        initial_status=TaskStatus.PENDING,
-                        request_data=task_create_data.model_dump()
-                    )
-
-                    await self.task_service.add_task_event(
-                        task_id=task_id, 
-                        message=f"Video generation request received.", 
-                        status="PENDING", 
-                        progress=0
-                    )
-                      # Add to processing queue
-                    await task_queue_service.add_to_queue(
+                lesson_requests.append((lesson, str(uuid.uuid4()), video_request.model_dump()))
+        
+        tasks = []
+        if not lesson_requests:
+            logger.info(f"No lessons to generate for course {course_id}")
+            return tasks
+        
+        try:
+            tasks_data = [
+                {
+                    "task_id": task_id,
+                    "task_type": TaskType.VIDEO.value,
+                    "request_data": TaskCreate(
                         task_id=task_id,
-                        request_data=video_request.model_dump(),  # Pass serialized request data
-                        user_id=user_id,
-                        account_id=account_id,
-                        task_type=TaskType.VIDEO.value
-                    )
-                    
-                    if task:
-                        # Update the lesson in the database with the task_id
-                        await self.collection.update_one(
-                            {"id": course_id, "chapters.lessons.id": lesson.id},
-                            {"$set": {"chapters.$[].lessons.$[j].task_id": task.task_id}},
-                            array_filters=[{"j.id": lesson.id}]
-                        )
-                        
-                        tasks.append(task)
-                        logger.info(f"Created task {task.task_id} for lesson {lesson.id}")
-                    else:
-                        logger.error(f"Failed to create task for lesson {lesson.id}")
-                        
-                except Exception as e:
-                    logger.error(f"Error creating task for lesson {lesson.id}: {e}")
-
+                        task_type="video_generation",
+                        request_data=request_data
+                    ).model_dump()
+                }
+                for _, task_id, request_data in lesson_requests
+            ]
+            tasks, _ = await self.task_service.insert_bulk_tasks(tasks_data, user_id, account_id)
+            
+            await self.task_service.add_task_events_bulk([
+                {"task_id": task.task_id, "message": "Video generation request received.", "status": "PENDING", "progress": 0}
+                for task in tasks
+            ])
+            
+            # Add to processing queue
+            queue_result = await task_queue_service.add_many_to_queue(
+                tasks=[
+                    {"task_id": task_id, "task_type": TaskType.VIDEO.value, "request_data": request_data}
+                    for _, task_id, request_data in lesson_requests
+                ],
+                user_id=user_id,
+                account_id=account_id
+            )
+            for task_id, error in queue_result["failed"].items():
+                logger.error(f"Failed to queue lesson task {task_id}: {error}")
+            
+            # Update the lessons in the database with their task_id
+            await self.collection.bulk_write([
+                UpdateOne(
+                    {"id": course_id, "chapters.lessons.id": lesson.id},
+                    {"$set": {"chapters.$[].lessons.$[j].task_id": task_id}},
+                    array_filters=[{"j.id": lesson.id}]
+                )
+                for lesson, task_id, _ in lesson_requests
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Error creating lesson tasks for course {course_id}: {e}")
+        
         logger.info(f"Created {len(tasks)} lesson generation tasks for course {course_id}")
           # Ensure queue processing is started after creating all tasks
         if tasks:
             try:
                 logger.info("Ensuring task queue processing is started...")
-                await task_queue_service.start_processing()
+                await task_queue_service.ensure_processing()
                   # Check queue status for debugging
                 queue_status = await task_queue_service.get_queue_status()
                 logger.info(f"Queue status after course lesson generation: {queue_status}")
@@ -0,0 +1,90 @@
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+from app.db.mongodb_utils import get_collection
+
+logger = logging.getLogger(__name__)
+
+# Learned run times per task type and feature key (e.g. video segments/resolution/intro-outro).
+# Each document keeps an exponentially weighted mean so the estimate follows changes in hardware and providers.
+TASK_DURATION_STATS_COLLECTION = "task_duration_stats"
+
+TYPE_WIDE_KEY = "*"
+EWMA_ALPHA = 0.2
+MIN_SAMPLES = 3
+CACHE_SECONDS = 60
+
+# (task_type, feature_key) -> (loaded_at, stats document or None)
+_stats_cache: Dict[Tuple[str, str], Tuple[float, Optional[Dict[str, Any]]]] = {}
+
+
+def feature_key(features: Optional[Dict[str, Any]]) -> str:
+    """Stable key of a feature set: "intro_outro=True|resolution=1920*1080|segments=5" """
+    if not features:
+        return TYPE_WIDE_KEY
+    return "|".join(f"{name}={features[name]}" for name in sorted(features))
+
+
+async def record_duration(task_type: str, features: Optional[Dict[str, Any]], seconds: float) -> None:
+    """Learn from a completed run (both the exact feature key and the type-wide entry)"""
+    if seconds is None or seconds <= 0:
+        return
+    keys = {TYPE_WIDE_KEY, feature_key(features)}
+    try:
+        collection = await get_collection(TASK_DURATION_STATS_COLLECTION)
+        for key in keys:
+            # Pipeline update: the first sample seeds the mean, later ones move it by EWMA_ALPHA
+            await collection.update_one(
+                {"_id": f"{task_type}:{key}"},
+                [{
+                    "$set": {
+                        "task_type": task_type,
+                        "feature_key": key,
+                        "features": {"$literal": features if key != TYPE_WIDE_KEY else {}},
+                        "count": {"$add": [{"$ifNull": ["$count", 0]}, 1]},
+                        "sum_seconds": {"$add": [{"$ifNull": ["$sum_seconds", 0]}, seconds]},
+                        "ewma_seconds": {
+                            "$cond": [
+                                {"$gt": [{"$ifNull": ["$count", 0]}, 0]},
+                                {"$add": [{"$multiply": [EWMA_ALPHA, seconds]}, {"$multiply": [1 - EWMA_ALPHA, "$ewma_seconds"]}]},
+                                seconds
+                            ]
+                        },
+                        "updated_at": datetime.utcnow()
+                    }
+                }],
+                upsert=True
+            )
+            _stats_cache.pop((task_type, key), None)
+    except Exception as e:
+        logger.warning(f"Failed to record run duration of {task_type}: {e}")
+
+
+async def _get_stats(task_type: str, key: str) -> Optional[Dict[str, Any]]:
+    cached = _stats_cache.get((task_type, key))
+    if cached and time.monotonic() - cached[0] < CACHE_SECONDS:
+        return cached[1]
+    collection = await get_collection(TASK_DURATION_STATS_COLLECTION)
+    stats = await collection.find_one({"_id": f"{task_type}:{key}"})
+    _stats_cache[(task_type, key)] = (time.monotonic(), stats)
+    return stats
+
+
+async def estimate_duration_seconds(
+    task_type: str,
+    features: Optional[Dict[str, Any]] = None,
+    prior_seconds: Optional[float] = None
+) -> Optional[float]:
+    """
+    Expected run time: the learned mean for these exact features, else the type-wide mean
+    (once MIN_SAMPLES runs were seen), else the processor's static prior.
+    """
+    try:
+        for key in (feature_key(features), TYPE_WIDE_KEY):
+            stats = await _get_stats(task_type, key)
+            if stats and stats.get("count", 0) >= MIN_SAMPLES and stats.get("ewma_seconds"):
+                return float(stats["ewma_seconds"])
+    except Exception as e:
+        logger.warning(f"Failed to load run duration stats of {task_type}: {e}")
+    return prior_seconds
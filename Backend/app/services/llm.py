@@ -27,6 +27,8 @@ from app.services.upload_service import upload_file_to_s3, generate_unique_objec
 
 settings = get_settings()
 
+# Upper bound for each Chromium step of a markdown render (launch, navigation, screenshot)
+MARKDOWN_RENDER_TIMEOUT_MS = 60000
 
 openai_client = None
 if settings.openai_api_key:
@@ -265,17 +267,22 @@ class LLMService:
         
         try:
             # Use synchronous Playwright in a thread to render mermaid
+            # The render thread can't be cancelled from the event loop, so bound every browser step
+            # and always close Chromium, otherwise a hung page outlives the task's timeout
             def _render():
                 with sync_playwright() as p:
-                    browser = p.chromium.launch(headless=True)
-                    page = browser.new_page()
-                    page.set_viewport_size({"width": width, "height": height})
-                    # Navigate and wait until network is idle (all scripts loaded)
-                    page.goto(f"file://{temp_html_path}", wait_until="networkidle")
-                    # Give extra time for mermaid diagrams and syntax highlighting to complete
-                    page.wait_for_timeout(1000)
-                    page.screenshot(path=output_path, full_page=True)
-                    browser.close()
+                    browser = p.chromium.launch(headless=True, timeout=MARKDOWN_RENDER_TIMEOUT_MS)
+                    try:
+                        page = browser.new_page()
+                        page.set_default_timeout(MARKDOWN_RENDER_TIMEOUT_MS)
+                        page.set_viewport_size({"width": width, "height": height})
+                        # Navigate and wait until network is idle (all scripts loaded)
+                        page.goto(f"file://{temp_html_path}", wait_until="networkidle")
+                        # Give extra time for mermaid diagrams and syntax highlighting to complete
+                        page.wait_for_timeout(1000)
+                        page.screenshot(path=output_path, full_page=True)
+                    finally:
+                        browser.close()
 
             loop = asyncio.get_event_loop()
             await loop.run_in_executor(None, _render)
@@ -0,0 +1,219 @@
+import logging
+from datetime import timezone
+from typing import Dict, Any, List, Optional
+from app.db.mongodb_utils import get_collection
+from app.models.task_types import TaskType, get_task_config, is_valid_task_type
+
+logger = logging.getLogger(__name__)
+
+# Fleet-wide counters and histograms; every worker $inc's the same documents, so values are monotonic
+# across processes and restarts and can be exported as Prometheus counters
+QUEUE_METRICS_COLLECTION = "task_queue_metrics"
+
+# Histogram upper bounds in seconds
+WAIT_BUCKETS = [1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200]
+SERVICE_BUCKETS = [5, 15, 30, 60, 120, 300, 600, 900, 1800, 2700, 3600]
+STAGE_BUCKETS = [1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800]
+
+HISTOGRAMS = {
+    "wait": ("task_queue_wait_seconds", "Time items spent queued before a worker started them", WAIT_BUCKETS),
+    "service": ("task_queue_service_seconds", "Processing time of an attempt, from start to its outcome", SERVICE_BUCKETS),
+    "stage": ("task_queue_stage_seconds", "Time spent in a processing stage", STAGE_BUCKETS),
+}
+
+COUNTERS = {
+    "enqueued": "Items added to the queue",
+    "started": "Attempts started by a worker",
+    "completed": "Items completed",
+    "failed": "Items failed permanently",
+    "retried": "Failed attempts scheduled for retry",
+    "timed_out": "Attempts stopped by their task type timeout",
+    "cancelled": "Items cancelled",
+    "lease_expired": "Attempts reclaimed after their worker stopped heartbeating",
+    "deduplicated": "Items attached to an identical in-flight request",
+    "handed_off": "Running items returned to the queue by a draining worker",
+}
+
+# Per-process counters of the task status cache
+TASK_CACHE_COUNTERS = {
+    "hits": "Task status polls answered from the cache",
+    "misses": "Task status polls read from MongoDB",
+    "invalidations": "Cached task snapshots dropped after a write",
+}
+
+
+def _bucket_key(bound: float) -> str:
+    return f"le_{bound}"
+
+
+def _lane_of(task_type: str) -> str:
+    if is_valid_task_type(task_type):
+        return get_task_config(TaskType(task_type)).lane.value
+    return "unknown"
+
+
+async def increment(task_type: str, counter: str, amount: int = 1) -> None:
+    """Increment a fleet-wide counter of a task type"""
+    try:
+        collection = await get_collection(QUEUE_METRICS_COLLECTION)
+        await collection.update_one(
+            {"_id": f"counter:{counter}:{task_type}"},
+            {
+                "$inc": {"value": amount},
+                "$setOnInsert": {"kind": "counter", "name": counter, "task_type": task_type}
+            },
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record queue metric {counter} for {task_type}: {e}")
+
+
+async def observe(histogram: str, task_type: str, seconds: float, stage: Optional[str] = None) -> None:
+    """Record one observation in a fleet-wide histogram of a task type (and stage)"""
+    if seconds is None or seconds < 0:
+        return
+    _, _, buckets = HISTOGRAMS[histogram]
+    increments: Dict[str, Any] = {"count": 1, "sum": seconds}
+    for bound in buckets:
+        if seconds <= bound:
+            # Store the non-cumulative bucket; the exporter accumulates
+            increments[f"buckets.{_bucket_key(bound)}"] = 1
+            break
+    try:
+        collection = await get_collection(QUEUE_METRICS_COLLECTION)
+        key = f"hist:{histogram}:{task_type}" + (f":{stage}" if stage else "")
+        await collection.update_one(
+            {"_id": key},
+            {
+                "$inc": increments,
+                "$setOnInsert": {"kind": "histogram", "name": histogram, "task_type": task_type, "stage": stage}
+            },
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"Failed to record queue histogram {histogram} for {task_type}: {e}")
+
+
+async def observe_stages(task_type: str, stage_timings: Dict[str, float]) -> None:
+    for stage, seconds in stage_timings.items():
+        await observe("stage", task_type, seconds, stage=stage)
+
+
+def _labels(**labels: Any) -> str:
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+async def render_prometheus(
+    queue_collection,
+    local_lanes: Dict[str, Dict[str, Any]],
+    worker_id: str,
+    autoscaling: Optional[Dict[str, Dict[str, Any]]] = None,
+    task_cache: Optional[Dict[str, Any]] = None
+) -> str:
+    """Render queue gauges, counters and histograms in the Prometheus text exposition format"""
+    lines: List[str] = []
+
+    # Current queue depth per status and type (served by the status/task_type index)
+    lines.append("# HELP task_queue_items Items currently in the queue by status")
+    lines.append("# TYPE task_queue_items gauge")
+    pipeline = [
+        {"$match": {"status": {"$in": ["QUEUED", "PROCESSING", "CANCELLING", "RETRY_SCHEDULED", "FOLLOWING"]}}},
+        {"$group": {"_id": {"status": "$status", "task_type": "$task_type"}, "count": {"$sum": 1}}}
+    ]
+    async for doc in queue_collection.aggregate(pipeline):
+        task_type = doc["_id"].get("task_type") or "unknown"
+        lines.append(
+            f"task_queue_items{_labels(status=doc['_id'].get('status'), task_type=task_type, lane=_lane_of(task_type))} {doc['count']}"
+        )
+
+    # Age of the oldest queued item per type, the most direct signal of an under-provisioned lane
+    lines.append("# HELP task_queue_oldest_queued_timestamp_seconds Enqueue time of the oldest queued item")
+    lines.append("# TYPE task_queue_oldest_queued_timestamp_seconds gauge")
+    pipeline = [
+        {"$match": {"status": "QUEUED"}},
+        {"$group": {"_id": "$task_type", "oldest": {"$min": {"$ifNull": ["$queued_at", "$created_at"]}}}}
+    ]
+    async for doc in queue_collection.aggregate(pipeline):
+        if doc.get("oldest"):
+            task_type = doc["_id"] or "unknown"
+            oldest = doc["oldest"] if doc["oldest"].tzinfo else doc["oldest"].replace(tzinfo=timezone.utc)
+            timestamp = oldest.timestamp()
+            lines.append(f"task_queue_oldest_queued_timestamp_seconds{_labels(task_type=task_type, lane=_lane_of(task_type))} {timestamp}")
+
+    # Slots of this worker process (each family's samples directly follow its own HELP/TYPE)
+    lines.append("# HELP task_queue_worker_lane_slots Concurrency slots of this worker process per lane")
+    lines.append("# TYPE task_queue_worker_lane_slots gauge")
+    for lane, lane_status in local_lanes.items():
+        lines.append(f"task_queue_worker_lane_slots{_labels(lane=lane, worker=worker_id)} {lane_status['limit']}")
+    lines.append("# HELP task_queue_worker_lane_active Tasks running in this worker process per lane")
+    lines.append("# TYPE task_queue_worker_lane_active gauge")
+    for lane, lane_status in local_lanes.items():
+        lines.append(f"task_queue_worker_lane_active{_labels(lane=lane, worker=worker_id)} {lane_status['active']}")
+
+    # Autoscaling recommendation per lane (see TaskQueueService.get_autoscaling_hints)
+    if autoscaling:
+        lines.append("# HELP task_queue_desired_workers Recommended worker count per lane")
+        lines.append("# TYPE task_queue_desired_workers gauge")
+        for lane, hint in autoscaling.items():
+            lines.append(f"task_queue_desired_workers{_labels(lane=lane)} {hint['desired_workers']}")
+        lines.append("# HELP task_queue_queued_work_seconds Estimated run time of all waiting items per lane")
+        lines.append("# TYPE task_queue_queued_work_seconds gauge")
+        for lane, hint in autoscaling.items():
+            lines.append(f"task_queue_queued_work_seconds{_labels(lane=lane)} {hint['queued_work_seconds']}")
+        lines.append("# HELP task_queue_drain_per_minute Items finished per minute over the autoscaling window")
+        lines.append("# TYPE task_queue_drain_per_minute gauge")
+        for lane, hint in autoscaling.items():
+            lines.append(f"task_queue_drain_per_minute{_labels(lane=lane)} {_format_value(float(hint['drain_per_minute']))}")
+
+    # Task status cache of this process (see task_cache)
+    if task_cache:
+        for name, description in TASK_CACHE_COUNTERS.items():
+            lines.append(f"# HELP task_status_cache_{name}_total {description}")
+            lines.append(f"# TYPE task_status_cache_{name}_total counter")
+            lines.append(f"task_status_cache_{name}_total{_labels(worker=worker_id)} {task_cache[name]}")
+        lines.append("# HELP task_status_cache_entries Tasks with cached snapshots")
+        lines.append("# TYPE task_status_cache_entries gauge")
+        lines.append(f"task_status_cache_entries{_labels(worker=worker_id)} {task_cache['size']}")
+    
+    metrics_collection = await get_collection(QUEUE_METRICS_COLLECTION)
+    counters: Dict[str, List[Dict[str, Any]]] = {}
+    histograms: Dict[str, List[Dict[str, Any]]] = {}
+    async for doc in metrics_collection.find({}):
+        if doc.get("kind") == "counter":
+            counters.setdefault(doc["name"], []).append(doc)
+        elif doc.get("kind") == "histogram":
+            histograms.setdefault(doc["name"], []).append(doc)
+
+    for counter, description in COUNTERS.items():
+        metric = f"task_queue_{counter}_total"
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        for doc in counters.get(counter, []):
+            lines.append(f"{metric}{_labels(task_type=doc['task_type'], lane=_lane_of(doc['task_type']))} {doc.get('value', 0)}")
+
+    for histogram, (metric, description, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} histogram")
+        for doc in histograms.get(histogram, []):
+            labels = {"task_type": doc["task_type"], "lane": _lane_of(doc["task_type"])}
+            if doc.get("stage"):
+                labels["stage"] = doc["stage"]
+            stored = doc.get("buckets", {})
+            cumulative = 0
+            for bound in buckets:
+                cumulative += stored.get(_bucket_key(bound), 0)
+                lines.append(f"{metric}_bucket{_labels(**labels, le=bound)} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels(**labels, le='+Inf')} {doc.get('count', 0)}")
+            lines.append(f"{metric}_sum{_labels(**labels)} {_format_value(doc.get('sum', 0))}")
+            lines.append(f"{metric}_count{_labels(**labels)} {doc.get('count', 0)}")
+
+    return "\n".join(lines) + "\n"
+
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable
+from pymongo.errors import OperationFailure
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStatusCache:
+    """
+    Per-process TTL + LRU cache of task status snapshots for polling clients.
+
+    Entries are keyed by task_id, each holding the snapshots of one task (e.g. one per events_limit).
+    Writes through the task service invalidate the task in this process; other processes' writes are
+    seen through a change stream on the tasks collection, or after task_cache_ttl_seconds without one.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Task document _id -> task_id, to map change stream events (which only carry the _id) to entries
+        self._task_ids_by_doc_id: Dict[Any, str] = {}
+        # Last invalidation per task, so a read that raced with a write doesn't cache the old state
+        self._invalidated_at: "OrderedDict[str, float]" = OrderedDict()
+        self._forgotten_before = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def max_size(self) -> int:
+        return get_settings().task_cache_size
+
+    @property
+    def ttl_seconds(self) -> float:
+        return get_settings().task_cache_ttl_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, task_id: str, variant: Hashable = None) -> Optional[Any]:
+        entry = self._entries.get(task_id) if self.enabled else None
+        if entry and entry["expires_at"] > time.monotonic() and variant in entry["snapshots"]:
+            self._entries.move_to_end(task_id)
+            self.hits += 1
+            return entry["snapshots"][variant]
+        if entry and entry["expires_at"] <= time.monotonic():
+            self._remove(task_id)
+        self.misses += 1
+        return None
+
+    def put(self, task_id: str, snapshot: Any, read_started: float, variant: Hashable = None, doc_id: Any = None) -> None:
+        """Cache a snapshot read at read_started (time.monotonic()), unless the task changed since"""
+        if not self.enabled or read_started <= self._forgotten_before:
+            return
+        if self._invalidated_at.get(task_id, 0.0) >= read_started:
+            return
+        entry = self._entries.get(task_id)
+        if entry is None:
+            entry = {"snapshots": {}, "expires_at": read_started + self.ttl_seconds, "doc_id": doc_id}
+            self._entries[task_id] = entry
+        entry["snapshots"][variant] = snapshot
+        entry["expires_at"] = min(entry["expires_at"], read_started + self.ttl_seconds)
+        if doc_id is not None:
+            entry["doc_id"] = doc_id
+            self._task_ids_by_doc_id[doc_id] = task_id
+        self._entries.move_to_end(task_id)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, task_id: str) -> None:
+        now = time.monotonic()
+        self._invalidated_at.pop(task_id, None)
+        self._invalidated_at[task_id] = now
+        # Only recent invalidations matter (older reads have finished); forget the oldest beyond the cache size
+        while len(self._invalidated_at) > max(self.max_size, 1):
+            _, self._forgotten_before = self._invalidated_at.popitem(last=False)
+        if self._remove(task_id):
+            self.invalidations += 1
+
+    def invalidate_document(self, doc_id: Any) -> None:
+        task_id = self._task_ids_by_doc_id.get(doc_id)
+        if task_id:
+            self.invalidate(task_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._task_ids_by_doc_id.clear()
+        self._forgotten_before = time.monotonic()
+
+    def _remove(self, task_id: str) -> bool:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return False
+        if entry.get("doc_id") is not None:
+            self._task_ids_by_doc_id.pop(entry["doc_id"], None)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "watching_changes": bool(self._watch_task and not self._watch_task.done())
+        }
+
+    def start_watching(self, collection) -> None:
+        """Invalidate entries on writes from other processes via a change stream on the tasks collection"""
+        if self.enabled and (self._watch_task is None or self._watch_task.done()):
+            self._watch_task = asyncio.create_task(self._watch_changes(collection))
+
+    async def stop_watching(self) -> None:
+        if self._watch_task and not self._watch_task.done():
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+        self._watch_task = None
+
+    async def _watch_changes(self, collection) -> None:
+        # Only the document key is needed; the full document is never looked up
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["update", "replace", "delete"]}}},
+            {"$project": {"documentKey": 1, "operationType": 1}}
+        ]
+        while True:
+            try:
+                async with collection.watch(pipeline) as stream:
+                    logger.info("Watching tasks change stream for task cache invalidation")
+                    # Writes missed while the stream was down
+                    self.clear()
+                    async for change in stream:
+                        self.invalidate_document(change.get("documentKey", {}).get("_id"))
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # Standalone servers don't support change streams; entries expire after task_cache_ttl_seconds
+                logger.info(f"Tasks change stream unavailable, task cache relies on its TTL: {e}")
+                return
+            except Exception as e:
+                logger.error(f"Error in tasks change stream: {e}")
+                self.clear()
+                await asyncio.sleep(5)
+
+
+task_cache = TaskStatusCache()
@@ -1,28 +1,208 @@
 import asyncio
+import contextlib
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Tuple, Union
+from pymongo.errors import OperationFailure, BulkWriteError
 from app.db.mongodb_utils import get_collection
 from app.services.task_processor_factory import TaskProcessorFactory
 from app.services import task_service
-from app.models.task_types import TaskType, get_task_config, is_valid_task_type
+from app.services import queue_metrics
+from app.services import duration_estimator
+from app.services import archive_service
+from app.services import task_stats
+from app.services.task_cache import task_cache
+from app.models.task_types import TaskType, TaskLane, TaskPriority, PRIORITY_RANKS, get_task_config, get_lane_task_types, get_priority_rank, is_valid_task_type
 from app.config import get_settings
+from app.exceptions import TaskTimeoutError, TaskCancelledError, QueueAdmissionError
+from app.utils.cancellation import CancellationToken, EncodeSlot
 import os
 import json
 import shutil
+import hashlib
+import math
+import random
+import socket
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
 TASK_QUEUE_COLLECTION = "task_queue"
+TASK_QUEUE_COUNTERS_COLLECTION = "task_queue_counters"
+
+# Queue statuses of an item that is still going to produce a result (a dedup leader candidate)
+IN_FLIGHT_STATUSES = ["QUEUED", "PROCESSING", "RETRY_SCHEDULED"]
+
+QUEUE_STATUSES = ["QUEUED", "PROCESSING", "CANCELLING", "RETRY_SCHEDULED", "FOLLOWING", "COMPLETED", "FAILED", "CANCELLED"]
+# Finished items pile up until archived; their counts come from the task counters (see task_stats)
+FINISHED_STATUSES = ["COMPLETED", "FAILED", "CANCELLED"]
+ACTIVE_QUEUE_STATUSES = [status for status in QUEUE_STATUSES if status not in FINISHED_STATUSES]
+
+
+def compute_request_hash(task_type: str, request_data: Optional[Dict[str, Any]]) -> str:
+    """Canonical hash of a request: task type plus request_data with sorted keys (the task_id is ignored)"""
+    payload = {key: value for key, value in (request_data or {}).items() if key != "task_id"}
+    canonical = json.dumps({"task_type": task_type, "request_data": payload}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
 class TaskQueueService:
     """Generic task queue service that can handle multiple task types"""
     
     def __init__(self):
         self._processing = False
-        self._current_task_id: Optional[str] = None
-        self._queue_task: Optional[asyncio.Task] = None
+        self._lane_loops: Dict[TaskLane, asyncio.Task] = {}
+        self._lane_limits: Dict[TaskLane, int] = {}
+        # With prefetch on, CPU-bound phases of a lane run under its encode gate (one permit per lane slot)
+        self._encode_gates: Dict[TaskLane, asyncio.Semaphore] = {}
+        # Set when a running task of the lane finishes / when work is enqueued for the lane
+        self._slot_released: Dict[TaskLane, asyncio.Event] = {lane: asyncio.Event() for lane in TaskLane}
+        self._work_available: Dict[TaskLane, asyncio.Event] = {lane: asyncio.Event() for lane in TaskLane}
+        self._change_stream_task: Optional[asyncio.Task] = None
+        self._lease_task: Optional[asyncio.Task] = None
+        self._retry_task: Optional[asyncio.Task] = None
+        self._aging_task: Optional[asyncio.Task] = None
+        self._archive_task: Optional[asyncio.Task] = None
+        self._stats_task: Optional[asyncio.Task] = None
+        # Fleet-wide queue counts for /queue/status, shared by the polls within task_cache_ttl_seconds
+        self._queue_counts: Optional[Dict[str, Any]] = None
+        self._queue_counts_expire_at = 0.0
+        self._queue_counts_lock = asyncio.Lock()
+        # Graceful shutdown: no new claims while draining; tasks still running at the deadline are handed off
+        self._draining = False
+        self._drain_abort = asyncio.Event()
+        # Set for good once a drain starts: later enqueues must not restart the lanes of a process shutting down
+        self._stopped = False
+        self._handoff_ids: set = set()
+        # Set when a retry is scheduled so the retry scheduler re-reads the earliest retry_after
+        self._retry_scheduled = asyncio.Event()
+        # Identifies this process as the lease owner of the queue items it runs
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # task_id -> asyncio task running it, and task_id -> task type for per-type limits
+        self._active_tasks: Dict[str, asyncio.Task] = {}
+        self._active_types: Dict[str, str] = {}
+        self._cancel_tokens: Dict[str, CancellationToken] = {}
+        # Per-process overrides set by the standalone worker (python -m app.worker --lanes ...)
+        self._lane_overrides: Dict[TaskLane, int] = {}
+        self._type_overrides: Dict[str, int] = {}
+        # Rank snapshot of the QUEUED items, shared by all position lookups until it goes stale
+        self._position_snapshot: Optional[Dict[str, Any]] = None
+        self._position_snapshot_lock = asyncio.Lock()
+    
+    @property
+    def current_task_ids(self) -> List[str]:
+        """IDs of the tasks this process is currently running"""
+        return list(self._active_tasks.keys())
+    
+    def configure_worker(self, lane_limits: Optional[Dict[TaskLane, int]] = None, type_limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Restrict this process to the given lanes and/or task types with their concurrency.
+        Without any limits the process consumes every lane with the limits from settings.
+        """
+        if self._processing:
+            raise RuntimeError("Queue worker must be configured before processing starts")
+        self._lane_overrides = dict(lane_limits or {})
+        self._type_overrides = dict(type_limits or {})
+    
+    def _serves_task_type(self, task_type: TaskType) -> bool:
+        """Whether this process consumes the given task type"""
+        if not self._lane_overrides and not self._type_overrides:
+            return True
+        return task_type.value in self._type_overrides or get_task_config(task_type).lane in self._lane_overrides
+    
+    def _get_lane_limit(self, lane: TaskLane) -> int:
+        """Resolve the concurrency budget of a lane from worker overrides or settings"""
+        if lane in self._lane_overrides:
+            return max(1, self._lane_overrides[lane])
+        lane_type_limits = [limit for task_type, limit in self._type_overrides.items() if get_task_config(TaskType(task_type)).lane == lane]
+        if lane_type_limits:
+            return max(1, sum(lane_type_limits))
+        
+        settings = get_settings()
+        if lane == TaskLane.CPU:
+            configured = settings.queue_cpu_lane_concurrency
+            return configured if configured > 0 else (os.cpu_count() or 1)
+        return max(1, settings.queue_io_lane_concurrency)
+    
+    def _get_type_limit(self, task_type: TaskType) -> int:
+        """Resolve the concurrency cap of a task type (bounded by its lane)"""
+        task_config = get_task_config(task_type)
+        lane_limit = self._lane_limits.get(task_config.lane, 1)
+        prefetch_slots = self._get_prefetch_slots(task_config.lane) if task_config.supports_prefetch else 0
+        if task_type.value in self._type_overrides:
+            return min(max(1, self._type_overrides[task_type.value]), lane_limit) + prefetch_slots
+        if task_config.max_concurrency:
+            return min(task_config.max_concurrency, lane_limit) + prefetch_slots
+        return lane_limit + prefetch_slots
+    
+    def _get_prefetch_slots(self, lane: TaskLane) -> int:
+        """Extra tasks a lane may run ahead of its encode gate (only the CPU lane prefetches)"""
+        if lane != TaskLane.CPU:
+            return 0
+        return max(0, get_settings().queue_prefetch_slots)
+    
+    def _get_lane_capacity(self, lane: TaskLane) -> int:
+        return self._lane_limits[lane] + self._get_prefetch_slots(lane)
+    
+    def _lane_active_count(self, lane: TaskLane) -> int:
+        return sum(1 for task_type in self._active_types.values() if get_task_config(TaskType(task_type)).lane == lane)
+    
+    def _notify_work(self, task_type: Optional[str] = None) -> None:
+        """Wake the lane loop of a task type (or every lane) so it dequeues immediately"""
+        if task_type and is_valid_task_type(task_type):
+            self._work_available[get_task_config(TaskType(task_type)).lane].set()
+            return
+        for event in self._work_available.values():
+            event.set()
+    
+    def _get_account_weight(self, account_id: Optional[str]) -> float:
+        """Fair-share weight of an account (configured per account, default 1)"""
+        weight = get_settings().queue_account_weights.get(account_id or "", 1.0)
+        return weight if weight > 0 else 1.0
+    
+    def _get_account_in_flight_limit(self, account_id: Optional[str]) -> int:
+        """Max tasks of an account processing at once across all workers (0 = unlimited)"""
+        settings = get_settings()
+        return settings.queue_account_max_in_flight_overrides.get(account_id or "", settings.queue_account_max_in_flight)
+    
+    def _get_dequeue_types(self, lane: TaskLane) -> List[str]:
+        """Task types of a lane that still have a free slot"""
+        # Beyond the lane limit only prefetching types are claimed, they wait for the encode gate themselves
+        prefetch_only = self._lane_active_count(lane) >= self._lane_limits[lane]
+        dequeue_types = []
+        for task_type in get_lane_task_types(lane):
+            if not TaskProcessorFactory.is_task_type_supported(task_type.value) or not self._serves_task_type(task_type):
+                continue
+            if prefetch_only and not get_task_config(task_type).supports_prefetch:
+                continue
+            running = sum(1 for active_type in self._active_types.values() if active_type == task_type.value)
+            if running < self._get_type_limit(task_type):
+                dequeue_types.append(task_type.value)
+        return dequeue_types
         
+    def _get_dedup_key(self, task_type: str, request_data: Optional[Dict[str, Any]], account_id: Optional[str]) -> Optional[str]:
+        """Key under which identical in-flight requests share one run (None when deduplication is off)"""
+        scope = get_settings().queue_dedup_scope
+        if scope == "off":
+            return None
+        request_hash = compute_request_hash(task_type, request_data)
+        if scope == "global":
+            return request_hash
+        return f"{account_id}:{request_hash}"
+    
+    async def _find_dedup_leaders(self, dedup_keys: List[str], exclude_task_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        """Map dedup keys to the task_id of an in-flight item with that key"""
+        if not dedup_keys:
+            return {}
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        query = {"dedup_key": {"$in": dedup_keys}, "status": {"$in": IN_FLIGHT_STATUSES}}
+        if exclude_task_ids:
+            query["task_id"] = {"$nin": exclude_task_ids}
+        leaders = {}
+        async for item in collection.find(query, {"task_id": 1, "dedup_key": 1}):
+            leaders.setdefault(item["dedup_key"], item["task_id"])
+        return leaders
+    
     async def add_to_queue(
         self, 
         task_id: str, 
@@ -44,6 +224,45 @@ class TaskQueueService:
         
         collection = await get_collection(TASK_QUEUE_COLLECTION)
         task_config = get_task_config(TaskType(task_type))
+        priority_rank = get_priority_rank(priority)
+        
+        # An identical request already in flight: follow it instead of running it again
+        dedup_key = self._get_dedup_key(task_type, request_data, account_id)
+        leader_task_id = None
+        if dedup_key:
+            leader_task_id = (await self._find_dedup_leaders([dedup_key], exclude_task_ids=[task_id])).get(dedup_key)
+        if leader_task_id:
+            await collection.replace_one(
+                {"task_id": task_id},
+                {
+                    "task_id": task_id,
+                    "user_id": user_id,
+                    "account_id": account_id,
+                    "request_data": request_data,
+                    "task_type": task_type,
+                    "priority": priority,
+                    "priority_rank": priority_rank,
+                    "dedup_key": dedup_key,
+                    "leader_task_id": leader_task_id,
+                    "status": "FOLLOWING",
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow(),
+                    "attempts": 0,
+                    "max_attempts": task_config.max_attempts,
+                    "timeout_minutes": task_config.timeout_minutes
+                },
+                upsert=True
+            )
+            logger.info(f"Task {task_id} is identical to in-flight task {leader_task_id}, following it")
+            await queue_metrics.increment(task_type, "deduplicated")
+            await task_service.add_task_event(
+                task_id=task_id,
+                message=f"Identical request already in progress (task {leader_task_id}), its result will be reused",
+                details={"leader_task_id": leader_task_id},
+                status="QUEUED",
+                progress=1
+            )
+            return
         
         queue_item = {
             "task_id": task_id,
@@ -52,17 +271,25 @@ class TaskQueueService:
             "request_data": request_data,
             "task_type": task_type,
             "priority": priority,
+            "priority_rank": priority_rank,
+            "enqueue_seq": await self._next_enqueue_seq(task_type, priority_rank),
+            "fair_tag": await self._next_fair_tag(account_id, priority_rank),
+            "dedup_key": dedup_key,
             "status": "QUEUED",
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
+            "queued_at": datetime.utcnow(),
             "attempts": 0,
             "max_attempts": task_config.max_attempts,
             "timeout_minutes": task_config.timeout_minutes,
             "estimated_completion": None  # Will be set by processor
         }
         
-        await collection.insert_one(queue_item)
+        # One queue item per task: re-enqueueing (regenerate, requeue) resets the existing item
+        await collection.replace_one({"task_id": task_id}, queue_item, upsert=True)
         logger.info(f"Added {task_type} task {task_id} to processing queue with priority {priority}")
+        self._notify_work(task_type)
+        await queue_metrics.increment(task_type, "enqueued")
         
         # Update task status to queued
         await task_service.add_task_event(
@@ -72,9 +299,228 @@ class TaskQueueService:
             progress=1
         )
         
-        # Start processing if not already processing
-        if not self._processing:
-            await self.start_processing()
+        # Start processing if not already processing (and this process runs an embedded worker)
+        await self.ensure_processing()
+    
+    async def add_many_to_queue(
+        self,
+        tasks: List[Dict[str, Any]],
+        user_id: str,
+        account_id: str
+    ) -> Dict[str, Any]:
+        """
+        Add many tasks of one account to the processing queue in a few round-trips.
+        Each entry needs task_id, task_type, request_data and optionally priority.
+        Tasks that already have a queue item are left untouched (idempotent resubmission).
+        Returns the queued task IDs, the already queued ones, {task_id: error} for rejected entries
+        and {task_id: leader_task_id} for entries that follow an identical in-flight request.
+        """
+        failed: Dict[str, str] = {}
+        valid_tasks = []
+        for task in tasks:
+            task_type = task.get("task_type")
+            if not is_valid_task_type(task_type):
+                failed[task["task_id"]] = f"Unsupported task type: {task_type}"
+            elif not TaskProcessorFactory.is_task_type_supported(task_type):
+                failed[task["task_id"]] = f"Processor not implemented for task type: {task_type}"
+            else:
+                valid_tasks.append(task)
+        
+        if not valid_tasks:
+            return {"queued": [], "already_queued": [], "failed": failed, "following": {}}
+        
+        now = datetime.utcnow()
+        
+        # Identical requests follow an in-flight item (or the first copy within this batch)
+        dedup_keys = {task["task_id"]: self._get_dedup_key(task["task_type"], task["request_data"], account_id) for task in valid_tasks}
+        leaders = await self._find_dedup_leaders(
+            [key for key in dedup_keys.values() if key],
+            exclude_task_ids=[task["task_id"] for task in valid_tasks]
+        )
+        follower_items = []
+        leading_tasks = []
+        for task in valid_tasks:
+            dedup_key = dedup_keys[task["task_id"]]
+            if dedup_key and dedup_key in leaders:
+                task_config = get_task_config(TaskType(task["task_type"]))
+                follower_items.append({
+                    "task_id": task["task_id"],
+                    "user_id": user_id,
+                    "account_id": account_id,
+                    "request_data": task["request_data"],
+                    "task_type": task["task_type"],
+                    "priority": task.get("priority") or "normal",
+                    "priority_rank": get_priority_rank(task.get("priority")),
+                    "dedup_key": dedup_key,
+                    "leader_task_id": leaders[dedup_key],
+                    "status": "FOLLOWING",
+                    "created_at": now,
+                    "updated_at": now,
+                    "attempts": 0,
+                    "max_attempts": task_config.max_attempts,
+                    "timeout_minutes": task_config.timeout_minutes
+                })
+            else:
+                if dedup_key:
+                    leaders[dedup_key] = task["task_id"]
+                leading_tasks.append(task)
+        valid_tasks = leading_tasks
+        
+        # Allocate the fair-share tags per priority and the enqueue sequence per lane and priority,
+        # in one counter update each
+        by_rank: Dict[int, List[Dict[str, Any]]] = {}
+        for task in valid_tasks:
+            by_rank.setdefault(get_priority_rank(task.get("priority")), []).append(task)
+        
+        cost = 1.0 / self._get_account_weight(account_id)
+        queue_items = []
+        for rank, rank_tasks in by_rank.items():
+            by_lane: Dict[TaskLane, List[Dict[str, Any]]] = {}
+            for task in rank_tasks:
+                by_lane.setdefault(get_task_config(TaskType(task["task_type"])).lane, []).append(task)
+            enqueue_seqs: Dict[str, int] = {}
+            for lane_tasks in by_lane.values():
+                last_seq = await self._next_enqueue_seq(lane_tasks[0]["task_type"], rank, len(lane_tasks))
+                for offset, task in enumerate(lane_tasks):
+                    enqueue_seqs[task["task_id"]] = last_seq - len(lane_tasks) + 1 + offset
+            last_tag = await self._next_fair_tag(account_id, rank, len(rank_tasks))
+            first_tag = last_tag - (len(rank_tasks) - 1) * cost
+            for offset, task in enumerate(rank_tasks):
+                task_config = get_task_config(TaskType(task["task_type"]))
+                queue_items.append({
+                    "task_id": task["task_id"],
+                    "user_id": user_id,
+                    "account_id": account_id,
+                    "request_data": task["request_data"],
+                    "task_type": task["task_type"],
+                    "priority": task.get("priority") or "normal",
+                    "priority_rank": rank,
+                    "enqueue_seq": enqueue_seqs[task["task_id"]],
+                    "fair_tag": first_tag + offset * cost,
+                    "dedup_key": dedup_keys[task["task_id"]],
+                    "status": "QUEUED",
+                    "created_at": now,
+                    "updated_at": now,
+                    "queued_at": now,
+                    "attempts": 0,
+                    "max_attempts": task_config.max_attempts,
+                    "timeout_minutes": task_config.timeout_minutes,
+                    "estimated_completion": None
+                })
+        
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        already_queued = set()
+        new_items = queue_items + follower_items
+        try:
+            if new_items:
+                await collection.insert_many(new_items, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                task_id = new_items[error["index"]]["task_id"]
+                if error.get("code") == 11000:
+                    already_queued.add(task_id)
+                else:
+                    failed[task_id] = error.get("errmsg", "Failed to insert queue item")
+        
+        # Followers of an in-batch leader whose item wasn't inserted would wait for a result that never comes
+        lost_leaders = {item["task_id"] for item in queue_items if item["task_id"] in already_queued or item["task_id"] in failed}
+        orphans = [
+            item for item in follower_items
+            if item["leader_task_id"] in lost_leaders and item["task_id"] not in already_queued and item["task_id"] not in failed
+        ]
+        if orphans:
+            promoted = await self._reassign_followers(orphans, account_id)
+            promoted_ids = {item["task_id"] for item in promoted}
+            queue_items.extend(promoted)
+            follower_items = [item for item in follower_items if item["task_id"] not in promoted_ids]
+        
+        queued = [item["task_id"] for item in queue_items if item["task_id"] not in already_queued and item["task_id"] not in failed]
+        if queued:
+            logger.info(f"Added {len(queued)} tasks of account {account_id} to the processing queue")
+            queued_types: Dict[str, int] = {}
+            for item in queue_items:
+                if item["task_id"] in queued:
+                    queued_types[item["task_type"]] = queued_types.get(item["task_type"], 0) + 1
+            for task_type, count in queued_types.items():
+                self._notify_work(task_type)
+                await queue_metrics.increment(task_type, "enqueued", count)
+            
+            await task_service.add_task_events_bulk([
+                {
+                    "task_id": item["task_id"],
+                    "message": f"Task added to {item['task_type']} processing queue",
+                    "status": "QUEUED",
+                    "progress": 1
+                }
+                for item in queue_items if item["task_id"] in queued
+            ])
+            await self.ensure_processing()
+        
+        following = {
+            item["task_id"]: item["leader_task_id"]
+            for item in follower_items
+            if item["task_id"] not in already_queued and item["task_id"] not in failed
+        }
+        if following:
+            logger.info(f"{len(following)} tasks of account {account_id} follow identical in-flight tasks")
+            for item in follower_items:
+                if item["task_id"] in following:
+                    await queue_metrics.increment(item["task_type"], "deduplicated")
+            await task_service.add_task_events_bulk([
+                {
+                    "task_id": task_id,
+                    "message": f"Identical request already in progress (task {leader_task_id}), its result will be reused",
+                    "details": {"leader_task_id": leader_task_id},
+                    "status": "QUEUED",
+                    "progress": 1
+                }
+                for task_id, leader_task_id in following.items()
+            ])
+        
+        return {"queued": queued, "already_queued": sorted(already_queued), "failed": failed, "following": following}
+    
+    async def _reassign_followers(self, followers: List[Dict[str, Any]], account_id: str) -> List[Dict[str, Any]]:
+        """
+        Re-point FOLLOWING items to another in-flight copy of their request, or promote the first of them
+        per dedup key to QUEUED with the rest following it. Updates the given items; returns the promoted ones.
+        """
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        by_key: Dict[str, List[Dict[str, Any]]] = {}
+        for item in followers:
+            by_key.setdefault(item["dedup_key"], []).append(item)
+        leaders = await self._find_dedup_leaders(list(by_key), exclude_task_ids=[item["task_id"] for item in followers])
+        
+        promoted = []
+        for dedup_key, items in by_key.items():
+            now = datetime.utcnow()
+            leader_task_id = leaders.get(dedup_key)
+            if not leader_task_id:
+                item = items.pop(0)
+                rank = item["priority_rank"]
+                fields = {
+                    "status": "QUEUED",
+                    "enqueue_seq": await self._next_enqueue_seq(item["task_type"], rank),
+                    "fair_tag": await self._next_fair_tag(account_id, rank),
+                    "updated_at": now,
+                    "queued_at": now,
+                    "estimated_completion": None
+                }
+                await collection.update_one(
+                    {"task_id": item["task_id"], "status": "FOLLOWING"},
+                    {"$set": fields, "$unset": {"leader_task_id": ""}}
+                )
+                item.update(fields)
+                item.pop("leader_task_id", None)
+                promoted.append(item)
+                leader_task_id = item["task_id"]
+            if items:
+                await collection.update_many(
+                    {"task_id": {"$in": [item["task_id"] for item in items]}, "status": "FOLLOWING"},
+                    {"$set": {"leader_task_id": leader_task_id, "updated_at": now}}
+                )
+                for item in items:
+                    item["leader_task_id"] = leader_task_id
+        return promoted
     
     async def get_queue_status(self, task_id: Optional[str] = None) -> Dict[str, Any]:
         """Get current queue status"""
@@ -84,43 +530,192 @@ class TaskQueueService:
             # Get specific task status
             queue_item = await collection.find_one({"task_id": task_id})
             if queue_item:
+                position = await self._get_queue_position(queue_item)
                 return {
                     "task_id": task_id,
                     "task_type": queue_item.get("task_type"),
                     "status": queue_item.get("status"),
                     "priority": queue_item.get("priority"),
-                    "position": await self._get_queue_position(task_id),
+                    "position": position,
+                    "estimated_wait_seconds": None,
                     "created_at": queue_item.get("created_at"),
+                    "queued_at": queue_item.get("queued_at"),
+                    "processing_started_at": queue_item.get("processing_started_at"),
+                    "finished_at": queue_item.get("finished_at"),
+                    "stage_timings": queue_item.get("stage_timings"),
                     "attempts": queue_item.get("attempts", 0),
-                    "estimated_completion": queue_item.get("estimated_completion")
+                    "retry_after": queue_item.get("retry_after"),
+                    "worker_id": queue_item.get("worker_id"),
+                    "lease_expires_at": queue_item.get("lease_expires_at"),
+                    "estimated_completion": queue_item.get("estimated_completion"),
+                    **(await self._get_queued_estimates(queue_item, position))
                 }
             return {"task_id": task_id, "status": "NOT_FOUND"}
         
         # Get overall queue status
-        pipeline = [
-            {"$group": {
-                "_id": "$status",
-                "count": {"$sum": 1}
-            }}
-        ]
-        status_counts = {doc["_id"]: doc["count"] async for doc in collection.aggregate(pipeline)}
+        queue_counts = await self._get_queue_counts()
+        
+        current_task_ids = self.current_task_ids
+        return {
+            "current_processing": current_task_ids[0] if current_task_ids else None,
+            "processing_task_ids": current_task_ids,
+            "lanes": {
+                lane.value: {
+                    "limit": limit,
+                    "prefetch_slots": self._get_prefetch_slots(lane),
+                    "active": self._lane_active_count(lane)
+                }
+                for lane, limit in self._lane_limits.items()
+            },
+            "status_counts": queue_counts["status_counts"],
+            "queued_by_type": queue_counts["queued_by_type"],
+            "is_processing": self._processing,
+            "is_draining": self._draining,
+            "is_stopped": self._stopped,
+            "task_cache": task_cache.stats(),
+            "supported_task_types": TaskProcessorFactory.get_supported_task_types()
+        }
+    
+    async def get_queue_item_status(self, task_id: str) -> Optional[str]:
+        """Queue status of a task (None when it has no queue item), without position or estimates"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        queue_item = await collection.find_one({"task_id": task_id}, {"status": 1})
+        return queue_item.get("status") if queue_item else None
+    
+    async def _get_queue_counts(self) -> Dict[str, Any]:
+        """
+        Items per status and queued items per type. Active statuses are one $group over the (status, task_type)
+        index, bounded by the queue depth; finished ones are read from the task counters. Concurrent polls
+        share one computation, which is reused for task_cache_ttl_seconds.
+        """
+        async with self._queue_counts_lock:
+            if self._queue_counts is not None and time.monotonic() < self._queue_counts_expire_at:
+                return self._queue_counts
+            
+            collection = await get_collection(TASK_QUEUE_COLLECTION)
+            pipeline = [
+                {"$match": {"status": {"$in": ACTIVE_QUEUE_STATUSES}}},
+                {"$group": {"_id": {"status": "$status", "task_type": "$task_type"}, "count": {"$sum": 1}}}
+            ]
+            status_counts: Dict[str, int] = {}
+            type_counts: Dict[str, int] = {}
+            async for doc in collection.aggregate(pipeline):
+                status = doc["_id"].get("status")
+                status_counts[status] = status_counts.get(status, 0) + doc["count"]
+                if status == "QUEUED":
+                    task_type = doc["_id"].get("task_type")
+                    type_counts[task_type] = type_counts.get(task_type, 0) + doc["count"]
+            finished_counts = await task_stats.count_by_status(FINISHED_STATUSES)
+            status_counts.update({status: count for status, count in finished_counts.items() if count})
+            
+            self._queue_counts = {
+                "status_counts": {status: status_counts[status] for status in QUEUE_STATUSES if status_counts.get(status)},
+                "queued_by_type": type_counts
+            }
+            self._queue_counts_expire_at = time.monotonic() + get_settings().task_cache_ttl_seconds
+            return self._queue_counts
+    
+    async def get_metrics(self) -> str:
+        """Queue metrics in the Prometheus text format: fleet-wide counters and histograms plus this worker's lanes"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        local_lanes = {
+            lane.value: {"limit": self._get_lane_capacity(lane), "active": self._lane_active_count(lane)}
+            for lane in self._lane_limits
+        }
+        autoscaling = await self.get_autoscaling_hints()
+        return await queue_metrics.render_prometheus(
+            collection, local_lanes, self.worker_id, autoscaling["lanes"], task_cache=task_cache.stats()
+        )
+    
+    async def get_autoscaling_hints(self) -> Dict[str, Any]:
+        """
+        Recommend a worker count per lane for an external autoscaler.
+        Needed slots = arrival rate x service time (to keep up) + queued work / target wait (to clear the backlog),
+        where queued work weighs every queued or retrying item by its type's estimated run time.
+        """
+        settings = get_settings()
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        now = datetime.utcnow()
+        window_seconds = max(settings.queue_autoscale_window_seconds, 60)
+        window_start = now - timedelta(seconds=window_seconds)
+        target_wait = max(settings.queue_autoscale_target_wait_seconds, 1)
         
-        # Get queue by task type
-        type_pipeline = [
-            {"$match": {"status": "QUEUED"}},
+        backlog: Dict[str, Dict[str, int]] = {}
+        async for doc in collection.aggregate([
+            {"$match": {"status": {"$in": ["QUEUED", "RETRY_SCHEDULED", "PROCESSING", "CANCELLING"]}}},
             {"$group": {
-                "_id": "$task_type", 
-                "count": {"$sum": 1}
+                "_id": {"task_type": "$task_type", "status": "$status"},
+                "count": {"$sum": 1},
+                "workers": {"$addToSet": "$worker_id"}
             }}
-        ]
-        type_counts = {doc["_id"]: doc["count"] async for doc in collection.aggregate(type_pipeline)}
+        ]):
+            entry = backlog.setdefault(doc["_id"].get("task_type"), {"waiting": 0, "running": 0, "workers": set()})
+            if doc["_id"].get("status") in ("QUEUED", "RETRY_SCHEDULED"):
+                entry["waiting"] += doc["count"]
+            else:
+                entry["running"] += doc["count"]
+                entry["workers"].update(worker for worker in doc.get("workers", []) if worker)
+        
+        arrivals = {
+            doc["_id"]: doc["count"]
+            async for doc in collection.aggregate([
+                {"$match": {"created_at": {"$gte": window_start}}},
+                {"$group": {"_id": "$task_type", "count": {"$sum": 1}}}
+            ])
+        }
+        finished = {
+            doc["_id"]: doc["count"]
+            async for doc in collection.aggregate([
+                {"$match": {"finished_at": {"$gte": window_start}, "status": {"$in": ["COMPLETED", "FAILED", "CANCELLED"]}}},
+                {"$group": {"_id": "$task_type", "count": {"$sum": 1}}}
+            ])
+        }
+        
+        lanes = {}
+        for lane in TaskLane:
+            waiting = running = 0
+            workers: set = set()
+            queued_work_seconds = 0.0
+            steady_state_slots = 0.0
+            drain_per_minute = 0.0
+            for task_type in get_lane_task_types(lane):
+                entry = backlog.get(task_type.value, {"waiting": 0, "running": 0, "workers": set()})
+                waiting += entry["waiting"]
+                running += entry["running"]
+                workers.update(entry["workers"])
+                drain_per_minute += finished.get(task_type.value, 0) * 60 / window_seconds
+                service_seconds = await self._get_type_duration_seconds(task_type.value) or 0
+                queued_work_seconds += entry["waiting"] * service_seconds
+                steady_state_slots += arrivals.get(task_type.value, 0) / window_seconds * service_seconds
+            
+            needed_slots = steady_state_slots + queued_work_seconds / target_wait
+            if waiting or running:
+                # Never recommend fewer slots than are busy right now
+                needed_slots = max(needed_slots, running, 1)
+            slots_per_worker = max(settings.queue_autoscale_slots_per_worker.get(lane.value) or self._get_lane_limit(lane), 1)
+            desired_workers = math.ceil(needed_slots / slots_per_worker)
+            desired_workers = max(desired_workers, settings.queue_autoscale_min_workers)
+            if settings.queue_autoscale_max_workers > 0:
+                desired_workers = min(desired_workers, settings.queue_autoscale_max_workers)
+            
+            lanes[lane.value] = {
+                "desired_workers": desired_workers,
+                "active_workers": len(workers),
+                "slots_per_worker": slots_per_worker,
+                "needed_slots": round(needed_slots, 2),
+                "waiting": waiting,
+                "running": running,
+                "queued_work_seconds": int(queued_work_seconds),
+                "drain_per_minute": round(drain_per_minute, 2),
+                # Time to clear the backlog at the current drain rate (None while nothing finishes)
+                "projected_wait_seconds": int(waiting / drain_per_minute * 60) if drain_per_minute else None
+            }
         
         return {
-            "current_processing": self._current_task_id,
-            "status_counts": status_counts,
-            "queued_by_type": type_counts,
-            "is_processing": self._processing,
-            "supported_task_types": TaskProcessorFactory.get_supported_task_types()
+            "generated_at": now,
+            "target_wait_seconds": target_wait,
+            "window_seconds": window_seconds,
+            "lanes": lanes
         }
     
     async def get_queue_list(
@@ -150,124 +745,783 @@ class TaskQueueService:
         
         return tasks
     
-    async def _get_queue_position(self, task_id: str) -> int:
-        """Get position of task in queue (1-based)"""
+    async def _next_enqueue_seq(self, task_type: str, priority_rank: int, count: int = 1) -> int:
+        """Reserve the next count values of the enqueue sequence of a priority in the task type's lane, returns the last one"""
+        lane = get_task_config(TaskType(task_type)).lane
+        counters = await get_collection(TASK_QUEUE_COUNTERS_COLLECTION)
+        counter = await counters.find_one_and_update(
+            {"_id": f"enqueue_seq:{lane.value}:{priority_rank}"},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=True
+        )
+        return counter["seq"]
+    
+    async def _get_virtual_time(self, priority_rank: int) -> float:
+        """Fair-share virtual time of a priority: the fair tag of the last item dequeued from it"""
+        counters = await get_collection(TASK_QUEUE_COUNTERS_COLLECTION)
+        counter = await counters.find_one({"_id": f"fair_vtime:{priority_rank}"})
+        return counter.get("vtime", 0.0) if counter else 0.0
+    
+    async def _next_fair_tag(self, account_id: Optional[str], priority_rank: int, count: int = 1) -> float:
+        """
+        Start-time fair queueing tag of a new item: max(account's last tag, virtual time) + 1/weight.
+        Dequeueing by tag within a priority interleaves accounts in proportion to their weights,
+        so a large bulk submission only delays its own account's items.
+        With count > 1 the tags of count consecutive items are reserved and the last one is returned.
+        """
+        virtual_time = await self._get_virtual_time(priority_rank)
+        counters = await get_collection(TASK_QUEUE_COUNTERS_COLLECTION)
+        counter = await counters.find_one_and_update(
+            {"_id": f"fair_tag:{priority_rank}:{account_id}"},
+            [{"$set": {"tag": {"$add": [
+                {"$max": [{"$ifNull": ["$tag", 0]}, virtual_time]},
+                count / self._get_account_weight(account_id)
+            ]}}}],
+            upsert=True,
+            return_document=True
+        )
+        return counter["tag"]
+    
+    async def _get_saturated_accounts(self) -> List[str]:
+        """Accounts that reached their in-flight limit and must not be dequeued from right now"""
+        settings = get_settings()
+        if settings.queue_account_max_in_flight <= 0 and not settings.queue_account_max_in_flight_overrides:
+            return []
+        
         collection = await get_collection(TASK_QUEUE_COLLECTION)
+        pipeline = [
+            {"$match": {"status": {"$in": ["PROCESSING", "CANCELLING"]}}},
+            {"$group": {"_id": "$account_id", "count": {"$sum": 1}}}
+        ]
+        saturated = []
+        async for doc in collection.aggregate(pipeline):
+            limit = self._get_account_in_flight_limit(doc["_id"])
+            if limit > 0 and doc["count"] >= limit:
+                saturated.append(doc["_id"])
+        return saturated
+    
+    async def _get_position_snapshot(self) -> Dict[str, Any]:
+        """Get the rank snapshot of the queue, rebuilding it when older than queue_position_snapshot_seconds"""
+        max_age = get_settings().queue_position_snapshot_seconds
+        snapshot = self._position_snapshot
+        if snapshot and (datetime.utcnow() - snapshot["taken_at"]).total_seconds() < max_age:
+            return snapshot
         
-        # Count tasks that are queued and created before this task
-        task = await collection.find_one({"task_id": task_id})
-        if not task or task.get("status") != "QUEUED":
+        async with self._position_snapshot_lock:
+            # Another status call may have refreshed it while we waited for the lock
+            snapshot = self._position_snapshot
+            if snapshot and (datetime.utcnow() - snapshot["taken_at"]).total_seconds() < max_age:
+                return snapshot
+            
+            collection = await get_collection(TASK_QUEUE_COLLECTION)
+            positions: Dict[str, int] = {}
+            # Lanes run independently, so positions, counts and sequences are kept per lane
+            rank_counts: Dict[TaskLane, Dict[int, int]] = {}
+            rank_max_seq: Dict[TaskLane, Dict[int, int]] = {}
+            for lane in TaskLane:
+                lane_positions = 0
+                lane_counts = rank_counts.setdefault(lane, {})
+                lane_max_seq = rank_max_seq.setdefault(lane, {})
+                cursor = collection.find(
+                    {"status": "QUEUED", "task_type": {"$in": [t.value for t in get_lane_task_types(lane)]}},
+                    {"task_id": 1, "priority_rank": 1, "enqueue_seq": 1}
+                ).sort([("priority_rank", 1), ("fair_tag", 1), ("created_at", 1)])
+                async for item in cursor:
+                    rank = item.get("priority_rank", get_priority_rank(None))
+                    lane_positions += 1
+                    positions[item["task_id"]] = lane_positions
+                    lane_counts[rank] = lane_counts.get(rank, 0) + 1
+                    if item.get("enqueue_seq") is not None:
+                        lane_max_seq[rank] = max(lane_max_seq.get(rank, 0), item["enqueue_seq"])
+            
+            # Recent run times per task type, used to turn a position into a wait estimate
+            duration_pipeline = [
+                {"$match": {"status": "COMPLETED", "completed_at": {"$ne": None}, "processing_started_at": {"$ne": None}}},
+                {"$sort": {"completed_at": -1}},
+                {"$limit": 200},
+                {"$group": {
+                    "_id": "$task_type",
+                    "avg_ms": {"$avg": {"$subtract": ["$completed_at", "$processing_started_at"]}}
+                }}
+            ]
+            avg_durations = {
+                doc["_id"]: doc["avg_ms"] / 1000
+                async for doc in collection.aggregate(duration_pipeline)
+                if doc.get("avg_ms") is not None
+            }
+            
+            self._position_snapshot = {
+                "taken_at": datetime.utcnow(),
+                "positions": positions,
+                "rank_counts": rank_counts,
+                "rank_max_seq": rank_max_seq,
+                "avg_durations": avg_durations,
+                # Filled on first use and kept for the snapshot's lifetime, so polls don't hit the estimator
+                "type_durations": {},
+                "run_durations": {}
+            }
+            return self._position_snapshot
+    
+    async def _get_queue_position(self, queue_item: Dict[str, Any]) -> int:
+        """Get position of a queue item in its lane's queue (1-based) from the rank snapshot"""
+        if queue_item.get("status") != "QUEUED":
             return 0
         
-        # Priority-based positioning
-        priority_order = {"urgent": 0, "high": 1, "normal": 2, "low": 3}
-        task_priority = priority_order.get(task.get("priority", "normal"), 2)
+        snapshot = await self._get_position_snapshot()
+        position = snapshot["positions"].get(queue_item["task_id"])
+        if position:
+            return position
         
-        position = await collection.count_documents({
-            "status": "QUEUED",
-            "$or": [
-                {"priority": {"$in": list(dict(filter(lambda x: x[1] < task_priority, priority_order.items())).keys())}},
-                {
-                    "priority": task.get("priority", "normal"),
-                    "created_at": {"$lt": task["created_at"]}
-                }
-            ]
-        })
+        # Enqueued after the snapshot was taken: everything queued in its lane at a higher or equal priority
+        # is ahead, plus the items of the same lane and priority enqueued between the snapshot and this one
+        lane = get_task_config(TaskType(queue_item["task_type"])).lane
+        task_priority_rank = queue_item.get("priority_rank", get_priority_rank(queue_item.get("priority")))
+        ahead = sum(count for rank, count in snapshot["rank_counts"][lane].items() if rank <= task_priority_rank)
+        enqueue_seq = queue_item.get("enqueue_seq")
+        snapshot_seq = snapshot["rank_max_seq"][lane].get(task_priority_rank)
+        if enqueue_seq is not None and snapshot_seq is not None:
+            ahead += max(enqueue_seq - snapshot_seq - 1, 0)
+        return ahead + 1
+    
+    async def _get_estimated_wait_seconds(self, queue_item: Dict[str, Any], position: Optional[int] = None) -> Optional[int]:
+        """Estimate how long a queued item waits before it starts, from its position and recent run times"""
+        if queue_item.get("status") != "QUEUED":
+            return None
         
-        return position + 1
+        avg_duration = await self._get_type_duration_seconds(queue_item.get("task_type"))
+        if avg_duration is None:
+            return None
+        
+        if position is None:
+            position = await self._get_queue_position(queue_item)
+        lane = get_task_config(TaskType(queue_item["task_type"])).lane
+        slots = self._lane_limits.get(lane) or self._get_lane_limit(lane)
+        return int((position - 1) / slots * avg_duration)
+    
+    async def _get_type_duration_seconds(self, task_type: Optional[str]) -> Optional[float]:
+        """Typical run time of a task type: learned mean, else recent completions, else the configured estimate"""
+        if not is_valid_task_type(task_type):
+            return None
+        snapshot = await self._get_position_snapshot()
+        if task_type in snapshot["type_durations"]:
+            return snapshot["type_durations"][task_type]
+        duration = await duration_estimator.estimate_duration_seconds(task_type)
+        if duration is None:
+            duration = snapshot["avg_durations"].get(task_type)
+        if duration is None:
+            configured_minutes = get_task_config(TaskType(task_type)).estimated_duration_minutes
+            duration = configured_minutes * 60 if configured_minutes else None
+        snapshot["type_durations"][task_type] = duration
+        return duration
+    
+    async def _get_queued_estimates(self, queue_item: Dict[str, Any], position: Optional[int] = None) -> Dict[str, Any]:
+        """Predicted wait, start and finish of a queued item (its own run time comes from its request features)"""
+        wait_seconds = await self._get_estimated_wait_seconds(queue_item, position)
+        if wait_seconds is None:
+            return {}
+        estimated_start = datetime.utcnow() + timedelta(seconds=wait_seconds)
+        estimates: Dict[str, Any] = {"estimated_wait_seconds": wait_seconds, "estimated_start": estimated_start}
+        run_durations = (await self._get_position_snapshot())["run_durations"]
+        if queue_item["task_id"] in run_durations:
+            duration = run_durations[queue_item["task_id"]]
+        else:
+            try:
+                processor = TaskProcessorFactory.create_processor(queue_item["task_type"])
+                duration = await processor.estimate_duration_seconds(queue_item.get("request_data") or {})
+            except Exception as e:
+                logger.warning(f"Failed to estimate the run time of task {queue_item['task_id']}: {e}")
+                duration = None
+            run_durations[queue_item["task_id"]] = duration
+        if duration:
+            estimates["estimated_completion"] = estimated_start + timedelta(seconds=duration)
+        return estimates
+    
+    async def check_admission(self, task_type: str, priority: str = "normal") -> Optional[int]:
+        """
+        Predict how long a new task would wait and reject it (QueueAdmissionError) above
+        queue_admission_max_wait_seconds. Returns the predicted wait in seconds, None when unknown
+        or when admission control is off.
+        """
+        estimates = await self.check_admission_many([(task_type, priority)])
+        return estimates.get((task_type, priority or "normal"))
+    
+    async def check_admission_many(self, requests: List[Tuple[str, Optional[str]]]) -> Dict[Tuple[str, str], int]:
+        """
+        check_admission for the (task_type, priority) pairs of a batch, with one read of the involved lanes.
+        Does nothing while queue_admission_max_wait_seconds is 0 (every task is accepted).
+        """
+        max_wait = get_settings().queue_admission_max_wait_seconds
+        if max_wait <= 0:
+            return {}
+        pairs = sorted({(task_type, priority or "normal") for task_type, priority in requests if is_valid_task_type(task_type)})
+        if not pairs:
+            return {}
+        
+        lane_types = {
+            lane: [t.value for t in get_lane_task_types(lane)]
+            for lane in {get_task_config(TaskType(task_type)).lane for task_type, _ in pairs}
+        }
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        pipeline = [
+            {"$match": {
+                "status": {"$in": ["QUEUED", "PROCESSING"]},
+                "task_type": {"$in": [task_type for types in lane_types.values() for task_type in types]}
+            }},
+            {"$group": {"_id": {"status": "$status", "task_type": "$task_type", "priority_rank": "$priority_rank"}, "count": {"$sum": 1}}}
+        ]
+        counts = []
+        async for doc in collection.aggregate(pipeline):
+            rank = doc["_id"].get("priority_rank")
+            counts.append((doc["_id"].get("status"), doc["_id"].get("task_type"), get_priority_rank(None) if rank is None else rank, doc["count"]))
+        
+        estimates: Dict[Tuple[str, str], int] = {}
+        for task_type, priority in pairs:
+            avg_duration = await self._get_type_duration_seconds(task_type)
+            if avg_duration is None:
+                continue
+            lane = get_task_config(TaskType(task_type)).lane
+            priority_rank = get_priority_rank(priority)
+            ahead = sum(
+                count for status, item_type, rank, count in counts
+                if status == "QUEUED" and item_type in lane_types[lane] and rank <= priority_rank
+            )
+            # API-only processes don't know the fleet size; a busy lane shows it through its running items
+            running = sum(count for status, item_type, _, count in counts if status == "PROCESSING" and item_type in lane_types[lane])
+            slots = max(self._lane_limits.get(lane) or self._get_lane_limit(lane), running, 1)
+            estimated_wait = int(ahead / slots * avg_duration)
+            if estimated_wait > max_wait:
+                raise QueueAdmissionError(
+                    f"The {task_type} queue is at capacity (estimated wait {estimated_wait // 60} minutes), please try again later",
+                    estimated_wait
+                )
+            estimates[(task_type, priority)] = estimated_wait
+        return estimates
+    
+    async def ensure_processing(self) -> None:
+        """Start the embedded worker unless it runs or queue_embedded_worker is off (the API then only enqueues)"""
+        if not self._processing and not self._stopped and get_settings().queue_embedded_worker:
+            await self.start_processing()
     
     async def start_processing(self) -> None:
-        """Start the queue processing loop"""
+        """Start one processing loop per worker lane"""
         print("📋📋📋 START_PROCESSING CALLED!")
         if self._processing:
             print("📋 Queue processing already running")
             logger.info("Queue processing already running")
             return
+        if self._stopped:
+            logger.info("Queue processing was drained for shutdown, not starting it again")
+            return
         
         print("📋 Starting task queue processing...")
         logger.info("Starting task queue processing")
         self._processing = True
         
-        # Start the processing loop as a background task
-        print("📋 Creating background task...")
-        self._queue_task = asyncio.create_task(self._process_queue_loop())
-        print("📋 Background task created!")
+        try:
+            await self._backfill_priority_ranks()
+        except Exception as e:
+            logger.error(f"Failed to backfill queue priority ranks: {e}")
+        
+        # Start one processing loop per served lane as background tasks
+        for lane in TaskLane:
+            if not any(self._serves_task_type(task_type) for task_type in get_lane_task_types(lane)):
+                continue
+            self._lane_limits[lane] = self._get_lane_limit(lane)
+            if self._get_prefetch_slots(lane):
+                self._encode_gates[lane] = asyncio.Semaphore(self._lane_limits[lane])
+            self._lane_loops[lane] = asyncio.create_task(self._process_lane_loop(lane))
+        print(f"📋 Lane loops created: {', '.join(f'{lane.value}={limit}' for lane, limit in self._lane_limits.items())}")
+        
+        # Tasks enqueued by other nodes don't set our in-process events, follow them via a change stream
+        if get_settings().queue_use_change_stream:
+            self._change_stream_task = asyncio.create_task(self._watch_queue_changes())
+        
+        # Renew the leases of our running tasks and reclaim the ones other workers abandoned
+        self._lease_task = asyncio.create_task(self._lease_loop())
+        
+        # Move failed tasks back into the queue once their retry backoff has elapsed
+        self._retry_task = asyncio.create_task(self._retry_scheduler_loop())
+        
+        # Promote long-waiting items so low priorities can't starve
+        self._aging_task = asyncio.create_task(self._aging_loop())
+        
+        # Move old finished tasks and queue items to the archive collections
+        if get_settings().task_archive_after_days > 0:
+            self._archive_task = asyncio.create_task(self._archive_loop())
+        
+        # Correct drift of the per-account task counters
+        if get_settings().task_stats_reconcile_interval_seconds > 0:
+            self._stats_task = asyncio.create_task(self._stats_loop())
     
     async def stop_processing(self) -> None:
-        """Stop the queue processing loop"""
+        """Stop the lane loops and the tasks they are running"""
         logger.info("Stopping task queue processing")
         self._processing = False
         
-        if self._queue_task:
-            self._queue_task.cancel()
+        running = list(self._lane_loops.values()) + list(self._active_tasks.values())
+        for background_task in (
+            self._change_stream_task, self._lease_task, self._retry_task, self._aging_task, self._archive_task, self._stats_task
+        ):
+            if background_task:
+                running.append(background_task)
+        self._change_stream_task = None
+        self._lease_task = None
+        self._retry_task = None
+        self._aging_task = None
+        self._archive_task = None
+        self._stats_task = None
+        for task in running:
+            task.cancel()
+        for task in running:
             try:
-                await self._queue_task
+                await task
             except asyncio.CancelledError:
                 pass
-            self._queue_task = None
+            except Exception as e:
+                logger.error(f"Error while stopping queue task: {e}")
+        self._lane_loops.clear()
+    
+    async def drain(self, grace_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Graceful shutdown (SIGTERM): stop claiming work, give running tasks grace_seconds to finish while
+        their leases keep being renewed, then hand the rest back to the queue with their attempt counts
+        unchanged, and stop processing. Processing is not started again in this process afterwards.
+        """
+        if grace_seconds is None:
+            grace_seconds = get_settings().queue_drain_grace_seconds
+        self._stopped = True
+        if not self._processing:
+            return {"finished": 0, "handed_off": []}
+        
+        self._draining = True
+        for lane in TaskLane:
+            self._work_available[lane].set()
+            self._slot_released[lane].set()
+        
+        running = list(self._active_tasks.values())
+        logger.info(f"Draining queue worker {self.worker_id}: {len(running)} running tasks, {grace_seconds}s grace period")
+        if running and grace_seconds > 0:
+            all_finished = asyncio.ensure_future(asyncio.wait(running))
+            aborted = asyncio.ensure_future(self._drain_abort.wait())
+            await asyncio.wait({all_finished, aborted}, timeout=grace_seconds, return_when=asyncio.FIRST_COMPLETED)
+            all_finished.cancel()
+            aborted.cancel()
+        
+        # Whatever is still running goes back to the queue for another worker
+        handed_off = list(self._active_tasks.keys())
+        self._handoff_ids.update(handed_off)
+        remaining = list(self._active_tasks.values())
+        for task in remaining:
+            task.cancel()
+        await asyncio.gather(*remaining, return_exceptions=True)
+        if handed_off:
+            logger.warning(f"Handed {len(handed_off)} unfinished tasks back to the queue: {', '.join(handed_off)}")
+        
+        self._draining = False
+        self._drain_abort.clear()
+        await self.stop_processing()
+        return {"finished": len(running) - len(handed_off), "handed_off": handed_off}
+    
+    def abort_drain(self) -> None:
+        """Cut the grace period short (e.g. a second SIGTERM): hand off the running tasks now"""
+        self._drain_abort.set()
     
-    async def _process_queue_loop(self) -> None:
-        """Main queue processing loop"""
-        print("📋📋📋 QUEUE LOOP STARTED!")
-        logger.info("📋 Queue processing loop started")
+    async def _process_lane_loop(self, lane: TaskLane) -> None:
+        """Processing loop of one lane: keeps up to the lane limit of tasks running"""
+        print(f"📋📋📋 {lane.value.upper()} LANE LOOP STARTED!")
+        logger.info(f"📋 {lane.value} lane started with {self._lane_limits[lane]} slots (+{self._get_prefetch_slots(lane)} prefetch)")
         try:
-            while self._processing:
+            poll_interval = get_settings().queue_poll_interval_seconds
+            while self._processing and not self._draining:
                 try:
-                    print("📋 Checking for next task...")
+                    # Events are cleared before the checks they guard, so a wakeup that
+                    # arrives while we are querying is never lost
+                    self._slot_released[lane].clear()
+                    dequeue_types = self._get_dequeue_types(lane)
+                    if self._lane_active_count(lane) >= self._get_lane_capacity(lane) or not dequeue_types:
+                        # Lane (or every type in it) is saturated, wait for a running task to finish
+                        await self._wait_for_event(self._slot_released[lane], poll_interval)
+                        continue
+                    
                     # Get next task from queue (priority-based)
-                    next_task = await self._get_next_task()
+                    self._work_available[lane].clear()
+                    if self._draining:
+                        break
+                    next_task = await self._get_next_task(dequeue_types)
                     
                     if next_task:
-                        print(f"📋 Found task to process: {next_task.get('task_id', 'UNKNOWN')}")
-                        await self._process_task(next_task)
+                        print(f"📋 [{lane.value}] Found task to process: {next_task.get('task_id', 'UNKNOWN')}")
+                        self._start_task(next_task)
                     else:
-                        # No tasks in queue, wait before checking again
-                        print("📋 No tasks in queue, waiting 5 seconds...")
-                        await asyncio.sleep(5)
+                        # No tasks in queue for this lane, sleep until something is enqueued
+                        # (the timeout is only a safety net for missed wakeups)
+                        await self._wait_for_event(self._work_available[lane], poll_interval)
                         
                 except Exception as e:
-                    logger.error(f"Error in queue processing loop: {e}")
+                    logger.error(f"Error in {lane.value} lane processing loop: {e}")
                     await asyncio.sleep(10)  # Wait longer on error
                     
         except asyncio.CancelledError:
-            logger.info("Queue processing loop cancelled")
+            logger.info(f"{lane.value} lane processing loop cancelled")
         except Exception as e:
-            logger.error(f"Queue processing loop stopped with error: {e}")
+            logger.error(f"{lane.value} lane processing loop stopped with error: {e}")
         finally:
-            self._processing = False
-            self._current_task_id = None
+            self._lane_loops.pop(lane, None)
+            # While draining the lease loop must keep renewing the leases of the tasks still running
+            if not self._lane_loops and not self._draining:
+                self._processing = False
+    
+    async def _wait_for_event(self, event: asyncio.Event, timeout: float) -> None:
+        """Wait until the event is set or the timeout elapses"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _watch_queue_changes(self) -> None:
+        """Wake lane loops when another node enqueues or requeues a task, and stop runs cancelled remotely"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        pipeline = [{
+            "$match": {
+                "$or": [
+                    {"operationType": "insert", "fullDocument.status": "QUEUED"},
+                    {"operationType": "update", "updateDescription.updatedFields.status": {"$in": ["QUEUED", "CANCELLING"]}}
+                ]
+            }
+        }]
+        
+        while self._processing:
+            try:
+                async with collection.watch(pipeline) as stream:
+                    logger.info("Watching task queue change stream for remote enqueues")
+                    async for change in stream:
+                        if change.get("updateDescription", {}).get("updatedFields", {}).get("status") == "CANCELLING":
+                            await self._check_cancel_requests()
+                            continue
+                        # Updates don't carry the task type, so they wake every lane
+                        self._notify_work(change.get("fullDocument", {}).get("task_type"))
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # Standalone servers don't support change streams; the timed poll covers remote enqueues
+                logger.info(f"Task queue change stream unavailable, relying on polling: {e}")
+                return
+            except Exception as e:
+                logger.error(f"Task queue change stream error: {e}")
+                await asyncio.sleep(10)
+    
+    def _start_task(self, queue_item: Dict[str, Any]) -> None:
+        """Run a dequeued task in the background and track it until it finishes"""
+        task_id = queue_item["task_id"]
+        self._active_types[task_id] = queue_item["task_type"]
+        self._active_tasks[task_id] = asyncio.create_task(self._process_task(queue_item))
+    
+    async def _get_next_task(self, task_types: List[str]) -> Optional[Dict[str, Any]]:
+        """Get the next task of the given types from the queue (priority, then fair share between accounts)"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        
+        now = datetime.utcnow()
+        lease_expires_at = now + timedelta(seconds=get_settings().queue_lease_seconds)
+        
+        # Retries wait in RETRY_SCHEDULED until their backoff has elapsed, so every QUEUED item is claimable
+        query = {
+            "status": "QUEUED",
+            "task_type": {"$in": task_types}
+        }
+        saturated_accounts = await self._get_saturated_accounts()
+        if saturated_accounts:
+            query["account_id"] = {"$nin": saturated_accounts}
+        
+        # Priority order: urgent > high > normal > low (priority_rank 0..3), then the smallest fair-share tag,
+        # then creation time. A single atomic claim served by the (status, priority_rank, fair_tag, created_at) index
+        task = await collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": "PROCESSING",
+                    "updated_at": now,
+                    "processing_started_at": now,
+                    "worker_id": self.worker_id,
+                    "leased_at": now,
+                    "lease_expires_at": lease_expires_at
+                }
+            },
+            sort=[("priority_rank", 1), ("fair_tag", 1), ("created_at", 1)],
+            return_document=True
+        )
+        
+        if task:
+            # Queue wait of this attempt: since the item (re-)entered QUEUED
+            queued_at = task.get("queued_at") or task.get("created_at")
+            if queued_at:
+                await queue_metrics.observe("wait", task["task_type"], (now - queued_at).total_seconds())
+            await queue_metrics.increment(task["task_type"], "started")
+        
+        if task and task.get("fair_tag") is not None:
+            # Advance the priority's virtual time so newly active accounts start level with the others
+            counters = await get_collection(TASK_QUEUE_COUNTERS_COLLECTION)
+            await counters.update_one(
+                {"_id": f"fair_vtime:{task.get('priority_rank', get_priority_rank(None))}"},
+                {"$max": {"vtime": task["fair_tag"]}},
+                upsert=True
+            )
+        return task
     
-    async def _get_next_task(self) -> Optional[Dict[str, Any]]:
-        """Get the next task from the queue (priority-based)"""
+    async def _backfill_priority_ranks(self) -> None:
+        """Add priority_rank to queue items enqueued before it existed"""
         collection = await get_collection(TASK_QUEUE_COLLECTION)
+        for priority, rank in PRIORITY_RANKS.items():
+            await collection.update_many(
+                {"priority": priority, "priority_rank": {"$exists": False}},
+                {"$set": {"priority_rank": rank}}
+            )
+        await collection.update_many(
+            {"priority_rank": {"$exists": False}},
+            {"$set": {"priority_rank": get_priority_rank(None)}}
+        )
+    
+    def _get_retry_delay(self, attempts: int) -> float:
+        """Exponential backoff for the given attempt number with equal jitter, in seconds"""
+        settings = get_settings()
+        delay = min(settings.queue_retry_max_seconds, settings.queue_retry_base_seconds * (2 ** max(attempts - 1, 0)))
+        # Keep at least half of the backoff and randomize the rest so failed tasks don't retry in lockstep
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    async def _retry_scheduler_loop(self) -> None:
+        """Promote RETRY_SCHEDULED items to QUEUED when their retry_after is due"""
+        poll_interval = get_settings().queue_poll_interval_seconds
+        while self._processing:
+            try:
+                self._retry_scheduled.clear()
+                next_retry_at = await self.promote_due_retries()
+                
+                # Sleep until the earliest scheduled retry (or a newly scheduled one), capped by the poll interval
+                timeout = poll_interval
+                if next_retry_at:
+                    timeout = min(poll_interval, max((next_retry_at - datetime.utcnow()).total_seconds(), 0.1))
+                await self._wait_for_event(self._retry_scheduled, timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in queue retry scheduler: {e}")
+                await asyncio.sleep(10)
+    
+    async def promote_due_retries(self) -> Optional[datetime]:
+        """Requeue retries whose backoff has elapsed; returns when the next pending retry is due"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        now = datetime.utcnow()
         
-        # Priority order: urgent > high > normal > low, then by creation time
-        priority_order = ["urgent", "high", "normal", "low"]
+        due = await collection.find(
+            {"status": "RETRY_SCHEDULED", "retry_after": {"$lte": now}},
+            {"task_id": 1, "task_type": 1}
+        ).to_list(length=None)
+        for item in due:
+            result = await collection.update_one(
+                {"task_id": item["task_id"], "status": "RETRY_SCHEDULED"},
+                {"$set": {"status": "QUEUED", "updated_at": now, "queued_at": now}}
+            )
+            if result.modified_count:
+                self._notify_work(item.get("task_type"))
+                await task_service.add_task_event(
+                    task_id=item["task_id"],
+                    message="Retry backoff elapsed, task returned to the queue",
+                    status="QUEUED"
+                )
         
-        for priority in priority_order:
-            task = await collection.find_one_and_update(
-                {"status": "QUEUED", "priority": priority},
+        next_retry = await collection.find_one(
+            {"status": "RETRY_SCHEDULED"},
+            {"retry_after": 1},
+            sort=[("retry_after", 1)]
+        )
+        return next_retry.get("retry_after") if next_retry else None
+    
+    async def _aging_loop(self) -> None:
+        """Periodically promote items that waited a full aging period"""
+        while self._processing:
+            try:
+                await asyncio.sleep(min(get_settings().queue_aging_seconds, get_settings().queue_poll_interval_seconds))
+                await self.age_waiting_tasks()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in queue aging loop: {e}")
+    
+    async def age_waiting_tasks(self) -> int:
+        """
+        Promote queued items one priority level for every queue_aging_seconds they have waited.
+        Aging stops one level below urgent, so only tasks submitted as urgent can claim that level.
+        """
+        aging_seconds = get_settings().queue_aging_seconds
+        if aging_seconds <= 0:
+            return 0
+        
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=aging_seconds)
+        promoted = 0
+        
+        priority_names = {rank: priority for priority, rank in PRIORITY_RANKS.items()}
+        # The best rank aging can reach: one level below urgent
+        aging_ceiling = get_priority_rank(TaskPriority.URGENT.value) + 1
+        
+        # Highest priorities first so an item moves at most one level per sweep
+        for rank in sorted(set(PRIORITY_RANKS.values())):
+            if rank <= aging_ceiling:
+                continue
+            # The promoted item joins the higher priority at its current virtual time, i.e. next in line
+            virtual_time = await self._get_virtual_time(rank - 1)
+            result = await collection.update_many(
+                {
+                    "status": "QUEUED",
+                    "priority_rank": rank,
+                    "$or": [
+                        {"aged_at": {"$lte": cutoff}},
+                        {"aged_at": None, "created_at": {"$lte": cutoff}}
+                    ]
+                },
+                {"$set": {
+                    "priority": priority_names[rank - 1],
+                    "priority_rank": rank - 1,
+                    "fair_tag": virtual_time,
+                    "aged_at": now,
+                    "updated_at": now
+                }}
+            )
+            promoted += result.modified_count
+        
+        if promoted:
+            logger.info(f"Promoted {promoted} long-waiting queue items one priority level")
+            self._notify_work()
+        return promoted
+    
+    async def _archive_loop(self) -> None:
+        """Periodically archive finished tasks older than task_archive_after_days and purge expired archive entries"""
+        while self._processing:
+            try:
+                await archive_service.archive_finished_tasks()
+                await asyncio.sleep(get_settings().task_archive_interval_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in task archive loop: {e}")
+                await asyncio.sleep(60)
+    
+    async def _stats_loop(self) -> None:
+        """Periodically recount the per-account task counters (the first run also builds them after an upgrade)"""
+        while self._processing:
+            try:
+                await task_service.reconcile_task_stats()
+                await asyncio.sleep(get_settings().task_stats_reconcile_interval_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in task counter reconciliation loop: {e}")
+                await asyncio.sleep(60)
+    
+    async def _lease_loop(self) -> None:
+        """Heartbeat the leases of running tasks and reclaim expired leases"""
+        heartbeat_seconds = get_settings().queue_heartbeat_seconds
+        while self._processing:
+            try:
+                await asyncio.sleep(heartbeat_seconds)
+                await self._renew_leases()
+                await self.reclaim_expired_leases()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in queue lease loop: {e}")
+    
+    async def _renew_leases(self) -> None:
+        """Extend the leases of every task this worker is running"""
+        task_ids = self.current_task_ids
+        if not task_ids:
+            return
+        
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        now = datetime.utcnow()
+        await collection.update_many(
+            {"task_id": {"$in": task_ids}, "worker_id": self.worker_id, "status": {"$in": ["PROCESSING", "CANCELLING"]}},
+            {
+                "$set": {
+                    "heartbeat_at": now,
+                    "lease_expires_at": now + timedelta(seconds=get_settings().queue_lease_seconds)
+                }
+            }
+        )
+        
+        # A task whose lease was reclaimed by another worker must not keep running here,
+        # and one cancelled through another node (status CANCELLING) is stopped
+        async for item in collection.find({"task_id": {"$in": task_ids}}, {"task_id": 1, "worker_id": 1, "status": 1}):
+            if item.get("worker_id") != self.worker_id and item["task_id"] in self._active_tasks:
+                logger.warning(f"Lease on task {item['task_id']} was taken over by {item.get('worker_id')}, stopping local run")
+                self._active_tasks[item["task_id"]].cancel()
+            elif item.get("status") == "CANCELLING" and item["task_id"] in self._cancel_tokens:
+                self._cancel_tokens[item["task_id"]].cancel()
+    
+    async def _check_cancel_requests(self) -> None:
+        """Stop local runs whose queue item was flagged CANCELLING by another node"""
+        task_ids = list(self._cancel_tokens.keys())
+        if not task_ids:
+            return
+        
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        async for item in collection.find(
+            {"task_id": {"$in": task_ids}, "worker_id": self.worker_id, "status": "CANCELLING"},
+            {"task_id": 1}
+        ):
+            token = self._cancel_tokens.get(item["task_id"])
+            if token:
+                logger.info(f"Cancellation of task {item['task_id']} requested remotely, stopping local run")
+                token.cancel()
+    
+    async def reclaim_expired_leases(self) -> List[str]:
+        """Requeue (or fail, once out of attempts) tasks whose worker stopped heartbeating"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        reclaimed_ids = []
+        
+        while True:
+            now = datetime.utcnow()
+            # Take over the expired lease atomically so only one worker handles it
+            queue_item = await collection.find_one_and_update(
+                {"status": {"$in": ["PROCESSING", "CANCELLING"]}, "lease_expires_at": {"$lt": now}},
                 {
                     "$set": {
-                        "status": "PROCESSING",
-                        "updated_at": datetime.utcnow(),
-                        "processing_started_at": datetime.utcnow()
+                        "worker_id": self.worker_id,
+                        "lease_expires_at": now + timedelta(seconds=get_settings().queue_lease_seconds),
+                        "updated_at": now
                     }
                 },
-                sort=[("created_at", 1)],  # Oldest first within same priority
-                return_document=True
+                return_document=False
             )
+            if not queue_item:
+                break
             
-            if task:
-                return task
+            task_id = queue_item["task_id"]
+            previous_worker = queue_item.get("worker_id")
+            reclaimed_ids.append(task_id)
+            logger.warning(f"Reclaiming task {task_id}: lease of worker {previous_worker} expired")
+            
+            await queue_metrics.increment(queue_item.get("task_type"), "lease_expired")
+            if queue_item.get("status") == "CANCELLING":
+                # We hold the lease now, so this finishes the cancellation like the worker would have
+                await self._mark_queue_item_cancelled(
+                    task_id,
+                    f"Worker {previous_worker} stopped before acknowledging the cancellation",
+                    task_type=queue_item.get("task_type")
+                )
+                continue
+            
+            await self._handle_task_failure(queue_item, f"Worker {previous_worker} lease expired", failure_reason="LEASE_EXPIRED")
         
-        return None
+        return reclaimed_ids
     
     async def _process_task(self, queue_item: Dict[str, Any]) -> None:
         """Process a single task from the queue using appropriate processor"""
         task_id = queue_item["task_id"]
         task_type = queue_item["task_type"]
-        self._current_task_id = task_id
+        cancel_token = CancellationToken(task_id)
+        self._cancel_tokens[task_id] = cancel_token
         
         try:
             logger.info(f"Starting {task_type} processing for task {task_id}")
@@ -275,24 +1529,186 @@ class TaskQueueService:
             # Create appropriate processor
             processor = TaskProcessorFactory.create_processor(task_type)
             
-            # Set estimated completion time
-            estimated_completion = await processor.estimate_completion_time(queue_item["request_data"])
+            # Set estimated completion time (learned from earlier runs with the same features)
+            request_data = queue_item.get("request_data") or {}
+            estimate_features = processor.get_estimate_features(request_data)
+            estimated_completion = await processor.estimate_completion_time(request_data)
             if estimated_completion:
                 await self._update_queue_item(task_id, {"estimated_completion": estimated_completion})
             
-            # Process the task using the specific processor
-            result = await processor.process_task(queue_item)
+            # Process the task using the specific processor, bounded by the type's deadline
+            timeout_minutes = queue_item.get("timeout_minutes") or processor.get_timeout_minutes()
+            result = await self._run_with_timeout(
+                self._run_processor(processor, queue_item, cancel_token),
+                timeout_minutes,
+                cancel_token
+            )
             
             # Mark as completed
-            await self._mark_queue_item_completed(task_id)
+            await self._mark_queue_item_completed(task_id, task_type)
+            if queue_item.get("processing_started_at"):
+                await duration_estimator.record_duration(
+                    task_type,
+                    estimate_features,
+                    (datetime.utcnow() - queue_item["processing_started_at"]).total_seconds()
+                )
             
             logger.info(f"{task_type} task {task_id} completed successfully")
             
+        except TaskCancelledError as e:
+            logger.info(f"{task_type} task {task_id} stopped: {e.message}")
+            self._cleanup_local_task_dir(task_id)
+            await self._mark_queue_item_cancelled(task_id, cancel_token.reason or e.message, e.stage, task_type)
+        except TaskTimeoutError as e:
+            logger.error(f"{task_type} task {task_id} timed out: {e.message}")
+            await queue_metrics.increment(task_type, "timed_out")
+            self._cleanup_local_task_dir(task_id)
+            await self._handle_task_failure(queue_item, e.message, failure_reason="TIMEOUT")
         except Exception as e:
             logger.error(f"Failed to process {task_type} task {task_id}: {e}")
             await self._handle_task_failure(queue_item, str(e))
+        except asyncio.CancelledError:
+            if task_id in self._handoff_ids:
+                self._cleanup_local_task_dir(task_id)
+                await self._hand_off(queue_item)
+            raise
         finally:
-            self._current_task_id = None
+            self._handoff_ids.discard(task_id)
+            self._active_tasks.pop(task_id, None)
+            self._active_types.pop(task_id, None)
+            self._cancel_tokens.pop(task_id, None)
+            lane = get_task_config(TaskType(task_type)).lane
+            self._slot_released[lane].set()
+            # The account may have been at its in-flight limit; let the lane look for its next item
+            self._work_available[lane].set()
+            await self._record_run_metrics(queue_item, cancel_token)
+    
+    async def _hand_off(self, queue_item: Dict[str, Any]) -> None:
+        """Return an unfinished task of a draining worker to the queue; the interrupted run doesn't count as an attempt"""
+        task_id = queue_item["task_id"]
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        now = datetime.utcnow()
+        result = await collection.update_one(
+            {"task_id": task_id, "worker_id": self.worker_id, "status": "PROCESSING"},
+            {
+                "$set": {"status": "QUEUED", "updated_at": now, "queued_at": now},
+                "$inc": {"handoff_count": 1},
+                "$unset": {"worker_id": "", "lease_expires_at": "", "leased_at": "", "heartbeat_at": ""}
+            }
+        )
+        if result.modified_count:
+            await queue_metrics.increment(queue_item["task_type"], "handed_off")
+            await task_service.add_task_event(
+                task_id=task_id,
+                message="Worker shutting down, task returned to the queue to restart on another worker",
+                status="QUEUED",
+                progress=1
+            )
+            return
+        
+        # Cancelled while we were draining: finish the cancellation instead
+        if await collection.find_one({"task_id": task_id, "worker_id": self.worker_id, "status": "CANCELLING"}, {"_id": 1}):
+            await self._mark_queue_item_cancelled(task_id, "Cancelled by user request", task_type=queue_item["task_type"])
+    
+    async def _record_run_metrics(self, queue_item: Dict[str, Any], cancel_token: CancellationToken) -> None:
+        """Record the service time and stage durations of a finished attempt"""
+        cancel_token.finish_stage()
+        task_type = queue_item["task_type"]
+        started_at = queue_item.get("processing_started_at")
+        if started_at:
+            await queue_metrics.observe("service", task_type, (datetime.utcnow() - started_at).total_seconds())
+        if cancel_token.stage_timings:
+            await queue_metrics.observe_stages(task_type, cancel_token.stage_timings)
+            try:
+                collection = await get_collection(TASK_QUEUE_COLLECTION)
+                await collection.update_one(
+                    {"task_id": queue_item["task_id"]},
+                    {"$set": {"stage_timings": {stage: round(seconds, 3) for stage, seconds in cancel_token.stage_timings.items()}}}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to store stage timings of task {queue_item['task_id']}: {e}")
+    
+    async def _run_processor(self, processor, queue_item: Dict[str, Any], cancel_token: CancellationToken) -> Any:
+        """
+        Run a processor under its lane's encode gate (when prefetch is on).
+        Prefetching processors take the gate only around their CPU-bound phase, so their network-bound
+        preparation overlaps the encodes of other tasks; every other type holds it for the whole run.
+        """
+        task_config = get_task_config(TaskType(queue_item["task_type"]))
+        encode_gate = self._encode_gates.get(task_config.lane)
+        encode_slot = EncodeSlot(encode_gate, cancel_token) if encode_gate else None
+        if encode_slot and task_config.supports_prefetch:
+            return await processor.process_task(queue_item, cancel_token=cancel_token, encode_slot=encode_slot)
+        async with (encode_slot or contextlib.nullcontext()):
+            return await processor.process_task(queue_item, cancel_token=cancel_token)
+    
+    async def _run_with_timeout(self, coro, timeout_minutes: int, cancel_token: Optional[CancellationToken] = None) -> Any:
+        """
+        Await a processor run, cancelling it once timeout_minutes have passed.
+        Time the run spends waiting for its encode slot (see EncodeSlot) extends the deadline.
+        Cancellation kills the run's ffmpeg children (see run_command) before TaskTimeoutError is raised;
+        timeouts raised by the run itself (LLM/HTTP clients) still surface as ordinary errors.
+        A run stopped through its cancellation token raises TaskCancelledError.
+        """
+        run = asyncio.ensure_future(coro)
+        if cancel_token:
+            cancel_token.attach(run)
+        deadline = time.monotonic() + timeout_minutes * 60
+        try:
+            while not run.done():
+                paused = cancel_token.paused_seconds if cancel_token else 0.0
+                remaining = deadline + paused - time.monotonic()
+                if remaining <= 0:
+                    break
+                await asyncio.wait({run}, timeout=remaining)
+        except asyncio.CancelledError:
+            # The worker itself is stopping (shutdown, lost lease): take the run down with it,
+            # giving it a moment to kill its subprocesses before the cancellation propagates
+            run.cancel()
+            await asyncio.wait({run}, timeout=10)
+            raise
+        if run.done():
+            if run.cancelled() and cancel_token and cancel_token.cancelled:
+                raise TaskCancelledError(f"Task cancelled: {cancel_token.reason}")
+            return run.result()
+        
+        run.cancel()
+        try:
+            await run
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error while cancelling timed out run: {e}")
+        raise TaskTimeoutError(f"Task exceeded its {timeout_minutes} minute timeout", timeout_minutes)
+    
+    async def _mark_queue_item_cancelled(
+        self, task_id: str, reason: str, stage: Optional[str] = None, task_type: Optional[str] = None
+    ) -> None:
+        """Finish a cancelled run: mark the queue item and the task as CANCELLED"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        result = await collection.update_one(
+            {"task_id": task_id, "worker_id": self.worker_id},
+            {
+                "$set": {
+                    "status": "CANCELLED",
+                    "updated_at": datetime.utcnow(),
+                    "cancelled_at": datetime.utcnow(),
+                    "finished_at": datetime.utcnow()
+                }
+            }
+        )
+        if result.matched_count == 0:
+            logger.warning(f"Task {task_id} was cancelled after its lease was taken over by another worker")
+            return
+        if task_type:
+            await queue_metrics.increment(task_type, "cancelled")
+        
+        await task_service.set_task_cancelled(
+            task_id=task_id,
+            cancellation_reason=reason,
+            cancellation_details={"stage": stage} if stage else None
+        )
+        await self._release_followers(task_id)
     
     async def _update_queue_item(self, task_id: str, update_data: Dict[str, Any]) -> None:
         """Update queue item with additional data"""
@@ -302,22 +1718,112 @@ class TaskQueueService:
             {"$set": {**update_data, "updated_at": datetime.utcnow()}}
         )
     
-    async def _mark_queue_item_completed(self, task_id: str) -> None:
-        """Mark a queue item as completed"""
+    async def _mark_queue_item_completed(self, task_id: str, task_type: Optional[str] = None) -> None:
+        """Mark a queue item as completed (only while this worker still owns its lease and nobody cancelled it)"""
         collection = await get_collection(TASK_QUEUE_COLLECTION)
-        await collection.update_one(
-            {"task_id": task_id},
+        result = await collection.update_one(
+            {"task_id": task_id, "worker_id": self.worker_id, "status": "PROCESSING"},
             {
                 "$set": {
                     "status": "COMPLETED",
                     "updated_at": datetime.utcnow(),
-                    "completed_at": datetime.utcnow()
+                    "completed_at": datetime.utcnow(),
+                    "finished_at": datetime.utcnow()
                 }
             }
         )
+        if result.matched_count == 0:
+            queue_item = await collection.find_one({"task_id": task_id, "worker_id": self.worker_id}, {"status": 1})
+            if queue_item and queue_item.get("status") == "CANCELLING":
+                # Cancelled after the last checkpoint: the cancellation wins, as it would at any checkpoint
+                await self._mark_queue_item_cancelled(
+                    task_id, "Task was cancelled while it was finishing", stage="completion", task_type=task_type
+                )
+                return
+            logger.warning(f"Task {task_id} finished after its lease was taken over by another worker")
+            return
+        if task_type:
+            await queue_metrics.increment(task_type, "completed")
+        await self._complete_followers(task_id)
     
-    async def _handle_task_failure(self, queue_item: Dict[str, Any], error_message: str) -> None:
-        """Handle task failure with retry logic"""
+    async def _complete_followers(self, leader_task_id: str) -> None:
+        """Give the followers of a completed task its result (the artifacts are linked, not copied)"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        followers = await collection.find(
+            {"leader_task_id": leader_task_id, "status": "FOLLOWING"},
+            {"task_id": 1}
+        ).to_list(length=None)
+        if not followers:
+            return
+        
+        leader_task = await task_service.get_task(leader_task_id)
+        if not leader_task or leader_task.status != "COMPLETED":
+            # No usable result (e.g. the processor didn't record one), let the followers run themselves
+            await self._release_followers(leader_task_id)
+            return
+        
+        for follower in followers:
+            result = await collection.update_one(
+                {"task_id": follower["task_id"], "status": "FOLLOWING"},
+                {"$set": {"status": "COMPLETED", "updated_at": datetime.utcnow(), "completed_at": datetime.utcnow(), "finished_at": datetime.utcnow()}}
+            )
+            if result.modified_count:
+                await task_service.set_task_completed(
+                    task_id=follower["task_id"],
+                    result_url=leader_task.result_url,
+                    task_folder_content=leader_task.task_folder_content,
+                    final_message=f"Task completed with the result of identical task {leader_task_id}"
+                )
+        logger.info(f"Completed {len(followers)} followers of task {leader_task_id}")
+    
+    async def _release_followers(self, leader_task_id: str) -> None:
+        """A leader ended without a result: promote its first follower to run, the others follow that one"""
+        collection = await get_collection(TASK_QUEUE_COLLECTION)
+        followers = await collection.find(
+            {"leader_task_id": leader_task_id, "status": "FOLLOWING"}
+        ).sort("created_at", 1).to_list(length=None)
+        if not followers:
+            return
+        
+        new_leader = followers[0]
+        now = datetime.utcnow()
+        priority_rank = new_leader.get("priority_rank", get_priority_rank(new_leader.get("priority")))
+        result = await collection.update_one(
+            {"task_id": new_leader["task_id"], "status": "FOLLOWING"},
+            {
+                "$set": {
+                    "status": "QUEUED",
+                    "updated_at": now,
+                    "queued_at": now,
+                    "enqueue_seq": await self._next_enqueue_seq(new_leader["task_type"], priority_rank),
+                    "fair_tag": await self._next_fair_tag(new_leader.get("account_id"), priority_rank)
+                },
+                "$unset": {"leader_task_id": ""}
+            }
+        )
+        if not result.modified_count:
+            return
+        await collection.update_many(
+            {"leader_task_id": leader_task_id, "status": "FOLLOWING"},
+            {"$set": {"leader_task_id": new_leader["task_id"], "updated_at": now}}
+        )
+        self._notify_work(new_leader.get("task_type"))
+        await task_service.add_task_event(
+            task_id=new_leader["task_id"],
+            message=f"Identical task {leader_task_id} ended without a result, running this task instead",
+            status="QUEUED"
+        )
+        logger.info(f"Task {new_leader['task_id']} replaces {leader_task_id} as leader of {len(followers)} identical requests")
+    
+    def _cleanup_local_task_dir(self, task_id: str) -> None:
+        """Remove the partial output of an aborted run so it doesn't pile up on disk"""
+        local_task_dir = os.path.join(".", "tasks", task_id)
+        if os.path.isdir(local_task_dir):
+            shutil.rmtree(local_task_dir, ignore_errors=True)
+            logger.info(f"Removed local task directory {local_task_dir}")
+    
+    async def _handle_task_failure(self, queue_item: Dict[str, Any], error_message: str, failure_reason: str = "ERROR") -> None:
+        """Handle task failure with retry logic (failure_reason is ERROR, TIMEOUT or LEASE_EXPIRED)"""
         task_id = queue_item["task_id"]
         task_type = queue_item["task_type"]
         attempts = queue_item.get("attempts", 0) + 1
@@ -325,24 +1831,33 @@ class TaskQueueService:
         
         collection = await get_collection(TASK_QUEUE_COLLECTION)
         
+        # Only the lease owner may move the item on; a worker that lost its lease leaves it alone
+        owned_filter = {"task_id": task_id, "worker_id": self.worker_id}
+        
         if attempts >= max_attempts:
             # Max attempts reached, mark as failed
-            await collection.update_one(
-                {"task_id": task_id},
+            result = await collection.update_one(
+                owned_filter,
                 {
                     "$set": {
                         "status": "FAILED",
                         "updated_at": datetime.utcnow(),
                         "failed_at": datetime.utcnow(),
+                        "finished_at": datetime.utcnow(),
                         "attempts": attempts,
-                        "last_error": error_message
+                        "last_error": error_message,
+                        "last_failure_reason": failure_reason
                     }
                 }
             )
+            if result.matched_count == 0:
+                logger.warning(f"Not failing task {task_id}: lease is owned by another worker")
+                return
             
             # Update task status to failed
             error_details = {
-                "error_type": f"{task_type.title()}ProcessingError", 
+                "error_type": "TaskTimeoutError" if failure_reason == "TIMEOUT" else f"{task_type.title()}ProcessingError", 
+                "failure_reason": failure_reason,
                 "details": error_message, 
                 "attempts": attempts
             }
@@ -354,26 +1869,36 @@ class TaskQueueService:
             )
             
             logger.error(f"Task {task_id} failed permanently after {attempts} attempts")
+            await queue_metrics.increment(task_type, "failed")
+            await self._release_followers(task_id)
         else:
-            # Retry the task
-            await collection.update_one(
-                {"task_id": task_id},
+            # Schedule a retry; the retry scheduler requeues the item once the backoff has elapsed
+            retry_delay = self._get_retry_delay(attempts)
+            result = await collection.update_one(
+                owned_filter,
                 {
                     "$set": {
-                        "status": "QUEUED",  # Put back in queue
+                        "status": "RETRY_SCHEDULED",
                         "updated_at": datetime.utcnow(),
                         "attempts": attempts,
                         "last_error": error_message,
-                        "retry_after": datetime.utcnow() + timedelta(minutes=5 * attempts)  # Exponential backoff
-                    }
+                        "last_failure_reason": failure_reason,
+                        "retry_after": datetime.utcnow() + timedelta(seconds=retry_delay)  # Exponential backoff
+                    },
+                    "$unset": {"worker_id": "", "lease_expires_at": ""}
                 }
             )
+            if result.matched_count == 0:
+                logger.warning(f"Not retrying task {task_id}: lease is owned by another worker")
+                return
             
             await task_service.add_task_event(
                 task_id=task_id,
-                message=f"Task failed (attempt {attempts}/{max_attempts}), retrying in {5 * attempts} minutes: {error_message}",
+                message=f"Task failed with {failure_reason} (attempt {attempts}/{max_attempts}), retrying in {int(retry_delay)} seconds: {error_message}",
                 status="RETRY_SCHEDULED"
             )
+            self._retry_scheduled.set()
+            await queue_metrics.increment(task_type, "retried")
             
             logger.warning(f"Task {task_id} failed (attempt {attempts}/{max_attempts}), scheduling retry")
     
@@ -395,10 +1920,9 @@ class TaskQueueService:
                 "message": f"Cannot cancel task with status {current_status}"
             }
         
-        # If task is currently processing, we can't cancel it mid-processing
-        # But we can mark it for cancellation
-        if current_status == "PROCESSING" and self._current_task_id == task_id:
-            # Mark for cancellation - the processor should check this periodically
+        # A running task is marked CANCELLING and stopped by the worker that owns it:
+        # directly when that is this process, otherwise through the change stream or its next heartbeat
+        if current_status == "PROCESSING" and (task_id in self._active_tasks or queue_item.get("worker_id")):
             await collection.update_one(
                 {"task_id": task_id},
                 {
@@ -412,10 +1936,13 @@ class TaskQueueService:
             
             await task_service.add_task_event(
                 task_id=task_id,
-                message="Task cancellation requested - will be cancelled when safe to do so",
+                message="Task cancellation requested - stopping the running work",
                 status="CANCELLING"
             )
             
+            if task_id in self._cancel_tokens:
+                self._cancel_tokens[task_id].cancel()
+            
             return {
                 "success": True,
                 "message": "Task marked for cancellation"
@@ -428,16 +1955,19 @@ class TaskQueueService:
                     "$set": {
                         "status": "CANCELLED",
                         "updated_at": datetime.utcnow(),
-                        "cancelled_at": datetime.utcnow()
+                        "cancelled_at": datetime.utcnow(),
+                        "finished_at": datetime.utcnow()
                     }
                 }
             )
+            await queue_metrics.increment(queue_item.get("task_type"), "cancelled")
             
             await task_service.add_task_event(
                 task_id=task_id,
                 message="Task cancelled by user request",
                 status="CANCELLED"
             )
+            await self._release_followers(task_id)
             
             return {
                 "success": True,
@@ -445,15 +1975,24 @@ class TaskQueueService:
             }
     
     async def cleanup_stuck_tasks(self, max_processing_time_minutes: int = 30) -> Dict[str, Any]:
-        """Clean up tasks stuck in processing state"""
+        """
+        Clean up tasks stuck in processing state.
+        
+        Leased tasks are only touched once their lease has expired (a healthy worker keeps
+        renewing it, however long the render takes); they are requeued with the normal retry
+        logic. Legacy items without a lease fall back to the processing time cutoff.
+        """
         collection = await get_collection(TASK_QUEUE_COLLECTION)
         
-        # Find tasks that have been processing for too long
+        reclaimed_ids = await self.reclaim_expired_leases()
+        
+        # Find lease-less tasks that have been processing for too long
         cutoff_time = datetime.utcnow() - timedelta(minutes=max_processing_time_minutes)
         
         stuck_tasks = []
         async for task in collection.find({
             "status": "PROCESSING",
+            "lease_expires_at": {"$exists": False},
             "updated_at": {"$lt": cutoff_time}
         }):
             stuck_tasks.append(task)
@@ -486,9 +2025,11 @@ class TaskQueueService:
         
         return {
             "success": True,
-            "message": f"Cleaned up {cleanup_count} stuck tasks",
+            "message": f"Cleaned up {cleanup_count} stuck tasks, reclaimed {len(reclaimed_ids)} expired leases",
             "cleaned_count": cleanup_count,
-            "cleaned_task_ids": [task["task_id"] for task in stuck_tasks]
+            "cleaned_task_ids": [task["task_id"] for task in stuck_tasks],
+            "reclaimed_count": len(reclaimed_ids),
+            "reclaimed_task_ids": reclaimed_ids
         }
 
 # Global instance
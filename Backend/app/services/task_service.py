@@ -1,12 +1,232 @@
+import asyncio
+import base64
+import json
+import logging
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+from bson import ObjectId
 from fastapi import HTTPException
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError
 
+from app.config import get_settings
 from app.db.mongodb_utils import get_collection
-from app.schemas.task import Task, TaskEvent, TaskCreate
+from app.services import task_stats
+from app.services.task_cache import task_cache
+from app.schemas.task import Task, TaskEvent, TaskCreate, TaskStatusView, TaskSummary
+
+logger = logging.getLogger(__name__)
 
 TASKS_COLLECTION = "tasks"
+TASKS_ARCHIVE_COLLECTION = "tasks_archive"
+# Append-only event log (time-series collection where supported), read per task with pagination
+TASK_EVENTS_COLLECTION = "task_events"
+
+# Task documents created before the event log embed their history in "events"; reads leave it out
+WITHOUT_EMBEDDED_EVENTS = {"events": 0}
+# Set on tasks whose whole history is in the event log (new tasks, and old ones found without embedded events)
+EVENTS_IN_LOG = "events_in_log"
+
+# Heavy fields of a finished task moved to the archive; the rest stays in "tasks" as the listing summary
+ARCHIVED_TASK_FIELDS = ["events", "request_data", "task_folder_content", "error_details"]
+
+# Views of the task listing: "status" for polling, "summary" for dashboards, "full" for everything but events
+TASK_VIEWS = {"status": TaskStatusView, "summary": TaskSummary, "full": Task}
+# Fields that can be requested individually from the task listing
+TASK_LIST_FIELDS = [name for name in Task.model_fields if name != "events"]
+
+# Task listings are ordered newest first with task_id breaking ties, so (updated_at, task_id) is a unique position
+TASK_LIST_SORT = [("updated_at", -1), ("task_id", -1)]
+
+def task_projection(view: str = "full", fields: Optional[List[str]] = None) -> Dict[str, int]:
+    """MongoDB projection of a task listing view, or of an explicit list of fields (task_id and updated_at are always included)"""
+    if fields:
+        names = ["task_id", "updated_at", *fields]
+    elif view != "full":
+        names = list(TASK_VIEWS[view].model_fields)
+    else:
+        return WITHOUT_EMBEDDED_EVENTS
+    return {"_id": 0, **{name: 1 for name in names}}
+
+def encode_task_cursor(updated_at: datetime, task_id: str) -> str:
+    """Opaque page token pointing after the given task"""
+    payload = json.dumps({"u": updated_at.isoformat(), "t": task_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_task_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(updated_at, task_id) of a page token; raises ValueError for tokens that weren't issued by encode_task_cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["u"]), str(payload["t"])
+    except Exception:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+def next_task_cursor(tasks: List[Any], limit: int) -> Optional[str]:
+    """Token of the page after a full page of listed tasks (models or projected dicts), None on the last page"""
+    if not tasks or len(tasks) < limit:
+        return None
+    last = tasks[-1]
+    if isinstance(last, dict):
+        return encode_task_cursor(last["updated_at"], last["task_id"])
+    return encode_task_cursor(last.updated_at, last.task_id)
+
+def encode_event_cursor(timestamp: datetime, event_id: str) -> str:
+    """Opaque page token pointing at an event; event_id is empty for events embedded in the task document"""
+    payload = json.dumps({"s": timestamp.isoformat(), "i": event_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_event_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(timestamp, event_id) of an event page token; raises ValueError for tokens that weren't issued by encode_event_cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        event_id = str(payload["i"])
+        if event_id and not ObjectId.is_valid(event_id):
+            raise ValueError(event_id)
+        return datetime.fromisoformat(payload["s"]), event_id
+    except Exception:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+def _event_document(task_id: str, event: TaskEvent, status: Optional[str] = None, progress: Optional[float] = None) -> Dict[str, Any]:
+    document = {"task_id": task_id, **event.model_dump(by_alias=True)}
+    if status:
+        document["status"] = status
+    if progress is not None:
+        document["progress"] = progress
+    return document
+
+def _latest_event_update(event: TaskEvent, count: int = 1) -> Dict[str, Any]:
+    """Update operators that keep the latest event on the task document instead of the whole history"""
+    return {
+        '$set': {'last_event_message': event.message, 'last_event_at': event.timestamp},
+        '$inc': {'event_count': count}
+    }
+
+async def _append_events(documents: List[Dict[str, Any]], write_concern: Optional[WriteConcern] = None) -> None:
+    if not documents:
+        return
+    events_collection = await get_collection(TASK_EVENTS_COLLECTION)
+    if write_concern:
+        events_collection = events_collection.with_options(write_concern=write_concern)
+    await events_collection.insert_many(documents, ordered=False)
+    # Cached snapshots carry the latest events
+    for task_id in {document["task_id"] for document in documents}:
+        task_cache.invalidate(task_id)
+
+def _updated_document(before: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """The task document after a $set/$inc update, built from the one returned before it (saves a second read)"""
+    after = {**before, **update.get('$set', {})}
+    for field, amount in update.get('$inc', {}).items():
+        after[field] = (after.get(field) or 0) + amount
+    return after
+
+TERMINAL_TASK_STATUSES = ["COMPLETED", "FAILED", "CANCELLED"]
+
+# Terminal states wait for a majority of the replica set
+DURABLE = WriteConcern(w="majority")
+
+
+class TaskProgressWriter:
+    """
+    Per-process buffer of task progress events.
+
+    Consecutive progress ticks of a task (events without a status) are merged into one update (latest
+    progress and message, event count) and written in the background every task_progress_flush_seconds
+    with one bulk_write, so processors never wait on MongoDB to report progress. Events that carry a
+    status flush the task's buffer and are written synchronously; terminal writes additionally use a
+    majority write concern.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._events: List[Dict[str, Any]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    def record(self, task_id: str, event: TaskEvent, progress: Optional[float] = None) -> None:
+        """Buffer a progress event; returns immediately"""
+        pending = self._pending.setdefault(task_id, {"count": 0})
+        pending["count"] += 1
+        pending["event"] = event
+        if progress is not None:
+            pending["progress"] = progress
+        self._events.append(_event_document(task_id, event, None, progress))
+        task_cache.invalidate(task_id)
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        # Runs while there is something to write and restarts with the next tick
+        while self._pending or self._events:
+            await asyncio.sleep(get_settings().task_progress_flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Failed to flush task progress: {e}")
+
+    async def flush(self, task_id: Optional[str] = None) -> None:
+        """Write the buffered progress of one task (or all tasks)"""
+        if task_id is None:
+            pending, self._pending = self._pending, {}
+            events, self._events = self._events, []
+        else:
+            pending = {task_id: self._pending.pop(task_id)} if task_id in self._pending else {}
+            events = [event for event in self._events if event["task_id"] == task_id]
+            if events:
+                self._events = [event for event in self._events if event["task_id"] != task_id]
+        if not pending and not events:
+            return
+
+        operations = []
+        for pending_task_id, entry in pending.items():
+            update = _latest_event_update(entry["event"], entry["count"])
+            update['$set']['updated_at'] = entry["event"].timestamp
+            if entry.get("progress") is not None:
+                update['$set']['progress'] = entry["progress"]
+            # A late tick must never reopen a task that already reached a terminal state
+            operations.append(UpdateOne(
+                {'task_id': pending_task_id, 'status': {'$nin': TERMINAL_TASK_STATUSES}},
+                update
+            ))
+
+        if operations:
+            collection = await get_collection(TASKS_COLLECTION)
+            await collection.bulk_write(operations, ordered=False)
+        await _append_events(events)
+        for pending_task_id in pending:
+            task_cache.invalidate(pending_task_id)
+
+    async def close(self) -> None:
+        """Write everything still buffered and stop the background flush"""
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush task progress on shutdown: {e}")
+
+
+progress_writer = TaskProgressWriter()
+
+def merge_archived_task(task_data: Dict[str, Any], archived_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Rebuild the full document of an archived task from its hot summary and its archive entry.
+    The summary wins; events recorded after archiving (a regenerated task) follow the archived ones.
+    """
+    if not archived_data:
+        return dict(task_data)
+    merged = {key: value for key, value in archived_data.items() if key not in ("_id", "archived_at")}
+    for key, value in task_data.items():
+        if key in ARCHIVED_TASK_FIELDS and value is None:
+            continue
+        merged[key] = value
+    merged["events"] = (archived_data.get("events") or []) + (task_data.get("events") or [])
+    return merged
 
 async def create_task(
     task_id: str, 
@@ -24,7 +244,7 @@ async def create_task(
     Create a new task or return existing one if task_id already exists.
     """
     collection = await get_collection(TASKS_COLLECTION)
-    existing_task = await collection.find_one({"task_id": task_id})
+    existing_task = await collection.find_one({"task_id": task_id}, WITHOUT_EMBEDDED_EVENTS)
     
     if existing_task:
         # Return existing task for idempotency
@@ -46,12 +266,17 @@ async def create_task(
         request_data=request_data,  # Store the complete request body for video generation
         task_source_name=task_source_name,
         task_source_id=task_source_id,
-        task_source_group_id=task_source_group_id,
-        events=[TaskEvent(message=f"Task {initial_status.lower()}")]
+        task_source_group_id=task_source_group_id
     )
+    initial_event = TaskEvent(message=f"Task {initial_status.lower()}")
+    task_data.last_event_message = initial_event.message
+    task_data.last_event_at = initial_event.timestamp
+    task_data.event_count = 1
     
     try:
-        await collection.insert_one(task_data.model_dump(by_alias=True))
+        await collection.insert_one({**task_data.model_dump(by_alias=True, exclude={"events"}), EVENTS_IN_LOG: True})
+        await _append_events([_event_document(task_id, initial_event, initial_status, 0.0)])
+        await task_stats.record_created([task_data.model_dump(include={"account_id", "task_source_group_id", "status"})])
         return task_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create task: {str(e)}")
@@ -62,52 +287,267 @@ async def get_task(task_id: str) -> Optional[Task]:
     """
     try:
         collection = await get_collection(TASKS_COLLECTION)
-        task_data = await collection.find_one({"task_id": task_id})
+        task_data = await collection.find_one({"task_id": task_id}, WITHOUT_EMBEDDED_EVENTS)
         if task_data:
+            if task_data.get("archived_at"):
+                archive = await get_collection(TASKS_ARCHIVE_COLLECTION)
+                task_data = merge_archived_task(task_data, await archive.find_one({"task_id": task_id}, WITHOUT_EMBEDDED_EVENTS))
             return Task(**task_data)
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve task: {str(e)}")
 
+async def get_task_snapshot(task_id: str, events_limit: int = 20) -> Optional[Task]:
+    """
+    Task with its latest events for status polls, served from the per-process task_cache while unchanged.
+    The returned Task is shared with other polls and must not be modified.
+    """
+    cached = task_cache.get(task_id, events_limit)
+    if cached is not None:
+        return cached
+    
+    read_started = time.monotonic()
+    try:
+        collection = await get_collection(TASKS_COLLECTION)
+        task_data = await collection.find_one({"task_id": task_id}, WITHOUT_EMBEDDED_EVENTS)
+        if not task_data:
+            return None
+        doc_id = task_data.get("_id")
+        events_in_log = bool(task_data.get(EVENTS_IN_LOG))
+        if task_data.get("archived_at"):
+            archive = await get_collection(TASKS_ARCHIVE_COLLECTION)
+            task_data = merge_archived_task(task_data, await archive.find_one({"task_id": task_id}, WITHOUT_EMBEDDED_EVENTS))
+        task = Task(**task_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve task: {str(e)}")
+    
+    if events_limit:
+        task.events = await get_task_events(task_id, limit=events_limit, events_in_log=events_in_log)
+    task_cache.put(task_id, task, read_started, variant=events_limit, doc_id=doc_id)
+    return task
+
+# A position in a task's history: (timestamp, event_id). Events are ordered by timestamp, then by their log _id,
+# with embedded legacy events (event_id "") first; a None event_id bounds on the timestamp alone.
+EventPosition = Tuple[datetime, Optional[str]]
+
+def _event_position_filter(position: EventPosition, operator: str) -> Dict[str, Any]:
+    """Event log query for the events strictly before ($lt) or after ($gt) a position"""
+    timestamp, event_id = position
+    if event_id is None or (not event_id and operator == "$lt"):
+        return {"timestamp": {operator: timestamp}}
+    same_timestamp: Dict[str, Any] = {"timestamp": timestamp}
+    if event_id:
+        same_timestamp["_id"] = {operator: ObjectId(event_id)}
+    return {"$or": [{"timestamp": {operator: timestamp}}, same_timestamp]}
+
+def _precedes(first: EventPosition, second: EventPosition) -> bool:
+    """Whether first sorts strictly before second (a None event_id compares on the timestamp alone)"""
+    if first[1] is None or second[1] is None:
+        return first[0] < second[0]
+    return first < second
+
+async def _read_task_events(
+    task_id: str,
+    limit: int,
+    before: Optional[EventPosition],
+    after: Optional[EventPosition],
+    events_in_log: bool
+) -> List[Tuple[TaskEvent, str]]:
+    """A page of (event, event_id) pairs in chronological order, see get_task_events"""
+    try:
+        conditions: List[Dict[str, Any]] = [{"task_id": task_id}]
+        if before:
+            conditions.append(_event_position_filter(before, "$lt"))
+        if after:
+            conditions.append(_event_position_filter(after, "$gt"))
+        query = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+        
+        events_collection = await get_collection(TASK_EVENTS_COLLECTION)
+        newest_first = after is None
+        direction = -1 if newest_first else 1
+        cursor = events_collection.find(query, {"task_id": 0}).sort([("timestamp", direction), ("_id", direction)]).limit(limit)
+        events = []
+        async for document in cursor:
+            event_id = str(document.pop("_id"))
+            events.append((TaskEvent(**document), event_id))
+        
+        # Legacy history embedded in the task document (or its archive entry)
+        if len(events) < limit and not events_in_log:
+            legacy = [
+                (event, "") for event in await _get_embedded_events(task_id)
+                if (not before or _precedes((event.timestamp, ""), before))
+                and (not after or _precedes(after, (event.timestamp, "")))
+            ]
+            events.extend(legacy)
+            events.sort(key=lambda pair: (pair[0].timestamp, pair[1]), reverse=newest_first)
+            events = events[:limit]
+        
+        if newest_first:
+            events.reverse()
+        return events
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve task events: {str(e)}")
+
+async def get_task_events(
+    task_id: str,
+    limit: int = 50,
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    events_in_log: bool = False
+) -> List[TaskEvent]:
+    """
+    Retrieve a page of a task's event history in chronological order.
+    Without after, the page ends at the latest event (or just before `before`); with after it starts there.
+    Events embedded in older task documents are included unless the caller knows the task has none (events_in_log).
+    Timestamps bound strictly, so use get_task_events_page to page through events sharing a timestamp.
+    """
+    events = await _read_task_events(
+        task_id, limit, (before, None) if before else None, (after, None) if after else None, events_in_log
+    )
+    return [event for event, _ in events]
+
+async def get_task_events_page(
+    task_id: str,
+    limit: int = 50,
+    before_cursor: Optional[str] = None,
+    after_cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    get_task_events paged by (timestamp, event id) tokens, so events written in the same millisecond are
+    neither skipped nor repeated at page boundaries. Returns the events with the tokens of the first
+    (previous_cursor) and last (next_cursor) event; invalid tokens raise ValueError.
+    """
+    before = decode_event_cursor(before_cursor) if before_cursor else None
+    after = decode_event_cursor(after_cursor) if after_cursor else None
+    events = await _read_task_events(task_id, limit, before, after, events_in_log=False)
+    return {
+        "events": [event for event, _ in events],
+        "previous_cursor": encode_event_cursor(events[0][0].timestamp, events[0][1]) if events else before_cursor,
+        "next_cursor": encode_event_cursor(events[-1][0].timestamp, events[-1][1]) if events else after_cursor
+    }
+
+async def _get_embedded_events(task_id: str) -> List[TaskEvent]:
+    """History embedded in a task from before the event log; a task found without any is flagged so reads skip this"""
+    collection = await get_collection(TASKS_COLLECTION)
+    document = await collection.find_one({"task_id": task_id}, {"events": 1, EVENTS_IN_LOG: 1, "archived_at": 1})
+    if not document or document.get(EVENTS_IN_LOG):
+        return []
+    embedded = list(document.get("events") or [])
+    if document.get("archived_at"):
+        archive = await get_collection(TASKS_ARCHIVE_COLLECTION)
+        archived = await archive.find_one({"task_id": task_id}, {"events": 1})
+        embedded.extend((archived or {}).get("events") or [])
+    if not embedded:
+        # Nothing writes embedded events any more, so the flag never goes stale
+        await collection.update_one({"task_id": task_id}, {"$set": {EVENTS_IN_LOG: True}})
+    return [TaskEvent(**event) for event in embedded]
+
+async def get_task_request_data(task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve the original request body of a task (from the archive for archived tasks).
+    """
+    task = await get_task(task_id)
+    return task.request_data if task else None
+
 async def add_task_event(
     task_id: str, 
     message: str, 
     details: Optional[Dict[str, Any]] = None, 
     status: Optional[str] = None, 
-    progress: Optional[float] = None
+    progress: Optional[float] = None,
+    return_task: bool = False
 ) -> Optional[Task]:
     """
     Add an event to a task and optionally update status and progress.
+
+    Progress events without a status are buffered by progress_writer and return None at once.
+    Events that carry a status are written before returning;
+    the updated task is only read back with return_task=True.
     """
     try:
-        collection = await get_collection(TASKS_COLLECTION)
-        
         # Create the event
         event = TaskEvent(message=message, details=details)
+
+        if not return_task and not status:
+            progress_writer.record(task_id, event, progress)
+            return None
+
+        # Earlier ticks of this task must not land after this event
+        await progress_writer.flush(task_id)
+        collection = await get_collection(TASKS_COLLECTION)
         
-        update_fields = {
-            '$push': {'events': event.model_dump(by_alias=True)},
-            '$set': {'updated_at': datetime.utcnow()}
-        }
+        update_fields = _latest_event_update(event)
+        update_fields['$set']['updated_at'] = datetime.utcnow()
         
         if status:
             update_fields['$set']['status'] = status
         if progress is not None:
             update_fields['$set']['progress'] = progress
 
-        result = await collection.find_one_and_update(
+        # The document before the write tells which status counter to move
+        previous = await collection.find_one_and_update(
             {'task_id': task_id},
             update_fields,
-            return_document=ReturnDocument.AFTER
+            projection=WITHOUT_EMBEDDED_EVENTS if return_task else task_stats.STATS_PROJECTION,
+            return_document=ReturnDocument.BEFORE
         )
+        task_cache.invalidate(task_id)
         
-        if result:
-            return Task(**result)
+        if previous:
+            await _append_events([_event_document(task_id, event, status, progress)])
+            await task_stats.record_transition(previous, status)
+            return Task(**_updated_document(previous, update_fields)) if return_task else None
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to add task event: {str(e)}")
 
-async def update_task_status(task_id: str, status: str, progress: Optional[float] = None) -> Optional[Task]:
+async def add_task_events_bulk(events: List[Dict[str, Any]]) -> int:
+    """
+    Add one event to each of many tasks in a single bulk_write.
+    Each entry takes the add_task_event arguments (task_id, message, details, status, progress).
+    """
+    if not events:
+        return 0
+    try:
+        for task_id in {entry["task_id"] for entry in events}:
+            await progress_writer.flush(task_id)
+        collection = await get_collection(TASKS_COLLECTION)
+        status_task_ids = [entry["task_id"] for entry in events if entry.get("status")]
+        previous = {}
+        if status_task_ids:
+            async for task in collection.find({'task_id': {'$in': status_task_ids}}, {**task_stats.STATS_PROJECTION, 'task_id': 1}):
+                previous[task["task_id"]] = task
+        now = datetime.utcnow()
+        operations = []
+        event_documents = []
+        for entry in events:
+            event = TaskEvent(message=entry["message"], details=entry.get("details"))
+            update_fields = _latest_event_update(event)
+            update_fields['$set']['updated_at'] = now
+            if entry.get("status"):
+                update_fields['$set']['status'] = entry["status"]
+            if entry.get("progress") is not None:
+                update_fields['$set']['progress'] = entry["progress"]
+            operations.append(UpdateOne({'task_id': entry["task_id"]}, update_fields))
+            event_documents.append(_event_document(entry["task_id"], event, entry.get("status"), entry.get("progress")))
+        
+        result = await collection.bulk_write(operations, ordered=False)
+        for entry in events:
+            task_cache.invalidate(entry["task_id"])
+        await _append_events(event_documents)
+        await task_stats.record_transitions([
+            (previous.get(entry["task_id"]), entry.get("status")) for entry in events if entry.get("status")
+        ])
+        return result.modified_count
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to add task events: {str(e)}")
+
+async def update_task_status(
+    task_id: str, 
+    status: str, 
+    progress: Optional[float] = None, 
+    return_task: bool = False
+) -> Optional[Task]:
     """
     Update task status with an event message.
     """
@@ -115,15 +555,21 @@ async def update_task_status(task_id: str, status: str, progress: Optional[float
         task_id=task_id, 
         message=f"Status changed to {status.lower()}", 
         status=status, 
-        progress=progress
+        progress=progress,
+        return_task=return_task
     )
 
-async def set_task_progress(task_id: str, progress: float, message: Optional[str] = None) -> Optional[Task]:
+async def set_task_progress(
+    task_id: str, 
+    progress: float, 
+    message: Optional[str] = None, 
+    return_task: bool = False
+) -> Optional[Task]:
     """
     Update task progress with an optional custom message.
     """
     event_message = message or f"Progress updated to {progress}%"
-    return await add_task_event(task_id=task_id, message=event_message, progress=progress)
+    return await add_task_event(task_id=task_id, message=event_message, progress=progress, return_task=return_task)
 
 async def set_task_completed(
     task_id: str, 
@@ -135,7 +581,9 @@ async def set_task_completed(
     Mark a task as completed with result URL and optional folder content.
     """
     try:
-        collection = await get_collection(TASKS_COLLECTION)
+        # Buffered progress goes first so it can't be dropped behind the terminal state
+        await progress_writer.flush(task_id)
+        collection = (await get_collection(TASKS_COLLECTION)).with_options(write_concern=DURABLE)
         event = TaskEvent(message=final_message)
         
         update = {
@@ -147,21 +595,26 @@ async def set_task_completed(
                 'error_message': None,
                 'error_details': None
             },
-            '$push': {'events': event.model_dump(by_alias=True)}
+            '$inc': {'event_count': 1}
         }
+        update['$set'].update({'last_event_message': event.message, 'last_event_at': event.timestamp})
         
         # Add task_folder_content to update if provided
         if task_folder_content:
             update['$set']['task_folder_content'] = task_folder_content
             
-        result = await collection.find_one_and_update(
+        previous = await collection.find_one_and_update(
             {'task_id': task_id},
             update,
-            return_document=ReturnDocument.AFTER
+            projection=WITHOUT_EMBEDDED_EVENTS,
+            return_document=ReturnDocument.BEFORE
         )
+        task_cache.invalidate(task_id)
         
-        if result:
-            return Task(**result)
+        if previous:
+            await _append_events([_event_document(task_id, event, update['$set']['status'])], DURABLE)
+            await task_stats.record_transition(previous, update['$set']['status'])
+            return Task(**_updated_document(previous, update))
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to complete task: {str(e)}")
@@ -177,7 +630,9 @@ async def set_task_failed(
     Mark a task as failed with error details and optional folder content.
     """
     try:
-        collection = await get_collection(TASKS_COLLECTION)
+        # Buffered progress goes first so it can't be dropped behind the terminal state
+        await progress_writer.flush(task_id)
+        collection = (await get_collection(TASKS_COLLECTION)).with_options(write_concern=DURABLE)
         
         if not final_message:
             final_message = f"Task failed: {error_message}"
@@ -191,21 +646,26 @@ async def set_task_failed(
                 'error_details': error_details,
                 'updated_at': datetime.utcnow()
             },
-            '$push': {'events': event.model_dump(by_alias=True)}
+            '$inc': {'event_count': 1}
         }
+        update['$set'].update({'last_event_message': event.message, 'last_event_at': event.timestamp})
         
         # Add task_folder_content to update if provided
         if task_folder_content:
             update['$set']['task_folder_content'] = task_folder_content
         
-        result = await collection.find_one_and_update(
+        previous = await collection.find_one_and_update(
             {'task_id': task_id},
             update,
-            return_document=ReturnDocument.AFTER
+            projection=WITHOUT_EMBEDDED_EVENTS,
+            return_document=ReturnDocument.BEFORE
         )
+        task_cache.invalidate(task_id)
         
-        if result:
-            return Task(**result)
+        if previous:
+            await _append_events([_event_document(task_id, event, update['$set']['status'])], DURABLE)
+            await task_stats.record_transition(previous, update['$set']['status'])
+            return Task(**_updated_document(previous, update))
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to mark task as failed: {str(e)}")
@@ -221,7 +681,9 @@ async def set_task_cancelled(
     Mark a task as cancelled with cancellation details and optional folder content.
     """
     try:
-        collection = await get_collection(TASKS_COLLECTION)
+        # Buffered progress goes first so it can't be dropped behind the terminal state
+        await progress_writer.flush(task_id)
+        collection = (await get_collection(TASKS_COLLECTION)).with_options(write_concern=DURABLE)
         
         if not final_message:
             final_message = f"Task cancelled: {cancellation_reason}"
@@ -235,21 +697,26 @@ async def set_task_cancelled(
                 'error_details': cancellation_details,
                 'updated_at': datetime.utcnow()
             },
-            '$push': {'events': event.model_dump(by_alias=True)}
+            '$inc': {'event_count': 1}
         }
+        update['$set'].update({'last_event_message': event.message, 'last_event_at': event.timestamp})
         
         # Add task_folder_content to update if provided
         if task_folder_content:
             update['$set']['task_folder_content'] = task_folder_content
         
-        result = await collection.find_one_and_update(
+        previous = await collection.find_one_and_update(
             {'task_id': task_id},
             update,
-            return_document=ReturnDocument.AFTER
+            projection=WITHOUT_EMBEDDED_EVENTS,
+            return_document=ReturnDocument.BEFORE
         )
+        task_cache.invalidate(task_id)
         
-        if result:
-            return Task(**result)
+        if previous:
+            await _append_events([_event_document(task_id, event, update['$set']['status'])], DURABLE)
+            await task_stats.record_transition(previous, update['$set']['status'])
+            return Task(**_updated_document(previous, update))
         return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to mark task as cancelled: {str(e)}")
@@ -261,8 +728,11 @@ async def get_all_tasks(
     status_filter: Optional[str] = None,
     task_source_group_id: Optional[str] = None,
     task_source_ids: Optional[List[str]] = None,
-    task_ids: Optional[List[str]] = None
-) -> List[Task]:
+    task_ids: Optional[List[str]] = None,
+    view: str = "full",
+    fields: Optional[List[str]] = None,
+    cursor: Optional[str] = None
+) -> List[Any]:
     """
     Retrieve all tasks for a given user and optionally account, with pagination and status filtering.
     
@@ -275,9 +745,12 @@ async def get_all_tasks(
         task_source_group_id: Optional filter to only return tasks with a specific group ID
         task_source_ids: Optional list of source IDs to filter tasks by
         task_ids: Optional list of specific task IDs to retrieve
+        view: "full" (Task), "summary" (TaskSummary) or "status" (TaskStatusView); only the view's fields are read
+        fields: Optional list of fields to read instead of a view; tasks are returned as plain dicts
+        cursor: Optional page token (see next_task_cursor); continues after its task and ignores skip
         
     Returns:
-        List of Task objects
+        List of Task, TaskSummary or TaskStatusView objects, or dicts when fields are given
     """
     try:
         collection = await get_collection(TASKS_COLLECTION)
@@ -295,13 +768,26 @@ async def get_all_tasks(
         if task_ids:
             query["task_id"] = {"$in": task_ids}
         
-        # Execute the query with pagination
-        cursor = collection.find(query).sort("updated_at", -1).skip(skip).limit(limit)
+        # Keyset pagination: seek past the cursor's position in the (account_id[, status], updated_at, task_id) index
+        if cursor:
+            updated_at, last_task_id = decode_task_cursor(cursor)
+            query["$or"] = [
+                {"updated_at": {"$lt": updated_at}},
+                {"updated_at": updated_at, "task_id": {"$lt": last_task_id}}
+            ]
+            skip = 0
         
-        # Convert MongoDB results to Task objects
+        # Execute the query with pagination, reading only the requested fields
+        projection = task_projection(view, fields)
+        results = collection.find(query, projection).sort(TASK_LIST_SORT).skip(skip).limit(limit)
+        
+        # Explicit fields skip model validation; views build only their own fields
+        if fields:
+            return await results.to_list(length=limit)
+        model = TASK_VIEWS[view]
         tasks = []
-        async for task_data in cursor:
-            tasks.append(Task(**task_data))
+        async for task_data in results:
+            tasks.append(model(**task_data))
         
         return tasks
     except Exception as e:
@@ -320,11 +806,28 @@ async def delete_task(task_id: str, user_id: str) -> bool:
     """
     try:
         collection = await get_collection(TASKS_COLLECTION)
-        result = await collection.delete_one({"task_id": task_id, "user_id": user_id})
-        return result.deleted_count > 0
+        deleted = await collection.find_one_and_delete({"task_id": task_id, "user_id": user_id}, projection=task_stats.STATS_PROJECTION)
+        task_cache.invalidate(task_id)
+        if not deleted:
+            return False
+        await task_stats.record_deleted(deleted)
+        # The event log goes with its task (time-series collections allow deletes by the task_id metaField)
+        events_collection = await get_collection(TASK_EVENTS_COLLECTION)
+        await events_collection.delete_many({"task_id": task_id})
+        return True
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete task: {str(e)}")
 
+async def reconcile_task_stats(account_id: Optional[str] = None) -> int:
+    """
+    Recompute the per-account task counters from the tasks collection.
+    """
+    try:
+        collection = await get_collection(TASKS_COLLECTION)
+        return await task_stats.reconcile_task_stats(collection, account_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to reconcile task counters: {str(e)}")
+
 async def get_task_count(account_id: Optional[str] = None, status_filter: Optional[str] = None, task_source_group_id: Optional[str] = None, task_source_ids: Optional[List[str]] = None, task_ids: Optional[List[str]] = None) -> int:
     """
     Get the total count of tasks for a user with optional filters.
@@ -341,6 +844,10 @@ async def get_task_count(account_id: Optional[str] = None, status_filter: Option
         Total count of matching tasks
     """
     try:
+        # Account, status and group filters are served by the task_stats counters
+        if account_id and not task_source_ids and not task_ids:
+            return await task_stats.count_tasks(account_id, status_filter, task_source_group_id)
+
         collection = await get_collection(TASKS_COLLECTION)
 
         query = {}
@@ -373,18 +880,49 @@ class TaskService:
     async def get_task(task_id: str) -> Optional[Task]:
         return await get_task(task_id)
     
+    @staticmethod
+    async def get_task_snapshot(task_id: str, events_limit: int = 20) -> Optional[Task]:
+        return await get_task_snapshot(task_id, events_limit)
+    
+    @staticmethod
+    async def get_task_events(task_id: str, limit: int = 50, before: Optional[datetime] = None, after: Optional[datetime] = None) -> List[TaskEvent]:
+        return await get_task_events(task_id, limit, before, after)
+    
+    @staticmethod
+    async def get_task_events_page(task_id: str, limit: int = 50, before_cursor: Optional[str] = None, after_cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await get_task_events_page(task_id, limit, before_cursor, after_cursor)
+    
+    @staticmethod
+    async def get_task_request_data(task_id: str) -> Optional[Dict[str, Any]]:
+        return await get_task_request_data(task_id)
+    
     @staticmethod
     async def add_task_event(task_id: str, message: str, details: Optional[Dict[str, Any]] = None, 
-                           status: Optional[str] = None, progress: Optional[float] = None) -> Optional[Task]:
-        return await add_task_event(task_id, message, details, status, progress)
+                           status: Optional[str] = None, progress: Optional[float] = None,
+                           return_task: bool = False) -> Optional[Task]:
+        return await add_task_event(task_id, message, details, status, progress, return_task)
+    
+    @staticmethod
+    async def add_task_events_bulk(events: List[Dict[str, Any]]) -> int:
+        return await add_task_events_bulk(events)
     
     @staticmethod
-    async def update_task_status(task_id: str, status: str, progress: Optional[float] = None) -> Optional[Task]:
-        return await update_task_status(task_id, status, progress)
+    async def update_task_status(
+        task_id: str, 
+        status: str, 
+        progress: Optional[float] = None, 
+        return_task: bool = False
+    ) -> Optional[Task]:
+        return await update_task_status(task_id, status, progress, return_task)
     
     @staticmethod
-    async def set_task_progress(task_id: str, progress: float, message: Optional[str] = None) -> Optional[Task]:
-        return await set_task_progress(task_id, progress, message)
+    async def set_task_progress(
+        task_id: str, 
+        progress: float, 
+        message: Optional[str] = None, 
+        return_task: bool = False
+    ) -> Optional[Task]:
+        return await set_task_progress(task_id, progress, message, return_task)
     
     @staticmethod
     async def set_task_completed(task_id: str, result_url: str, 
@@ -411,13 +949,20 @@ class TaskService:
                           status_filter: Optional[str] = None, 
                           task_source_group_id: Optional[str] = None,
                           task_source_ids: Optional[List[str]] = None,
-                          task_ids: Optional[List[str]] = None) -> List[Task]:
-        return await get_all_tasks(account_id, limit, skip, status_filter, task_source_group_id, task_source_ids, task_ids)
+                          task_ids: Optional[List[str]] = None,
+                          view: str = "full",
+                          fields: Optional[List[str]] = None,
+                          cursor: Optional[str] = None) -> List[Any]:
+        return await get_all_tasks(account_id, limit, skip, status_filter, task_source_group_id, task_source_ids, task_ids, view, fields, cursor)
 
     @staticmethod
     async def delete_task(task_id: str, user_id: str) -> bool:
         return await delete_task(task_id, user_id)
     
+    @staticmethod
+    async def reconcile_task_stats(account_id: Optional[str] = None) -> int:
+        return await reconcile_task_stats(account_id)
+    
     @staticmethod
     async def get_task_count(account_id: Optional[str] = None, 
                            status_filter: Optional[str] = None,
@@ -434,6 +979,14 @@ class TaskService:
     ) -> List[Task]:
         return await create_bulk_tasks_impl(tasks_data, user_id, account_id)
 
+    @staticmethod
+    async def insert_bulk_tasks(
+        tasks_data: List[Dict[str, Any]], 
+        user_id: Optional[str], 
+        account_id: str
+    ) -> Tuple[List[Task], List[str]]:
+        return await insert_bulk_tasks_impl(tasks_data, user_id, account_id)
+
 
 async def create_bulk_tasks_impl(
     tasks_data: List[Dict[str, Any]], 
@@ -443,24 +996,30 @@ async def create_bulk_tasks_impl(
     """
     Create multiple tasks in bulk.
     """
+    tasks, _ = await insert_bulk_tasks_impl(tasks_data, user_id, account_id)
+    return tasks
+
+
+async def insert_bulk_tasks_impl(
+    tasks_data: List[Dict[str, Any]], 
+    user_id: Optional[str], 
+    account_id: str
+) -> Tuple[List[Task], List[str]]:
+    """
+    Create multiple tasks with one unordered insert_many.
+    Task IDs that already exist are returned as stored (idempotency through the unique task_id index).
+    Returns the tasks in request order and the IDs of the tasks this call created.
+    """
     collection = await get_collection(TASKS_COLLECTION)
-    created_tasks = []
     
     # Use a special user_id for API key authentication
     effective_user_id = user_id if user_id else f"api_key_user_{account_id}"
     
     try:
-        for task_data in tasks_data:
-            # Check if task already exists
-            existing_task = await collection.find_one({"task_id": task_data["task_id"]})
-            
-            if existing_task:
-                # Add existing task to results for idempotency
-                created_tasks.append(Task(**existing_task))
-                continue
-            
-            # Create new task
-            task = Task(
+        now = datetime.utcnow()
+        initial_event = TaskEvent(message="Task pending", timestamp=now)
+        new_tasks = [
+            Task(
                 task_id=task_data["task_id"],
                 user_id=effective_user_id,
                 account_id=account_id,
@@ -468,19 +1027,46 @@ async def create_bulk_tasks_impl(
                 priority=task_data.get("priority", "normal"),
                 status="PENDING",
                 progress=0.0,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
+                created_at=now,
+                updated_at=now,
                 request_data=task_data.get("request_data"),
                 task_source_name=task_data.get("task_source_name"),
                 task_source_id=task_data.get("task_source_id"),
                 task_source_group_id=task_data.get("task_source_group_id"),
-                events=[TaskEvent(message="Task pending")]
+                last_event_message=initial_event.message,
+                last_event_at=now,
+                event_count=1
             )
-            
-            # Insert the task
-            await collection.insert_one(task.model_dump(by_alias=True))
-            created_tasks.append(task)
+            for task_data in tasks_data
+        ]
+        if not new_tasks:
+            return [], []
+        
+        duplicate_ids = set()
+        try:
+            await collection.insert_many(
+                [{**task.model_dump(by_alias=True, exclude={"events"}), EVENTS_IN_LOG: True} for task in new_tasks],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in write_errors):
+                raise
+            duplicate_ids = {new_tasks[error["index"]].task_id for error in write_errors}
+        
+        # Add existing tasks to results for idempotency
+        existing_tasks = {}
+        if duplicate_ids:
+            async for existing_task in collection.find({"task_id": {"$in": list(duplicate_ids)}}, WITHOUT_EMBEDDED_EVENTS):
+                existing_tasks[existing_task["task_id"]] = Task(**existing_task)
         
-        return created_tasks
+        tasks = [existing_tasks.get(task.task_id, task) for task in new_tasks]
+        created_ids = [task.task_id for task in new_tasks if task.task_id not in duplicate_ids]
+        await _append_events([_event_document(task_id, initial_event, "PENDING", 0.0) for task_id in created_ids])
+        await task_stats.record_created([
+            task.model_dump(include={"account_id", "task_source_group_id", "status"})
+            for task in new_tasks if task.task_id not in duplicate_ids
+        ])
+        return tasks, created_ids
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create bulk tasks: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to create bulk tasks: {str(e)}")
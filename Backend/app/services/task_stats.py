@@ -0,0 +1,152 @@
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from pymongo import UpdateOne
+from app.db.mongodb_utils import get_collection
+
+logger = logging.getLogger(__name__)
+
+# Task counts per (account, status) and per (account, task_source_group_id, status), moved with $inc on every
+# create, status change and delete so listings don't count_documents over an account's whole history.
+# reconcile_task_stats recomputes them periodically to correct drift (e.g. a process dying between the task
+# write and the $inc).
+TASK_STATS_COLLECTION = "task_stats"
+
+# Fields of a task document its counters depend on
+STATS_PROJECTION = {"_id": 0, "account_id": 1, "task_source_group_id": 1, "status": 1}
+
+ACCOUNT_SCOPE = "*"
+RECONCILE_BATCH_SIZE = 1000
+
+
+def _stat_id(account_id: str, group: str, status: str) -> str:
+    return f"{account_id}:{group}:{status}"
+
+
+def _counter_updates(task: Dict[str, Any], amount: int, now: datetime) -> List[UpdateOne]:
+    """$inc of the account-wide counter of a task's status, and of its group's counter"""
+    account_id = task.get("account_id")
+    status = task.get("status")
+    if not account_id or not status:
+        return []
+    groups = [ACCOUNT_SCOPE]
+    if task.get("task_source_group_id"):
+        groups.append(task["task_source_group_id"])
+    return [
+        UpdateOne(
+            {"_id": _stat_id(account_id, group, status)},
+            {
+                "$inc": {"count": amount},
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"account_id": account_id, "group": group, "status": status}
+            },
+            upsert=True
+        )
+        for group in groups
+    ]
+
+
+async def _apply(operations: List[UpdateOne]) -> None:
+    if not operations:
+        return
+    try:
+        collection = await get_collection(TASK_STATS_COLLECTION)
+        await collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        # Counters are corrected by the next reconciliation; never fail the task write over them
+        logger.warning(f"Failed to update task counters: {e}")
+
+
+async def record_created(tasks: List[Dict[str, Any]]) -> None:
+    now = datetime.utcnow()
+    await _apply([operation for task in tasks for operation in _counter_updates(task, 1, now)])
+
+
+async def record_deleted(task: Dict[str, Any]) -> None:
+    await _apply(_counter_updates(task, -1, datetime.utcnow()))
+
+
+async def record_transitions(transitions: List[Tuple[Dict[str, Any], Optional[str]]]) -> None:
+    """Move counters for (task document before the write, status it was set to) pairs"""
+    now = datetime.utcnow()
+    operations = []
+    for before, status in transitions:
+        if not before or not status or before.get("status") == status:
+            continue
+        operations.extend(_counter_updates(before, -1, now))
+        operations.extend(_counter_updates({**before, "status": status}, 1, now))
+    await _apply(operations)
+
+
+async def record_transition(before: Optional[Dict[str, Any]], status: Optional[str]) -> None:
+    await record_transitions([(before, status)])
+
+
+async def count_tasks(account_id: str, status: Optional[str] = None, task_source_group_id: Optional[str] = None) -> int:
+    """Tasks of an account, optionally of one status and/or group, from the counters"""
+    collection = await get_collection(TASK_STATS_COLLECTION)
+    group = task_source_group_id or ACCOUNT_SCOPE
+    if status:
+        counter = await collection.find_one({"_id": _stat_id(account_id, group, status)})
+        return max(counter.get("count", 0), 0) if counter else 0
+    total = 0
+    async for counter in collection.find({"account_id": account_id, "group": group}, {"count": 1}):
+        total += max(counter.get("count", 0), 0)
+    return total
+
+
+async def count_by_status(statuses: List[str]) -> Dict[str, int]:
+    """Tasks of all accounts per status, summed over the account-wide counters"""
+    collection = await get_collection(TASK_STATS_COLLECTION)
+    pipeline = [
+        {"$match": {"group": ACCOUNT_SCOPE, "status": {"$in": statuses}}},
+        {"$group": {"_id": "$status", "count": {"$sum": {"$max": ["$count", 0]}}}}
+    ]
+    return {doc["_id"]: doc["count"] async for doc in collection.aggregate(pipeline)}
+
+
+async def reconcile_task_stats(tasks_collection, account_id: Optional[str] = None) -> int:
+    """
+    Recompute the counters from the tasks collection (one account or all) and return how many were written.
+    A transition racing with the recount may be off until the next run.
+    """
+    started = datetime.utcnow()
+    pipeline: List[Dict[str, Any]] = [{"$match": {"account_id": account_id}}] if account_id else []
+    pipeline.append({"$group": {
+        "_id": {"account_id": "$account_id", "group": "$task_source_group_id", "status": "$status"},
+        "count": {"$sum": 1}
+    }})
+
+    totals: Dict[Tuple[str, str, str], int] = {}
+    async for doc in tasks_collection.aggregate(pipeline, allowDiskUse=True):
+        key = doc["_id"]
+        if not key.get("account_id") or not key.get("status"):
+            continue
+        groups = [ACCOUNT_SCOPE] + ([key["group"]] if key.get("group") else [])
+        for group in groups:
+            counter_key = (key["account_id"], group, key["status"])
+            totals[counter_key] = totals.get(counter_key, 0) + doc["count"]
+
+    collection = await get_collection(TASK_STATS_COLLECTION)
+    operations = [
+        UpdateOne(
+            {"_id": _stat_id(*counter_key)},
+            {
+                "$set": {"count": count, "updated_at": started, "reconciled_at": started},
+                "$setOnInsert": {"account_id": counter_key[0], "group": counter_key[1], "status": counter_key[2]}
+            },
+            upsert=True
+        )
+        for counter_key, count in totals.items()
+    ]
+    for start in range(0, len(operations), RECONCILE_BATCH_SIZE):
+        await collection.bulk_write(operations[start:start + RECONCILE_BATCH_SIZE], ordered=False)
+
+    # Counters of combinations without tasks any more (not touched by the recount or by a transition since it started)
+    stale_query: Dict[str, Any] = {"updated_at": {"$lt": started}, "count": {"$ne": 0}}
+    if account_id:
+        stale_query["account_id"] = account_id
+    await collection.update_many(stale_query, {"$set": {"count": 0, "updated_at": started, "reconciled_at": started}})
+
+    logger.info(f"Reconciled {len(operations)} task counters")
+    return len(operations)
@@ -1,5 +1,7 @@
 import os
 import time
+import asyncio
+import contextlib
 import json
 import subprocess
 import shutil
@@ -14,6 +16,9 @@ from app.services.llm import llm_service
 from app.services.voice import generate_voice
 from app.services import task_service
 from app.utils import utils
+from app.utils.process_utils import run_command
+from app.utils.cancellation import CancellationToken, EncodeSlot, checkpoint
+from app.exceptions import TaskCancelledError
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -33,9 +38,27 @@ def _get_internal_asset_url(public_url: Optional[str]) -> Optional[str]:
         return public_url
     return public_url
 
+# (connect, read) timeouts of asset downloads, so a stalled CDN fails the step instead of hanging the task
+ASSET_DOWNLOAD_TIMEOUT = (10, 120)
+
+# Streams an asset (logo, intro, outro) to a temporary file in task_dir and returns its path.
+# Blocking: run it with asyncio.to_thread so lease heartbeats and other tasks of this process keep running.
+def _download_asset(url: str, suffix: str, task_dir: str) -> str:
+    with requests.get(url, stream=True, timeout=ASSET_DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=task_dir) as tmp_file:
+            try:
+                for chunk in response.iter_content(chunk_size=8192):
+                    tmp_file.write(chunk)
+            except Exception:
+                tmp_file.close()
+                os.remove(tmp_file.name)
+                raise
+            return tmp_file.name
+
 # Checks a video file for the presence and properties of video and audio streams using ffprobe.
 # Logs detailed information about the streams or warnings if streams are missing or ffprobe encounters issues.
-def ffprobe_check_streams(video_path: str, stage_name: str):
+async def ffprobe_check_streams(video_path: str, stage_name: str):
     """Checks for video and audio streams using ffprobe and logs detailed findings."""
     if not os.path.exists(video_path):
         logger.warning(f"[{stage_name}] File not found for stream check: {video_path}")
@@ -48,7 +71,7 @@ def ffprobe_check_streams(video_path: str, stage_name: str):
             "-show_entries", "stream=codec_name,width,height,r_frame_rate,bit_rate",
             "-of", "default=noprint_wrappers=1:nokey=1", video_path
         ]
-        video_result = subprocess.run(video_cmd, capture_output=True, text=True, check=False)
+        video_result = await run_command(video_cmd, text=True, check=False)
         if video_result.returncode == 0 and video_result.stdout.strip():
             details = video_result.stdout.strip().split('\n')
             logger.info(
@@ -67,7 +90,7 @@ def ffprobe_check_streams(video_path: str, stage_name: str):
             "-show_entries", "stream=codec_name,sample_rate,bit_rate,channels,channel_layout",
             "-of", "default=noprint_wrappers=1:nokey=1", video_path
         ]
-        audio_result = subprocess.run(audio_cmd, capture_output=True, text=True, check=False)
+        audio_result = await run_command(audio_cmd, text=True, check=False)
         if audio_result.returncode == 0 and audio_result.stdout.strip():
             details = audio_result.stdout.strip().split('\n')
             logger.info(
@@ -89,7 +112,7 @@ def ffprobe_check_streams(video_path: str, stage_name: str):
 # Standardizes an input video to a common format (H.264 video, AAC audio) suitable for concatenation.
 # Ensures the output video has the target resolution and frame rate.
 # If the input video lacks an audio stream, a silent audio track is added.
-def standardize_video_for_concat(input_path: str, output_path: str, target_width: int, target_height: int, task_dir: str, target_fps: int = 25):
+async def standardize_video_for_concat(input_path: str, output_path: str, target_width: int, target_height: int, task_dir: str, target_fps: int = 25):
     """
     Standardizes a video to H.264, AAC audio, target resolution, and FPS.
     Adds silent audio if the input has no audio stream.
@@ -101,7 +124,7 @@ def standardize_video_for_concat(input_path: str, output_path: str, target_width
             "ffprobe", "-v", "error", "-select_streams", "a", "-show_entries", "stream=codec_type",
             "-of", "default=noprint_wrappers=1:nokey=1", input_path
         ]
-        audio_check_process = subprocess.run(ffprobe_cmd_audio_check, capture_output=True, text=True, cwd=task_dir, check=False)
+        audio_check_process = await run_command(ffprobe_cmd_audio_check, cwd=task_dir, text=True, check=False)
         has_audio_stream = bool(audio_check_process.stdout.strip())
 
         # Get duration of input video
@@ -109,7 +132,7 @@ def standardize_video_for_concat(input_path: str, output_path: str, target_width
             "ffprobe", "-v", "error", "-show_entries", "format=duration",
             "-of", "default=noprint_wrappers=1:nokey=1", input_path
         ]
-        duration_str = subprocess.check_output(duration_cmd, cwd=task_dir).decode('utf-8').strip()
+        duration_str = (await run_command(duration_cmd, cwd=task_dir, text=True)).stdout.strip()
         video_duration = float(duration_str)
 
         ffmpeg_cmd_base = [
@@ -139,7 +162,7 @@ def standardize_video_for_concat(input_path: str, output_path: str, target_width
                 output_path
             ]
         
-        subprocess.run(final_ffmpeg_cmd, check=True, cwd=task_dir, capture_output=True)
+        await run_command(final_ffmpeg_cmd, cwd=task_dir)
         logger.info(f"Successfully standardized {input_path} to {output_path}")
         return output_path
     except subprocess.CalledProcessError as e:
@@ -173,11 +196,57 @@ def calculate_resize_dimensions(orig_width: int, orig_height: int, target_width:
     
     return new_width, new_height
 
+BGM_SAMPLE_RATE = 44100
+DEFAULT_BGM_FILE = "Broken_promies_thriller.mp3"
+
+# Resolves the background music track for a video from resource/songs or resource/sounds.
+# Only bare file names are accepted; unknown names fall back to the bundled default track.
+def resolve_background_music_path(bgm_file: Optional[str] = None) -> Optional[str]:
+    candidates = []
+    if bgm_file:
+        bgm_name = os.path.basename(bgm_file)
+        candidates.append(os.path.join(utils.resource_dir("songs"), bgm_name))
+        candidates.append(os.path.join(utils.resource_dir("sounds"), bgm_name))
+    default_path = os.path.join(utils.resource_dir("sounds"), DEFAULT_BGM_FILE)
+    candidates.append(default_path)
+
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            if bgm_file and candidate == default_path and os.path.basename(bgm_file) != DEFAULT_BGM_FILE:
+                logger.warning(f"Background music '{bgm_file}' not found, using default track {DEFAULT_BGM_FILE}")
+            return candidate
+    return None
+
+# Decodes a background music track to PCM once and caches it at the target sample rate.
+# The cache key covers the source path, size, mtime and sample rate, so replacing a track invalidates its bed.
+async def get_background_music_bed(source_path: str, sample_rate: int = BGM_SAMPLE_RATE) -> str:
+    stat = os.stat(source_path)
+    cache_key = utils.md5(f"{os.path.abspath(source_path)}:{stat.st_size}:{stat.st_mtime_ns}:{sample_rate}")
+    bed_path = os.path.join(utils.cache_dir("bgm"), f"{cache_key}.wav")
+    if os.path.exists(bed_path):
+        return bed_path
+
+    # Decode to a process-private file first so concurrent renders never read a half-written bed
+    tmp_bed_path = os.path.join(os.path.dirname(bed_path), f"{cache_key}.{os.getpid()}.partial.wav")
+    cmd_decode = [
+        "ffmpeg", "-y", "-i", source_path, "-vn",
+        "-c:a", "pcm_s16le", "-ar", str(sample_rate), "-ac", "2",
+        tmp_bed_path
+    ]
+    logger.info(f"Decoding background music bed: {' '.join(cmd_decode)}")
+    try:
+        await run_command(cmd_decode)
+        os.replace(tmp_bed_path, bed_path)
+    finally:
+        if os.path.exists(tmp_bed_path):
+            os.remove(tmp_bed_path)
+    return bed_path
+
 # Orchestrates the creation of a video from a list of scenes.
 # This includes generating audio and subtitles for each scene, creating video clips from images and audio,
 # concatenating scene clips, applying a logo, adding background music (optional),
 # and prepending/appending intro/outro videos (optional).
-# Progress is reported via a task service.
+# Progress is reported via a task service; the optional cancel_token is checked between stages.
 async def create_video_with_scenes(
     task_id: str,
     task_dir: str, 
@@ -191,7 +260,11 @@ async def create_video_with_scenes(
     intro_video_url: Optional[str] = None,
     outro_video_url: Optional[str] = None,
     theme: str = "modern",
-    custom_colors: Optional[Dict[str, str]] = None
+    custom_colors: Optional[Dict[str, str]] = None,
+    background_music_path: Optional[str] = None,
+    background_music_volume: float = 0.2,
+    cancel_token: Optional[CancellationToken] = None,
+    voice_files: Optional[List[Tuple[str, str]]] = None
 ) -> str:
     scenes_concatenated_file = os.path.join(task_dir, "scenes_concatenated.mp4")
     main_video_with_logo_file = os.path.join(task_dir, "main_with_logo.mp4")
@@ -215,6 +288,7 @@ async def create_video_with_scenes(
     progress_per_scene_total = (target_progress_scene_processing_end - base_progress_cvws) / total_scenes if total_scenes > 0 else 0
 
     for i, scene in enumerate(scenes, 1):
+        checkpoint(cancel_token, f"scene {i}")
         current_scene_base_progress = base_progress_cvws + ((i - 1) * progress_per_scene_total)
         
         event_message_audio = f"Processing scene {i}/{total_scenes}: Generating audio & subtitles."
@@ -230,6 +304,9 @@ async def create_video_with_scenes(
                 if not (os.path.exists(image_file) and os.path.exists(audio_file)):
                     logger.warning(f"Test mode: files missing for scene {i}")
                     raise FileNotFoundError("Test mode files missing")
+            elif voice_files:
+                # Narration generated before the render (see prepare_scene_voices)
+                audio_file, subtitle_file = voice_files[i - 1]
             else:
                 # audio_file is the path where generate_voice will save the TTS output
                 # subtitle_file is also determined here
@@ -246,7 +323,7 @@ async def create_video_with_scenes(
                 "ffprobe", "-v", "error", "-show_entries", "format=duration",
                 "-of", "default=noprint_wrappers=1:nokey=1", tts_output_audio_file
             ]
-            speech_duration = float(subprocess.check_output(duration_cmd).decode('utf-8').strip())
+            speech_duration = float((await run_command(duration_cmd, text=True)).stdout.strip())
             
             # Add 2s silence to the beginning of the audio
             silence_duration_s = 2.0
@@ -259,7 +336,7 @@ async def create_video_with_scenes(
                 "-i", f"anullsrc=channel_layout=stereo:sample_rate=44100:d={silence_duration_s}",
                 silence_prefix_tmp_file
             ]
-            subprocess.run(cmd_create_silence, check=True, cwd=task_dir, capture_output=True)
+            await run_command(cmd_create_silence, cwd=task_dir)
             files_to_cleanup_later.append(silence_prefix_tmp_file)
 
             # Concatenate silence and original speech audio
@@ -270,7 +347,7 @@ async def create_video_with_scenes(
                 "-filter_complex", "[0:a][1:a]concat=n=2:v=0:a=1[aout]",
                 "-map", "[aout]", final_audio_for_scene_creation
             ]
-            subprocess.run(cmd_concat_audio, check=True, cwd=task_dir, capture_output=True)
+            await run_command(cmd_concat_audio, cwd=task_dir)
             files_to_cleanup_later.append(final_audio_for_scene_creation)
             
             # The original TTS audio output is now intermediate, add to cleanup
@@ -287,7 +364,7 @@ async def create_video_with_scenes(
                 "ffprobe", "-v", "error", "-select_streams", "v:0",
                 "-show_entries", "stream=width,height", "-of", "csv=s=x:p=0", image_file
             ]
-            dimensions = subprocess.check_output(size_cmd).decode('utf-8').strip()
+            dimensions = (await run_command(size_cmd, text=True)).stdout.strip()
             width, height = map(int, dimensions.split('x'))
             
             if width != target_width or height != target_height:
@@ -335,7 +412,7 @@ async def create_video_with_scenes(
                 "-map", "1:a",
                 scene_output
             ]
-            subprocess.run(command, check=True, cwd=task_dir, capture_output=True)
+            await run_command(command, cwd=task_dir)
             scene_files.append(scene_output)
             files_to_cleanup_later.append(scene_output)
             
@@ -355,6 +432,7 @@ async def create_video_with_scenes(
         await task_service.set_task_failed(task_id, "Durations list is empty after scene processing.")
         raise ValueError("Durations list is empty")
 
+    checkpoint(cancel_token, "scene concatenation")
     progress_after_scenes = target_progress_scene_processing_end
     await task_service.add_task_event(task_id=task_id, message="Concatenating individual scenes.", progress=progress_after_scenes + 2)
     scene_concat_inputs = []
@@ -386,25 +464,22 @@ async def create_video_with_scenes(
             "-c:v", "libx264", "-c:a", "aac", "-b:a", "192k", scenes_concatenated_file
         ]
         logger.info(f"Running scene concatenation: {' '.join(concat_cmd)}")
-        subprocess.run(concat_cmd, check=True, cwd=task_dir, capture_output=True)
+        await run_command(concat_cmd, cwd=task_dir)
     
     files_to_cleanup_later.append(scenes_concatenated_file)
-    ffprobe_check_streams(scenes_concatenated_file, "Post-Scene-Concatenation")
+    await ffprobe_check_streams(scenes_concatenated_file, "Post-Scene-Concatenation")
     current_main_video = scenes_concatenated_file
     await task_service.add_task_event(task_id=task_id, message="Scene concatenation complete.", progress=progress_after_scenes + 5)
 
     progress_after_scene_concat = progress_after_scenes + 5
 
+    checkpoint(cancel_token, "logo")
     internal_logo_url = _get_internal_asset_url(logo_url)
     local_logo_path = None
     if internal_logo_url:
         try:
             await task_service.add_task_event(task_id=task_id, message="Downloading logo.", progress=progress_after_scene_concat + 1)
-            response = requests.get(internal_logo_url, stream=True)
-            response.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png", dir=task_dir) as tmp_logo:
-                local_logo_path = tmp_logo.name
-                for chunk in response.iter_content(chunk_size=8192): tmp_logo.write(chunk)
+            local_logo_path = await asyncio.to_thread(_download_asset, internal_logo_url, ".png", task_dir)
             logger.info(f"Logo downloaded to {local_logo_path}")
             files_to_cleanup_later.append(local_logo_path)
             await task_service.add_task_event(task_id=task_id, message="Applying logo to video.", progress=progress_after_scene_concat + 2)
@@ -416,10 +491,10 @@ async def create_video_with_scenes(
                 main_video_with_logo_file
             ]
             logger.info(f"Applying logo: {' '.join(cmd_logo)}")
-            subprocess.run(cmd_logo, check=True, cwd=task_dir, capture_output=True)
+            await run_command(cmd_logo, cwd=task_dir)
             current_main_video = main_video_with_logo_file
             files_to_cleanup_later.append(main_video_with_logo_file)
-            ffprobe_check_streams(current_main_video, "Post-Logo-Application")
+            await ffprobe_check_streams(current_main_video, "Post-Logo-Application")
             await task_service.add_task_event(task_id=task_id, message="Logo applied successfully.", progress=progress_after_scene_concat + 3)
         except Exception as e:
             logger.error(f"Failed to download or apply logo from {internal_logo_url}: {e}")
@@ -428,26 +503,30 @@ async def create_video_with_scenes(
 
     progress_after_logo = progress_after_scene_concat + 3
 
-    addbgmusic = False
-    sound_effect_path = os.path.join(utils.resource_dir(), "sounds", "Broken_promies_thriller.mp3")
-    if addbgmusic and os.path.exists(sound_effect_path):
+    checkpoint(cancel_token, "background music")
+    if background_music_path and os.path.exists(background_music_path):
         try:
+            await task_service.add_task_event(task_id=task_id, message="Mixing background music.", progress=progress_after_logo)
+            bgm_bed_path = await get_background_music_bed(background_music_path)
+            # Audio-only mix: the video stream is copied, so music never costs a second video encode
             cmd_bgm = [
-                "ffmpeg", "-y", "-i", current_main_video, "-stream_loop", "-1", "-i", sound_effect_path,
-                "-filter_complex", "[1:a]volume=0.2[a1];[0:a][a1]amix=inputs=2:duration=first:dropout_transition=2[aout]",
+                "ffmpeg", "-y", "-i", current_main_video, "-stream_loop", "-1", "-i", bgm_bed_path,
+                "-filter_complex", f"[1:a]volume={background_music_volume}[a1];[0:a][a1]amix=inputs=2:duration=first:dropout_transition=2[aout]",
                 "-map", "0:v", "-map", "[aout]",
-                "-c:v", "libx264", "-preset", "medium", "-crf", "23",
-                "-c:a", "aac", "-b:a", "192k", "-shortest",
+                "-c:v", "copy",
+                "-c:a", "aac", "-b:a", "192k", "-ar", str(BGM_SAMPLE_RATE), "-ac", "2", "-shortest",
                 main_video_with_bgm_file
             ]
             logger.info(f"Adding BGM: {' '.join(cmd_bgm)}")
-            subprocess.run(cmd_bgm, check=True, cwd=task_dir, capture_output=True)
+            await run_command(cmd_bgm, cwd=task_dir)
             current_main_video = main_video_with_bgm_file
             files_to_cleanup_later.append(main_video_with_bgm_file)
-            ffprobe_check_streams(current_main_video, "Post-BGM-Application")
+            await ffprobe_check_streams(current_main_video, "Post-BGM-Application")
         except Exception as e:
             logger.error(f"Failed to add background music: {e}")
+            await task_service.add_task_event(task_id=task_id, message=f"Warning: Failed to add background music: {e}", details={"bgm_file": background_music_path, "error": str(e)})
     
+    checkpoint(cancel_token, "intro/outro")
     videos_for_final_concat = []
     
     internal_intro_url = _get_internal_asset_url(intro_video_url)
@@ -456,14 +535,10 @@ async def create_video_with_scenes(
     if internal_intro_url:
         try:
             await task_service.add_task_event(task_id=task_id, message="Downloading intro video.", progress=progress_after_logo + 0.5)
-            response = requests.get(internal_intro_url, stream=True)
-            response.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4", dir=task_dir) as tmp_intro:
-                local_intro_path = tmp_intro.name
-                for chunk in response.iter_content(chunk_size=8192): tmp_intro.write(chunk)
+            local_intro_path = await asyncio.to_thread(_download_asset, internal_intro_url, ".mp4", task_dir)
             logger.info(f"Intro video downloaded to {local_intro_path}")
             files_to_cleanup_later.append(local_intro_path)
-            standardized_intro_path = standardize_video_for_concat(local_intro_path, os.path.join(task_dir, "s_intro.mp4"), target_width, target_height, task_dir)
+            standardized_intro_path = await standardize_video_for_concat(local_intro_path, os.path.join(task_dir, "s_intro.mp4"), target_width, target_height, task_dir)
             if standardized_intro_path: 
                 videos_for_final_concat.append(standardized_intro_path)
                 await task_service.add_task_event(task_id=task_id, message="Intro video processed.")
@@ -480,14 +555,10 @@ async def create_video_with_scenes(
     if internal_outro_url:
         try:
             await task_service.add_task_event(task_id=task_id, message="Downloading outro video.")
-            response = requests.get(internal_outro_url, stream=True)
-            response.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4", dir=task_dir) as tmp_outro:
-                local_outro_path = tmp_outro.name
-                for chunk in response.iter_content(chunk_size=8192): tmp_outro.write(chunk)
+            local_outro_path = await asyncio.to_thread(_download_asset, internal_outro_url, ".mp4", task_dir)
             logger.info(f"Outro video downloaded to {local_outro_path}")
             files_to_cleanup_later.append(local_outro_path)
-            standardized_outro_path = standardize_video_for_concat(local_outro_path, os.path.join(task_dir, "s_outro.mp4"), target_width, target_height, task_dir)
+            standardized_outro_path = await standardize_video_for_concat(local_outro_path, os.path.join(task_dir, "s_outro.mp4"), target_width, target_height, task_dir)
             if standardized_outro_path: 
                 videos_for_final_concat.append(standardized_outro_path)
                 await task_service.add_task_event(task_id=task_id, message="Outro video processed.")
@@ -503,6 +574,7 @@ async def create_video_with_scenes(
     if standardized_intro_path: files_to_cleanup_later.append(standardized_intro_path)
     if standardized_outro_path: files_to_cleanup_later.append(standardized_outro_path)
 
+    checkpoint(cancel_token, "final concatenation")
     if len(videos_for_final_concat) > 1:
         concat_file_path = os.path.join(task_dir, "final_concat_list.txt")
         with open(concat_file_path, "w", encoding="utf-8") as f:
@@ -519,28 +591,28 @@ async def create_video_with_scenes(
         ]
         try:
             logger.info(f"Running final concatenation: {' '.join(cmd_final_concat)}")
-            subprocess.run(cmd_final_concat, check=True, cwd=task_dir, capture_output=True, text=True)
+            await run_command(cmd_final_concat, cwd=task_dir, text=True)
             logger.info(f"Final video generated: {final_output_file}")
-            ffprobe_check_streams(final_output_file, "Post-Final-Concatenation")
+            await ffprobe_check_streams(final_output_file, "Post-Final-Concatenation")
             await task_service.add_task_event(task_id=task_id, message="Final video concatenation successful.", progress=progress_before_final_concat + 1)
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed final concatenation. FFmpeg command: {' '.join(cmd_final_concat)}")
             logger.error(f"FFmpeg stderr: {e.stderr}")
             logger.info(f"Falling back: copying {current_main_video} to {final_output_file}")
             shutil.copyfile(current_main_video, final_output_file)
-            ffprobe_check_streams(final_output_file, "Post-Fallback-Copy")
+            await ffprobe_check_streams(final_output_file, "Post-Fallback-Copy")
             await task_service.add_task_event(task_id=task_id, message="Final concatenation failed, using main content video as final.", details={"error": str(e), "stderr": e.stderr}, progress=progress_before_final_concat + 1)
         except FileNotFoundError:
             logger.error(f"ffmpeg command not found during final concatenation. Ensure FFmpeg is installed and in PATH.")
             logger.info(f"Falling back: copying {current_main_video} to {final_output_file}")
             shutil.copyfile(current_main_video, final_output_file)
-            ffprobe_check_streams(final_output_file, "Post-Fallback-Copy")
+            await ffprobe_check_streams(final_output_file, "Post-Fallback-Copy")
             await task_service.add_task_event(task_id=task_id, message="Final concatenation failed (ffmpeg not found), using main content video as final.", details={"error": "ffmpeg not found"}, progress=progress_before_final_concat + 1)
     else:
         logger.info(f"No intro/outro to add or only main content. Copying {current_main_video} to {final_output_file}")
         if current_main_video != final_output_file:
              shutil.copyfile(current_main_video, final_output_file)
-        ffprobe_check_streams(final_output_file, "Post-MainOnly-Copy")
+        await ffprobe_check_streams(final_output_file, "Post-MainOnly-Copy")
         await task_service.add_task_event(task_id=task_id, message="Final video prepared (no intro/outro concatenation needed).", progress=progress_before_final_concat + 1)
 
     old_concat_file_path = os.path.join(task_dir, "concat.txt")
@@ -560,7 +632,34 @@ async def create_video_with_scenes(
 
     return final_output_file
 
-async def generate_video(request: VideoGenerateRequest, task_id: str):
+async def prepare_scene_voices(
+    task_id: str,
+    task_dir: str,
+    scenes: List[StoryScene],
+    voice_name: str,
+    voice_rate: float,
+    cancel_token: Optional[CancellationToken] = None
+) -> List[Tuple[str, str]]:
+    """Generate the narration audio and subtitles of every scene (network-bound TTS, no encoding)"""
+    voice_files = []
+    for i, scene in enumerate(scenes, 1):
+        checkpoint(cancel_token, f"narration {i}")
+        await task_service.add_task_event(task_id=task_id, message=f"Generating narration for scene {i}/{len(scenes)}.")
+        voice_files.append(await generate_voice(
+            scene.text, voice_name, voice_rate,
+            os.path.join(task_dir, f"{i}.mp3"), os.path.join(task_dir, f"{i}.srt")
+        ))
+    return voice_files
+
+# Prepares the story, images, narration and music for a video, then renders it.
+# When an encode_slot is given, only the render holds it: the LLM, download and TTS stages run outside,
+# so a worker prepares its next video while the previous one encodes.
+async def generate_video(
+    request: VideoGenerateRequest,
+    task_id: str,
+    cancel_token: Optional[CancellationToken] = None,
+    encode_slot: Optional[EncodeSlot] = None
+):
     print(f"🎬🎬🎬 GENERATE_VIDEO: Starting video generation for task {task_id}")
     print(f"🎬 GENERATE_VIDEO Theme: {getattr(request, 'theme', 'MISSING')}")
     print(f"🎬 GENERATE_VIDEO Custom Colors: {getattr(request, 'custom_colors', 'MISSING')}")
@@ -639,6 +738,7 @@ async def generate_video(request: VideoGenerateRequest, task_id: str):
             
             logger.info(f"LLM Story Generation Request - theme: {req.theme}, custom_colors: {req.custom_colors}")
 
+            checkpoint(cancel_token, "story generation")
             await task_service.add_task_event(task_id=task_id, message="Generating story and image prompts via LLM.", progress=7)
             logger.info(f"Generating story with request: {req}")
             story_list = await llm_service.generate_story_with_images(request=req)
@@ -658,10 +758,12 @@ async def generate_video(request: VideoGenerateRequest, task_id: str):
             
             logger.info(f"Saving story.json with theme: {data['theme']}, custom_colors: {data.get('custom_colors')}")
             
+            checkpoint(cancel_token, "image download")
             for i, sc_data in enumerate(story_list, 1):
                 if sc_data.get("url"):
                     path = os.path.join(task_dir, f"{i}.png")
-                    resp = requests.get(sc_data["url"])
+                    # Off the event loop, so prefetching doesn't stall encodes running in this process
+                    resp = await asyncio.to_thread(requests.get, sc_data["url"], timeout=ASSET_DOWNLOAD_TIMEOUT)
                     if resp.status_code == 200:
                         with open(path, "wb") as f:
                             f.write(resp.content)
@@ -692,22 +794,46 @@ async def generate_video(request: VideoGenerateRequest, task_id: str):
         
         logger.info(f"Video generation theme: {theme_value}, custom_colors: {custom_colors_dict}")
         logger.info(f"Request has theme attr: {hasattr(request, 'theme')}, theme value: {theme_value}")
+
+        background_music_path = None
+        if getattr(request, 'background_music', False):
+            background_music_path = resolve_background_music_path(request.bgm_file)
+            if not background_music_path:
+                logger.warning(f"Background music requested for task {task_id} but no track is available")
+        
+        # Narration is network-bound, so it is generated before taking the render slot
+        voice_files = None
+        if encode_slot and not request.test_mode:
+            voice_files = await prepare_scene_voices(
+                task_id, task_dir, scenes, request.voice_name, request.voice_rate, cancel_token=cancel_token
+            )
         
-        return await create_video_with_scenes(
-            task_id=task_id, 
-            task_dir=task_dir, 
-            scenes=scenes, 
-            voice_name=request.voice_name, 
-            voice_rate=request.voice_rate, 
-            include_subtitles=request.include_subtitles,
-            test_mode=request.test_mode,
-            resolution=request.resolution,
-            logo_url=request.logo_url,
-            intro_video_url=request.intro_video_url,
-            outro_video_url=request.outro_video_url,
-            theme=theme_value,
-            custom_colors=custom_colors_dict # Use the processed dict
-        )
+        if encode_slot and encode_slot.locked():
+            await task_service.add_task_event(task_id=task_id, message="Assets prepared, waiting for a render slot.")
+        async with (encode_slot or contextlib.nullcontext()):
+            checkpoint(cancel_token, "render")
+            return await create_video_with_scenes(
+                task_id=task_id, 
+                task_dir=task_dir, 
+                scenes=scenes, 
+                voice_name=request.voice_name, 
+                voice_rate=request.voice_rate, 
+                include_subtitles=request.include_subtitles,
+                test_mode=request.test_mode,
+                resolution=request.resolution,
+                logo_url=request.logo_url,
+                intro_video_url=request.intro_video_url,
+                outro_video_url=request.outro_video_url,
+                theme=theme_value,
+                custom_colors=custom_colors_dict, # Use the processed dict
+                background_music_path=background_music_path,
+                background_music_volume=request.bgm_volume if request.bgm_volume is not None else 0.2,
+                cancel_token=cancel_token,
+                voice_files=voice_files
+            )
+    except TaskCancelledError:
+        # Cancellation isn't a failure, the queue marks the task CANCELLED
+        raise
     except Exception as e:
         logger.error(f"Failed to generate video for task {task_id}: {e}")
         error_details_dict = {"error_type": type(e).__name__, "details": str(e)}
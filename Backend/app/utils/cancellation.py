@@ -0,0 +1,111 @@
+import asyncio
+import re
+import time
+from typing import Dict, Optional
+
+from app.exceptions import TaskCancelledError
+
+
+class CancellationToken:
+    """
+    Cancellation handle of one task run, created by the queue and passed into processors and the video pipeline.
+
+    cancel() flags the token and cancels the attached run, which kills in-flight subprocesses
+    (see run_command); checkpoint() between stages stops work that can't be interrupted mid-await.
+    Checkpoints also mark stage transitions, so the token collects how long each stage took.
+    """
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.reason: Optional[str] = None
+        self._run: Optional[asyncio.Future] = None
+        self.stage_timings: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._stage_started: Optional[float] = None
+        # Time spent waiting for a shared resource (the encode gate) doesn't count against the run's timeout
+        self._paused_total = 0.0
+        self._paused_since: Optional[float] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def attach(self, run: asyncio.Future) -> None:
+        """Attach the asyncio task running the processor so cancel() can interrupt it"""
+        self._run = run
+        if self.cancelled:
+            run.cancel()
+
+    def cancel(self, reason: str = "Cancelled by user request") -> None:
+        if self.reason is None:
+            self.reason = reason
+        if self._run and not self._run.done():
+            self._run.cancel()
+
+    def enter_stage(self, stage: str) -> None:
+        """Close the running stage and start timing the next; numbered stages ("scene 3") share one entry"""
+        self.finish_stage()
+        self._stage = re.sub(r"[\s_]*\d+$", "", stage.strip()).replace(" ", "_").replace("/", "_") or "unknown"
+        self._stage_started = time.monotonic()
+
+    def finish_stage(self) -> None:
+        if self._stage is not None and self._stage_started is not None:
+            elapsed = time.monotonic() - self._stage_started
+            self.stage_timings[self._stage] = self.stage_timings.get(self._stage, 0.0) + elapsed
+        self._stage = None
+        self._stage_started = None
+
+    def pause_deadline(self) -> None:
+        if self._paused_since is None:
+            self._paused_since = time.monotonic()
+
+    def resume_deadline(self) -> None:
+        if self._paused_since is not None:
+            self._paused_total += time.monotonic() - self._paused_since
+            self._paused_since = None
+
+    @property
+    def paused_seconds(self) -> float:
+        """Seconds the run's timeout has been paused, including a wait still in progress"""
+        if self._paused_since is None:
+            return self._paused_total
+        return self._paused_total + time.monotonic() - self._paused_since
+
+    def raise_if_cancelled(self, stage: Optional[str] = None) -> None:
+        if self.cancelled:
+            raise TaskCancelledError(f"Task {self.task_id} cancelled: {self.reason}", stage=stage)
+
+
+class EncodeSlot:
+    """
+    A lane's encode gate as used by one run: waiting for a permit pauses the run's timeout,
+    so a task that prepared its assets isn't timed out while other tasks hold the gate.
+    """
+
+    def __init__(self, gate: asyncio.Semaphore, cancel_token: Optional[CancellationToken] = None):
+        self._gate = gate
+        self._cancel_token = cancel_token
+
+    def locked(self) -> bool:
+        return self._gate.locked()
+
+    async def __aenter__(self) -> "EncodeSlot":
+        if self._cancel_token:
+            self._cancel_token.pause_deadline()
+        try:
+            await self._gate.acquire()
+        finally:
+            if self._cancel_token:
+                self._cancel_token.resume_deadline()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> bool:
+        self._gate.release()
+        return False
+
+
+def checkpoint(cancel_token: Optional[CancellationToken], stage: str) -> None:
+    """Stop before the given stage if the run was cancelled, otherwise start timing it (no-op without a token)"""
+    if cancel_token:
+        cancel_token.raise_if_cancelled(stage)
+        cancel_token.enter_stage(stage)
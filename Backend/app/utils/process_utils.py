@@ -0,0 +1,34 @@
+import asyncio
+import subprocess
+from typing import List, Optional
+
+
+async def run_command(cmd: List[str], cwd: Optional[str] = None, text: bool = False, check: bool = True) -> subprocess.CompletedProcess:
+    """
+    Run an external command (ffmpeg, ffprobe, ...) without blocking the event loop.
+
+    Behaves like subprocess.run(cmd, capture_output=True, check=check): output is captured and,
+    when check is set, a CalledProcessError is raised on a non-zero exit code. If the awaiting task is cancelled
+    the child process is killed before the cancellation propagates.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    if text:
+        stdout = stdout.decode("utf-8", errors="replace")
+        stderr = stderr.decode("utf-8", errors="replace")
+
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
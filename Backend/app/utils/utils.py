@@ -72,6 +72,15 @@ def song_dir(sub_dir: str = ""):
     return d
 
 
+def cache_dir(sub_dir: str = ""):
+    d = os.path.join(get_root_dir(), "cache")
+    if sub_dir:
+        d = os.path.join(d, sub_dir)
+    if not os.path.exists(d):
+        os.makedirs(d, exist_ok=True)
+    return d
+
+
 def public_dir(sub_dir: str = ""):
     d = resource_dir("public")
     if sub_dir:
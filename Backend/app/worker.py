@@ -0,0 +1,130 @@
+"""
+Standalone task queue worker.
+
+Runs only the queue consumers, so rendering doesn't share a process with the API:
+
+    python -m app.worker                          # every lane, limits from settings
+    python -m app.worker --lanes video=4,quiz=16  # only these task types, with these concurrencies
+    python -m app.worker --lanes cpu=8            # a whole lane (cpu / io)
+
+Set queue_embedded_worker=false for the API processes so they only enqueue.
+
+SIGTERM/SIGINT drains the worker: it stops claiming tasks, lets running ones finish within
+--grace-seconds (default queue_drain_grace_seconds) and re-queues the rest. A second signal re-queues at once.
+"""
+import sys
+import asyncio
+if sys.platform.startswith("win"):
+    policy = asyncio.WindowsProactorEventLoopPolicy()
+    asyncio.set_event_loop_policy(policy)
+    asyncio.set_event_loop(policy.new_event_loop())
+
+import argparse
+import logging
+import os
+import signal
+from typing import Dict, Optional, Tuple
+
+from app.db.mongodb_utils import connect_to_mongo, close_mongo_connection
+from app.db.create_indexes import create_indexes
+from app.models.task_types import TaskLane, TaskType
+from app.services.task_queue_service import task_queue_service
+from app.services.task_service import progress_writer
+
+logger = logging.getLogger(__name__)
+
+
+def parse_lanes(spec: str) -> Tuple[Dict[TaskLane, int], Dict[str, int]]:
+    """Parse "video=4,quiz=16,io=8" into lane limits and task type limits"""
+    lane_limits: Dict[TaskLane, int] = {}
+    type_limits: Dict[str, int] = {}
+    lane_names = {lane.value for lane in TaskLane}
+    type_names = {task_type.value for task_type in TaskType}
+
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = entry.partition("=")
+        name = name.strip().lower()
+        try:
+            limit = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid concurrency in '{entry}', expected <name>=<number>")
+        if limit < 1:
+            raise argparse.ArgumentTypeError(f"Concurrency must be at least 1 in '{entry}'")
+
+        if name in lane_names:
+            lane_limits[TaskLane(name)] = limit
+        elif name in type_names:
+            type_limits[name] = limit
+        else:
+            raise argparse.ArgumentTypeError(
+                f"Unknown lane or task type '{name}' (lanes: {', '.join(sorted(lane_names))}; "
+                f"task types: {', '.join(sorted(type_names))})"
+            )
+    return lane_limits, type_limits
+
+
+async def run_worker(lane_limits: Dict[TaskLane, int], type_limits: Dict[str, int], grace_seconds: Optional[int] = None) -> None:
+    """Consume the queue until SIGINT/SIGTERM, then drain"""
+    os.makedirs("tasks", exist_ok=True)
+    await connect_to_mongo()
+    await create_indexes()
+
+    stop_event = asyncio.Event()
+    
+    def request_stop() -> None:
+        if stop_event.is_set():
+            logger.warning("Second stop signal, handing running tasks back to the queue now")
+            task_queue_service.abort_drain()
+        stop_event.set()
+    
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, request_stop)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops don't support signal handlers; Ctrl+C still raises KeyboardInterrupt
+            pass
+
+    task_queue_service.configure_worker(lane_limits=lane_limits, type_limits=type_limits)
+    try:
+        await task_queue_service.start_processing()
+        logger.info(f"Queue worker {task_queue_service.worker_id} started")
+        await stop_event.wait()
+        logger.info(f"Queue worker {task_queue_service.worker_id} draining")
+        result = await task_queue_service.drain(grace_seconds)
+        logger.info(
+            f"Queue worker {task_queue_service.worker_id} stopped: {result['finished']} tasks finished, "
+            f"{len(result['handed_off'])} handed back to the queue"
+        )
+    finally:
+        await task_queue_service.stop_processing()
+        await progress_writer.close()
+        await close_mongo_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the task queue worker without the API server")
+    parser.add_argument(
+        "--lanes",
+        type=parse_lanes,
+        default=({}, {}),
+        help="Comma separated <lane or task type>=<concurrency>, e.g. video=4,quiz=16 or cpu=8,io=32"
+    )
+    parser.add_argument(
+        "--grace-seconds",
+        type=int,
+        default=None,
+        help="How long running tasks may finish on shutdown before they are re-queued (default: queue_drain_grace_seconds)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    lane_limits, type_limits = args.lanes
+    try:
+        asyncio.run(run_worker(lane_limits, type_limits, args.grace_seconds))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
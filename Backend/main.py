@@ -12,6 +12,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api import api_router
 from app.db.mongodb_utils import connect_to_mongo, close_mongo_connection
 from app.services.task_queue_service import task_queue_service
+from app.services.task_service import progress_writer, TASKS_COLLECTION
+from app.services.task_cache import task_cache
+from app.db.mongodb_utils import get_collection
+from app.config import get_settings
 import os
 
 app = FastAPI(
@@ -39,15 +43,24 @@ async def startup_event():
     from app.db.create_indexes import create_indexes
     await create_indexes()
     
-    # Resume task queue processing after server restart
-    print("🚀 Starting task queue processing...")
-    await task_queue_service.start_processing()
-    print("🚀 Task queue processing started!")
+    # Drop cached task snapshots when other nodes write the task
+    task_cache.start_watching(await get_collection(TASKS_COLLECTION))
+    
+    # Resume task queue processing after server restart, unless queue workers run
+    # as their own processes (python -m app.worker) and the API only enqueues
+    if get_settings().queue_embedded_worker:
+        print("🚀 Starting task queue processing...")
+        await task_queue_service.start_processing()
+        print("🚀 Task queue processing started!")
+    else:
+        print("🚀 Embedded queue worker disabled, tasks are processed by app.worker")
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    # Stop task queue processing gracefully
-    await task_queue_service.stop_processing()
+    # Stop claiming tasks, let running ones finish within the grace period and re-queue the rest
+    await task_queue_service.drain()
+    await task_cache.stop_watching()
+    await progress_writer.close()
     await close_mongo_connection()
 
 if not os.path.exists('tasks'):
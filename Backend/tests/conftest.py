@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Run from anywhere: the tests import the application as the top-level "app" package, like main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,231 @@
+"""
+Unit tests of the queue's bookkeeping against mocked collections (no MongoDB needed):
+dedup follower reassignment, lease reclaim and fair-share tags.
+"""
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services import task_queue_service as queue_module
+from app.services.task_queue_service import TaskQueueService, TASK_QUEUE_COUNTERS_COLLECTION
+
+
+def make_settings(**overrides):
+    settings = {"queue_account_weights": {}, "queue_lease_seconds": 60}
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+
+class FakeCounters:
+    """task_queue_counters with just enough of find_one / find_one_and_update for the fair-share counters"""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False):
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"]})
+        if isinstance(update, list):
+            # The fair tag pipeline: {"tag": {"$add": [{"$max": [{"$ifNull": ["$tag", 0]}, vtime]}, cost]}}
+            floor, cost = update[0]["$set"]["tag"]["$add"]
+            current = document.get("tag")
+            document["tag"] = max(0 if current is None else current, floor["$max"][1]) + cost
+        else:
+            for field, value in update.get("$inc", {}).items():
+                document[field] = document.get(field, 0) + value
+            for field, value in update.get("$max", {}).items():
+                document[field] = max(document.get(field, value), value)
+        return dict(document)
+
+
+class QueueServiceTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.service = TaskQueueService()
+        self.queue = MagicMock()
+        self.queue.update_one = AsyncMock(return_value=SimpleNamespace(matched_count=1, modified_count=1))
+        self.queue.update_many = AsyncMock(return_value=SimpleNamespace(matched_count=1, modified_count=1))
+        self.queue.find_one = AsyncMock(return_value=None)
+        self.queue.find_one_and_update = AsyncMock(return_value=None)
+        self.counters = FakeCounters()
+
+        async def get_collection(name):
+            return self.counters if name == TASK_QUEUE_COUNTERS_COLLECTION else self.queue
+
+        self.settings = make_settings()
+        for target, replacement in (
+            ("get_collection", AsyncMock(side_effect=get_collection)),
+            ("get_settings", MagicMock(side_effect=lambda: self.settings)),
+        ):
+            patcher = patch.object(queue_module, target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        metrics_patcher = patch.object(queue_module.queue_metrics, "increment", AsyncMock())
+        metrics_patcher.start()
+        self.addCleanup(metrics_patcher.stop)
+
+
+class ReassignFollowersTest(QueueServiceTestCase):
+    def followers(self):
+        return [
+            {"task_id": "f1", "dedup_key": "k", "priority_rank": 2, "task_type": "video", "leader_task_id": "gone"},
+            {"task_id": "f2", "dedup_key": "k", "priority_rank": 2, "task_type": "video", "leader_task_id": "gone"},
+        ]
+
+    async def test_followers_move_to_another_in_flight_copy(self):
+        self.service._find_dedup_leaders = AsyncMock(return_value={"k": "other-leader"})
+        followers = self.followers()
+
+        promoted = await self.service._reassign_followers(followers, "acc")
+
+        self.assertEqual(promoted, [])
+        self.queue.update_one.assert_not_awaited()
+        query, update = self.queue.update_many.await_args.args
+        self.assertEqual(query, {"task_id": {"$in": ["f1", "f2"]}, "status": "FOLLOWING"})
+        self.assertEqual(update["$set"]["leader_task_id"], "other-leader")
+        self.assertEqual([item["leader_task_id"] for item in followers], ["other-leader", "other-leader"])
+        # The leaders lookup must not pick one of the followers themselves
+        self.assertEqual(self.service._find_dedup_leaders.await_args.kwargs["exclude_task_ids"], ["f1", "f2"])
+
+    async def test_first_follower_is_promoted_and_leads_the_rest(self):
+        self.service._find_dedup_leaders = AsyncMock(return_value={})
+        self.service._next_enqueue_seq = AsyncMock(return_value=7)
+        self.service._next_fair_tag = AsyncMock(return_value=3.0)
+        followers = self.followers()
+
+        promoted = await self.service._reassign_followers(followers, "acc")
+
+        self.assertEqual([item["task_id"] for item in promoted], ["f1"])
+        query, update = self.queue.update_one.await_args.args
+        self.assertEqual(query, {"task_id": "f1", "status": "FOLLOWING"})
+        self.assertEqual(update["$set"]["status"], "QUEUED")
+        self.assertEqual(update["$set"]["enqueue_seq"], 7)
+        self.assertEqual(update["$set"]["fair_tag"], 3.0)
+        self.assertEqual(update["$unset"], {"leader_task_id": ""})
+        self.assertNotIn("leader_task_id", promoted[0])
+        self.service._next_fair_tag.assert_awaited_once_with("acc", 2)
+
+        query, update = self.queue.update_many.await_args.args
+        self.assertEqual(query, {"task_id": {"$in": ["f2"]}, "status": "FOLLOWING"})
+        self.assertEqual(update["$set"]["leader_task_id"], "f1")
+        self.assertEqual(followers[1]["leader_task_id"], "f1")
+
+    async def test_each_dedup_key_gets_its_own_leader(self):
+        self.service._find_dedup_leaders = AsyncMock(return_value={"a": "leader-a"})
+        self.service._next_enqueue_seq = AsyncMock(return_value=1)
+        self.service._next_fair_tag = AsyncMock(return_value=1.0)
+        followers = [
+            {"task_id": "f1", "dedup_key": "a", "priority_rank": 2, "task_type": "video"},
+            {"task_id": "f2", "dedup_key": "b", "priority_rank": 1, "task_type": "quiz"},
+        ]
+
+        promoted = await self.service._reassign_followers(followers, "acc")
+
+        self.assertEqual([item["task_id"] for item in promoted], ["f2"])
+        self.assertEqual(followers[0]["leader_task_id"], "leader-a")
+
+
+class ReclaimExpiredLeasesTest(QueueServiceTestCase):
+    async def test_expired_processing_item_is_failed_for_retry(self):
+        item = {"task_id": "t1", "task_type": "video", "status": "PROCESSING", "worker_id": "dead-worker"}
+        self.queue.find_one_and_update = AsyncMock(side_effect=[item, None])
+        self.service._handle_task_failure = AsyncMock()
+        self.service._mark_queue_item_cancelled = AsyncMock()
+
+        reclaimed = await self.service.reclaim_expired_leases()
+
+        self.assertEqual(reclaimed, ["t1"])
+        query, update = self.queue.find_one_and_update.await_args_list[0].args
+        self.assertEqual(query["status"], {"$in": ["PROCESSING", "CANCELLING"]})
+        self.assertIn("$lt", query["lease_expires_at"])
+        self.assertEqual(update["$set"]["worker_id"], self.service.worker_id)
+        self.service._handle_task_failure.assert_awaited_once()
+        self.assertEqual(self.service._handle_task_failure.await_args.kwargs["failure_reason"], "LEASE_EXPIRED")
+        self.service._mark_queue_item_cancelled.assert_not_awaited()
+
+    async def test_expired_cancelling_item_finishes_the_cancellation(self):
+        item = {"task_id": "t1", "task_type": "video", "status": "CANCELLING", "worker_id": "dead-worker"}
+        self.queue.find_one_and_update = AsyncMock(side_effect=[item, None])
+        self.service._handle_task_failure = AsyncMock()
+        self.service._mark_queue_item_cancelled = AsyncMock()
+
+        reclaimed = await self.service.reclaim_expired_leases()
+
+        self.assertEqual(reclaimed, ["t1"])
+        self.service._mark_queue_item_cancelled.assert_awaited_once()
+        self.assertEqual(self.service._mark_queue_item_cancelled.await_args.args[0], "t1")
+        self.service._handle_task_failure.assert_not_awaited()
+
+    async def test_nothing_to_reclaim(self):
+        self.service._handle_task_failure = AsyncMock()
+
+        self.assertEqual(await self.service.reclaim_expired_leases(), [])
+        self.service._handle_task_failure.assert_not_awaited()
+
+    async def test_completion_of_a_cancelling_item_finishes_the_cancellation(self):
+        self.queue.update_one = AsyncMock(return_value=SimpleNamespace(matched_count=0, modified_count=0))
+        self.queue.find_one = AsyncMock(return_value={"status": "CANCELLING"})
+        self.service._mark_queue_item_cancelled = AsyncMock()
+        self.service._complete_followers = AsyncMock()
+
+        await self.service._mark_queue_item_completed("t1", "video")
+
+        query = self.queue.update_one.await_args.args[0]
+        self.assertEqual(query, {"task_id": "t1", "worker_id": self.service.worker_id, "status": "PROCESSING"})
+        self.service._mark_queue_item_cancelled.assert_awaited_once()
+        self.service._complete_followers.assert_not_awaited()
+
+    async def test_completion_after_losing_the_lease_changes_nothing(self):
+        self.queue.update_one = AsyncMock(return_value=SimpleNamespace(matched_count=0, modified_count=0))
+        self.service._mark_queue_item_cancelled = AsyncMock()
+        self.service._complete_followers = AsyncMock()
+
+        await self.service._mark_queue_item_completed("t1", "video")
+
+        self.service._mark_queue_item_cancelled.assert_not_awaited()
+        self.service._complete_followers.assert_not_awaited()
+
+
+class FairShareTagsTest(QueueServiceTestCase):
+    async def tags(self, account_id, count, priority_rank=2):
+        return [await self.service._next_fair_tag(account_id, priority_rank) for _ in range(count)]
+
+    async def test_a_bulk_submission_does_not_delay_other_accounts(self):
+        bulk = await self.tags("bulk", 5)
+        single = await self.tags("single", 1)
+
+        self.assertEqual(bulk, [1.0, 2.0, 3.0, 4.0, 5.0])
+        # The single item ties with the bulk account's first item (created_at breaks the tie), so it runs
+        # second instead of after all five
+        self.assertEqual(single, [1.0])
+        self.assertEqual(sum(tag < single[0] for tag in bulk), 0)
+
+    async def test_weights_share_the_queue_proportionally(self):
+        self.settings = make_settings(queue_account_weights={"heavy": 2.0})
+        heavy = await self.tags("heavy", 4)
+        light = await self.tags("light", 2)
+
+        self.assertEqual(heavy, [0.5, 1.0, 1.5, 2.0])
+        self.assertEqual(light, [1.0, 2.0])
+
+    async def test_reserving_several_tags_returns_the_last_one(self):
+        self.assertEqual(await self.service._next_fair_tag("acc", 2, count=3), 3.0)
+        self.assertEqual(await self.service._next_fair_tag("acc", 2), 4.0)
+
+    async def test_idle_account_starts_at_the_virtual_time(self):
+        await self.tags("busy", 10)
+        # Items were dequeued up to tag 6: an account that was idle can't claim the slots it didn't use
+        self.counters.documents["fair_vtime:2"] = {"_id": "fair_vtime:2", "vtime": 6.0}
+
+        self.assertEqual(await self.tags("idle", 1), [7.0])
+        self.assertEqual(await self.tags("busy", 1), [11.0])
+
+    async def test_priorities_have_separate_tags(self):
+        await self.tags("acc", 3, priority_rank=2)
+
+        self.assertEqual(await self.tags("acc", 1, priority_rank=1), [1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()